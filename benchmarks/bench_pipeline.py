@@ -0,0 +1,142 @@
+# End-to-end throughput benchmark against the local replay server
+# Run from the project root: python -m benchmarks.bench_pipeline --keywords 3 --fetcher browser
+
+import argparse
+import json
+import time
+
+from tiktok_harvester.lifecycle import browser_rss_mb
+from tiktok_harvester.metrics import percentile
+from tiktok_harvester.replay_server import start_replay_server, synthetic_search_cards
+
+class StageTimer:
+    """Collects per-stage latencies for the report."""
+    def __init__(self):
+        self.samples = {}
+
+    def time(self, stage, func, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.samples.setdefault(stage, []).append(time.perf_counter() - started)
+
+    def summary(self):
+        return {stage: {
+            'count': len(values),
+            'total_s': round(sum(values), 3),
+            'mean_s': round(sum(values) / len(values), 3),
+            'p50_s': round(percentile(values, 0.5), 3),
+            'p95_s': round(percentile(values, 0.95), 3)
+        } for stage, values in self.samples.items()}
+
+def run_workload(args, base_url):
+    from tiktok_harvester.http_fetcher import HttpProfileFetcher
+
+    timer = StageTimer()
+    peak_rss = None
+    driver = None
+    keywords = [f"benchmark keyword {i + 1}" for i in range(args.keywords)]
+    usernames = []
+    seen = set()
+
+    needs_browser = args.search == 'browser' or args.fetcher == 'browser'
+    if needs_browser:
+        from tiktok_harvester.scraper import (initialize_driver, close_driver, search_tiktok_videos,
+                                              wait_for_search_results, scroll_and_extract_video_data_via_js,
+                                              scrape_profile_data)
+        driver = timer.time('driver_startup', initialize_driver, lean=args.lean, user_data_dir=args.user_data_dir)
+        if not driver:
+            raise SystemExit("Could not start Chrome; use --search server --fetcher http to benchmark without a browser.")
+
+    http_fetcher = HttpProfileFetcher(pool_size=args.http_concurrency) if args.fetcher == 'http' else None
+    started = time.perf_counter()
+    try:
+        for keyword in keywords:
+            if args.search == 'browser':
+                timer.time('search_navigation', search_tiktok_videos, driver, keyword, base_url=base_url)
+                timer.time('search_ready', wait_for_search_results, driver)
+                cards = timer.time('scroll_extract', scroll_and_extract_video_data_via_js, driver,
+                                   scroll_floor_ms=args.scroll_floor_ms, idle_timeout_ms=args.scroll_idle_timeout_ms)
+                rss = browser_rss_mb(driver)
+                peak_rss = max(peak_rss or 0, rss) if rss is not None else peak_rss
+            else:
+                cards = synthetic_search_cards(keyword, args.results_per_keyword, args.creator_pool)
+            for card in cards:
+                if card['username'] not in seen:
+                    seen.add(card['username'])
+                    usernames.append(card['username'])
+
+        profile_urls = [f"{base_url}/@{username}" for username in usernames[:args.max_profiles]]
+        profiles_started = time.perf_counter()
+        if http_fetcher:
+            timer.time('profile_batch_http', http_fetcher.fetch_many, profile_urls, args.http_concurrency)
+        else:
+            for profile_url in profile_urls:
+                timer.time('profile', scrape_profile_data, driver, profile_url)
+                rss = browser_rss_mb(driver)
+                peak_rss = max(peak_rss or 0, rss) if rss is not None else peak_rss
+        profiles_elapsed = time.perf_counter() - profiles_started
+    finally:
+        if http_fetcher:
+            http_fetcher.close()
+        if driver:
+            close_driver(driver)
+
+    total_elapsed = time.perf_counter() - started
+    return {
+        'workload': {'keywords': args.keywords, 'results_per_keyword': args.results_per_keyword,
+                     'creator_pool': args.creator_pool, 'search': args.search, 'fetcher': args.fetcher,
+                     'lean': args.lean, 'profile_latency_ms': args.profile_latency_ms},
+        'profiles': len(profile_urls),
+        'profiles_per_minute': round(len(profile_urls) / profiles_elapsed * 60, 1) if profiles_elapsed else None,
+        'end_to_end_profiles_per_minute': round(len(profile_urls) / total_elapsed * 60, 1) if total_elapsed else None,
+        'stages': timer.summary(),
+        'browser_peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None
+    }
+
+def print_report(report):
+    print(f"\nWorkload: {report['workload']}")
+    print(f"Profiles: {report['profiles']}  |  {report['profiles_per_minute']} profiles/min (profile stage), "
+          f"{report['end_to_end_profiles_per_minute']} profiles/min (end to end)")
+    print(f"{'stage':<22}{'count':>7}{'total s':>10}{'mean s':>9}{'p50 s':>9}{'p95 s':>9}")
+    for stage, stats in report['stages'].items():
+        print(f"{stage:<22}{stats['count']:>7}{stats['total_s']:>10}{stats['mean_s']:>9}{stats['p50_s']:>9}{stats['p95_s']:>9}")
+    if report['browser_peak_rss_mb'] is not None:
+        print(f"Browser peak RSS: {report['browser_peak_rss_mb']} MB")
+    elif report['workload']['search'] == 'browser' or report['workload']['fetcher'] == 'browser':
+        print("Browser memory not measured (pip install psutil).")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the crawl stages against the local replay server.")
+    parser.add_argument("--keywords", type=int, default=3)
+    parser.add_argument("--results-per-keyword", type=int, default=60)
+    parser.add_argument("--creator-pool", type=int, default=150)
+    parser.add_argument("--max-profiles", type=int, default=100)
+    parser.add_argument("--search", choices=["browser", "server"], default="browser",
+                        help="'browser' scrolls the replay search page; 'server' takes the cards straight from the generator.")
+    parser.add_argument("--fetcher", choices=["browser", "http"], default="browser")
+    parser.add_argument("--http-concurrency", type=int, default=8)
+    parser.add_argument("--lean", action="store_true")
+    parser.add_argument("--user-data-dir", default=None, help="Persistent Chrome profile, to compare cold and warm starts.")
+    parser.add_argument("--profile-latency-ms", type=int, default=150, help="Simulated server latency per profile page.")
+    parser.add_argument("--scroll-floor-ms", type=int, default=100)
+    parser.add_argument("--scroll-idle-timeout-ms", type=int, default=1500)
+    parser.add_argument("--json", default=None, help="Also write the report to this JSON file.")
+    args = parser.parse_args(argv)
+
+    server = start_replay_server(results_per_keyword=args.results_per_keyword, creator_pool=args.creator_pool,
+                                 profile_latency_ms=args.profile_latency_ms)
+    print(f"Replay server at {server.base_url}")
+    try:
+        report = run_workload(args, server.base_url)
+    finally:
+        server.shutdown()
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"Report written to {args.json}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import argparse
+from concurrent.futures import Future
+
+from tiktok_harvester import crawl
+from tiktok_harvester.crawl import HarvestRun, load_search_results, stream_users_to_pool
+from tiktok_harvester.journal import RunJournal
+from tiktok_harvester.pool import RateLimiter
+from tiktok_harvester.retry import RetryQueue
+from tiktok_harvester.profile_data import empty_profile_data
+from tiktok_harvester.scheduler import CrawlBudget, YieldScheduler
+from tiktok_harvester.scraper import BrowserCrashed, ScrapeError
+
+class CrashingBrowser:
+    """Returns two search results, then crashes on every profile, as a ManagedDriver that gave up restarting would."""
+    driver = None
+
+    def run(self, func, *args):
+        if func is load_search_results:
+            return [{'username': 'alice', 'videoUrl': 'https://example.test/v/1', 'likeCount': 10},
+                    {'username': 'bob', 'videoUrl': 'https://example.test/v/2', 'likeCount': 20}]
+        raise BrowserCrashed("chrome not reachable")
+
+class ListWriter:
+    def __init__(self):
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+
+    def flush(self):
+        pass
+
+def make_args(**overrides):
+    args = {'stream': False, 'base_url': 'https://example.test', 'min_video_likes': None, 'max_video_likes': None,
+            'http_concurrency': 1, 'workers': 1, 'sinks': ['csv']}
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+def test_browser_crash_without_retry_queue_writes_empty_rows(tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    writer = ListWriter()
+    run = HarvestRun(make_args(), CrashingBrowser(), journal, writer, RateLimiter(0), retry_queue=None)
+
+    run.harvest_keyword('kw')
+
+    assert [row['username'] for row in writer.rows] == ['alice', 'bob']
+    assert all(row['bio_text'] == empty_profile_data()['bio_text'] for row in writer.rows)
+    assert 'kw' in journal.keywords_done
+
+def test_scheduled_crawl_without_retry_queue_writes_a_row_per_keyword(tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    writer = ListWriter()
+    run = HarvestRun(make_args(), CrashingBrowser(), journal, writer, RateLimiter(0), retry_queue=None)
+
+    run.harvest_scheduled(['kw1', 'kw2'], YieldScheduler())
+
+    assert sorted((row['keyword_searched'], row['username']) for row in writer.rows) == [
+        ('kw1', 'alice'), ('kw1', 'bob'), ('kw2', 'alice'), ('kw2', 'bob')]
+    assert journal.keywords_done == {'kw1', 'kw2'}
+
+class QueuedPool:
+    """Stands in for DriverPool: resolves the profiles in `loaded` at once and leaves the rest queued."""
+    def __init__(self, loaded):
+        self.loaded = loaded
+        self.futures = {}
+
+    def submit(self, profile_url):
+        future = Future()
+        username = profile_url.rsplit('@', 1)[-1]
+        if username in self.loaded:
+            future.set_result({**empty_profile_data(), 'bio_text': self.loaded[username]})
+        self.futures[username] = future
+        return future
+
+def test_pool_submissions_are_capped_at_the_profile_budget(tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    writer = ListWriter()
+    pool = QueuedPool({'alice': "hi", 'bob': "hi"})
+    run = HarvestRun(make_args(workers=2), CrashingBrowser(), journal, writer, RateLimiter(0),
+                     profile_pool=pool, retry_queue=None, budget=CrawlBudget(max_profiles=1))
+
+    run.harvest_keyword('kw')
+
+    assert list(pool.futures) == ['alice']
+    assert [row['username'] for row in writer.rows] == ['alice']
+    assert 'kw' not in journal.keywords_done
+
+def test_queued_profiles_are_cancelled_once_the_budget_is_spent(tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    writer = ListWriter()
+    pool = QueuedPool({'alice': "mail alice@brand.com"})
+    run = HarvestRun(make_args(workers=2), CrashingBrowser(), journal, writer, RateLimiter(0),
+                     profile_pool=pool, retry_queue=None, budget=CrawlBudget(target_emails=1))
+
+    run.harvest_keyword('kw')
+
+    assert pool.futures['bob'].cancelled()
+    assert [row['username'] for row in writer.rows] == ['alice']
+    assert 'kw' not in journal.keywords_done
+
+def test_streaming_leaves_parked_profiles_to_the_retry_queue(monkeypatch):
+    cards = [{'username': 'alice', 'videoUrl': 'https://example.test/v/1', 'likeCount': 10},
+             {'username': 'bob', 'videoUrl': 'https://example.test/v/2', 'likeCount': 20}]
+    monkeypatch.setattr(crawl, 'stream_video_data_via_js', lambda driver, **options: iter([cards]))
+    retry_queue = RetryQueue()
+    retry_queue.park('profile', 'bob', ScrapeError("timed out"), context=('earlier', {'username': 'bob'}))
+    pool = QueuedPool({'alice': "hi"})
+    args = make_args(stream=True, scroll_floor_ms=0, scroll_idle_timeout_ms=0, prune_keep=0)
+
+    users_to_process, submitted = stream_users_to_pool(None, pool, 'kw', {}, lambda username: False, args,
+                                                       retry_queue=retry_queue)
+
+    assert [user_info['username'] for user_info in users_to_process] == ['alice', 'bob']
+    assert list(submitted) == ['alice']
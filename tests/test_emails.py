@@ -0,0 +1,67 @@
+import pytest
+
+from tiktok_harvester.emails import extract_emails, extract_emails_batch, load_tlds, normalize_domain, valid_tlds
+
+def test_tld_table_has_generic_country_and_punycode_tlds():
+    tlds = load_tlds()
+    assert {'com', 'io', 'uk', 'music'} <= tlds
+    assert any(tld.startswith('xn--') for tld in tlds)
+    assert all(tld == tld.lower() and not tld.startswith('#') for tld in tlds)
+    assert valid_tlds() == tlds
+
+@pytest.mark.parametrize("domain, expected", [
+    ("Brand.COM", "brand.com"),
+    ("brand.co.uk", "brand.co.uk"),
+    ("Brand.co.uk.Thanks", "brand.co.uk"),
+    ("brand.io.Follow", "brand.io"),
+    ("brand.com.Music", "brand.com"),
+    ("brand.com-", "brand.com"),
+    ("brand.notatld", None),
+    ("brand.c", None),
+    ("localhost", None),
+    ("-brand.com", None),
+])
+def test_normalize_domain(domain, expected):
+    assert normalize_domain(domain) == expected
+
+def test_extract_emails_keeps_first_appearance_order_without_duplicates():
+    text = "biz: Me@Brand.com | also me@brand.com or team@agency.co.uk"
+    assert extract_emails(text) == ["me@brand.com", "team@agency.co.uk"]
+
+@pytest.mark.parametrize("text", [
+    "email me@brand.com.",
+    "email me@brand.com, thanks",
+    "(me@brand.com)",
+    "me@brand.com!!",
+    "me@brand.com- dm me",
+    "📩me@brand.com✨",
+])
+def test_trailing_punctuation_is_stripped(text):
+    assert extract_emails(text) == ["me@brand.com"]
+
+@pytest.mark.parametrize("text, expected", [
+    ("me [at] brand [dot] com", "me@brand.com"),
+    ("me(at)brand(dot)com", "me@brand.com"),
+    ("me {AT} brand.com", "me@brand.com"),
+    ("me [at] agency (dot) co (dot) uk", "me@agency.co.uk"),
+])
+def test_obfuscated_at_and_dot_forms(text, expected):
+    assert extract_emails(text) == [expected]
+
+@pytest.mark.parametrize("text", [
+    "user@localhost",
+    "user@.com",
+    "@domain.com",
+    "me@brand.notatld",
+    "me@@brand.com",
+    "me..you@brand.com",
+    "meet me at the gym dot com",
+    "no address here",
+    "",
+    None,
+])
+def test_invalid_addresses_are_rejected(text):
+    assert extract_emails(text) == []
+
+def test_batch_returns_one_list_per_text():
+    assert extract_emails_batch(["a@b.com", "", "x [at] y [dot] io"]) == [["a@b.com"], [], ["x@y.io"]]
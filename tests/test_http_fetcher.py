@@ -0,0 +1,84 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from tiktok_harvester.crawl import HarvestRun, load_search_results
+from tiktok_harvester.http_fetcher import HttpProfileFetcher
+from tiktok_harvester.journal import RunJournal
+from tiktok_harvester.pool import RateLimiter
+from tiktok_harvester.profile_data import empty_profile_data
+from tiktok_harvester.replay_server import start_replay_server, synthetic_profile, _seed
+
+from tests.test_crawl import ListWriter, make_args
+
+@pytest.fixture
+def replay_server():
+    servers = []
+
+    def start(**options):
+        server = start_replay_server(port=0, **options)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def fetcher():
+    fetcher = HttpProfileFetcher(timeout=5)
+    yield fetcher
+    fetcher.close()
+
+def test_fetch_returns_the_profile_dict_of_the_browser_scraper(replay_server, fetcher):
+    server = replay_server()
+
+    profile_data = fetcher.fetch(f"{server.base_url}/@creator00042")
+
+    assert set(profile_data) == set(empty_profile_data())
+    user_info = synthetic_profile('creator00042')
+    assert profile_data['bio_text'] == user_info['user']['signature']
+    assert profile_data['followers_count'] == user_info['stats']['followerCount']
+
+class RecordingBrowser:
+    """Serves the search cards given and records which profiles reach the browser."""
+    driver = None
+
+    def __init__(self, cards):
+        self.cards = cards
+        self.profiles_loaded = []
+
+    def run(self, func, *args):
+        if func is load_search_results:
+            return [dict(card) for card in self.cards]
+        self.profiles_loaded.append(args[0])
+        return {**empty_profile_data(), 'bio_text': "from the browser"}
+
+def test_pages_without_hydration_data_fall_back_to_the_browser(replay_server, fetcher, tmp_path):
+    server = replay_server(hydration_ratio=0.5)
+    usernames = [f"creator{i:05d}" for i in range(20)]
+    hydrated = {username for username in usernames if _seed('hydration', username) % 100 < 50}
+    assert hydrated and len(hydrated) < len(usernames)
+    browser = RecordingBrowser([{'username': username, 'videoUrl': 'N/A', 'likeCount': 1} for username in usernames])
+    writer = ListWriter()
+    run = HarvestRun(make_args(base_url=server.base_url, http_concurrency=4), browser,
+                     RunJournal(str(tmp_path / "journal.jsonl")), writer, RateLimiter(0), http_fetcher=fetcher)
+
+    run.harvest_keyword('kw')
+
+    assert sorted(browser.profiles_loaded) == sorted(f"{server.base_url}/@{username}" for username in set(usernames) - hydrated)
+    bios = {row['username']: row['bio_text'] for row in writer.rows}
+    assert all(bios[username] == synthetic_profile(username)['user']['signature'] for username in hydrated)
+    assert all(bios[username] == "from the browser" for username in set(usernames) - hydrated)
+
+def test_profile_paths_cannot_leave_the_record_directory(replay_server, tmp_path):
+    (tmp_path / "records" / "profiles").mkdir(parents=True)
+    (tmp_path / "secret.html").write_text("outside the record directory")
+    server = replay_server(record_dir=str(tmp_path / "records"))
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(f"{server.base_url}/@..%2F..%2Fsecret", timeout=5)
+
+    assert error.value.code == 404
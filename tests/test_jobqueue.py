@@ -0,0 +1,118 @@
+import argparse
+
+import pytest
+
+from tiktok_harvester import jobqueue, scraper
+from tiktok_harvester.jobqueue import SqliteJobQueue
+from tiktok_harvester.pool import RateLimiter
+from tiktok_harvester.profile_data import empty_profile_data
+from tiktok_harvester.scraper import ScrapeError
+from tiktok_harvester.worker import QueueWorker
+
+from tests.test_crawl import ListWriter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(jobqueue, 'time', clock)
+    return clock
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = SqliteJobQueue(str(tmp_path / "jobs.sqlite"), lease_seconds=60, max_attempts=3, base_delay=10, max_delay=100)
+    yield queue
+    queue.close()
+
+def test_leased_job_is_hidden_until_its_lease_expires(queue, clock):
+    queue.enqueue('search', 'kw')
+    job = queue.lease('worker-a')
+    assert job.key == 'kw' and job.attempts == 1
+    assert queue.lease('worker-b') is None
+
+    clock.now += 61
+    redelivered = queue.lease('worker-b')
+    assert redelivered.id == job.id
+    assert redelivered.attempts == 2
+    assert redelivered.lease_token != job.lease_token
+
+def test_heartbeat_renews_the_lease(queue, clock):
+    queue.enqueue('search', 'kw')
+    job = queue.lease('worker-a')
+    clock.now += 50
+    assert queue.heartbeat(job)
+    clock.now += 50 # Past the first lease, within the renewed one
+    assert queue.lease('worker-b') is None
+    clock.now += 11
+    assert queue.lease('worker-b') is not None
+
+def test_stale_token_cannot_complete_fail_or_renew(queue, clock):
+    queue.enqueue('search', 'kw')
+    stale = queue.lease('worker-a')
+    clock.now += 61
+    current = queue.lease('worker-b')
+
+    assert queue.heartbeat(stale) is False
+    assert queue.complete(stale) is False
+    assert queue.fail(stale, "timed out") is None
+    assert queue.counts() == {'search': {'leased': 1}}
+
+    assert queue.complete(current) is True
+    assert queue.counts() == {'search': {'done': 1}}
+
+def test_failed_job_is_retried_after_backoff_then_given_up(queue, clock):
+    queue.enqueue('profile', 'alice')
+    for attempt in range(1, 4):
+        job = queue.lease('worker-a')
+        assert job.attempts == attempt
+        assert queue.fail(job, "CAPTCHA") is (attempt < 3)
+        if attempt < 3:
+            assert queue.lease('worker-a') is None # Still backing off
+            clock.now += queue.max_delay * 1.2
+    assert queue.counts() == {'profile': {'failed': 1}}
+    assert queue.failed_jobs()[0]['last_error'] == "CAPTCHA"
+
+class PromptingBrowser:
+    """Fails every search, counting the calls made while the scraper would still have prompted the user."""
+    def __init__(self):
+        self.interactive_calls = 0
+
+    def run(self, func, *args):
+        if scraper._interactive:
+            self.interactive_calls += 1
+        raise ScrapeError("search results did not load")
+
+def test_worker_never_runs_interactive(queue, monkeypatch):
+    monkeypatch.setattr(scraper, '_interactive', True)
+    queue.enqueue('search', 'kw')
+    browser = PromptingBrowser()
+    worker = QueueWorker(queue, argparse.Namespace(), browser, output_writer=None, rate_limiter=None, worker_id='w')
+
+    queue.max_attempts = 1
+    worker.run()
+
+    assert browser.interactive_calls == 0
+    assert worker.jobs_failed == 1
+    assert queue.counts() == {'search': {'failed': 1}}
+
+class EmptyProfileBrowser:
+    """Loads every profile page without finding any of its data."""
+    def run(self, func, *args):
+        return empty_profile_data()
+
+def test_profile_that_fails_to_load_fails_its_job(queue):
+    queue.enqueue('profile', 'alice', context=['kw', {'username': 'alice', 'profile_url': 'https://example.test/@alice'}])
+    writer = ListWriter()
+    worker = QueueWorker(queue, argparse.Namespace(), EmptyProfileBrowser(), writer, RateLimiter(0), worker_id='w')
+
+    worker.process(queue.lease('w'))
+
+    assert writer.rows == []
+    assert worker.jobs_failed == 1
+    assert queue.counts() == {'profile': {'queued': 1}}
@@ -0,0 +1,39 @@
+import json
+
+from tiktok_harvester.crawl import HarvestRun
+from tiktok_harvester.journal import RunJournal
+from tiktok_harvester.pool import RateLimiter
+from tiktok_harvester.profile_data import empty_profile_data
+from tiktok_harvester.profile_store import ProfileStore
+
+from tests.test_crawl import CrashingBrowser, ListWriter, make_args
+
+def test_failed_scrapes_are_not_journaled_for_resume(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    run = HarvestRun(make_args(), CrashingBrowser(), RunJournal(path), ListWriter(), RateLimiter(0))
+
+    run.record_profile('alice', {**empty_profile_data(), 'bio_text': 'hello@example.com'})
+    run.record_profile('bob', empty_profile_data())
+    run.record_profile('carol', None)
+
+    assert set(RunJournal(path).profile_results) == {'alice'}
+
+def test_failed_scrapes_in_older_journals_are_ignored(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text(json.dumps({"event": "profile", "username": "bob", "data": empty_profile_data()}) + "\n")
+
+    assert RunJournal(str(path)).profile_results == {}
+
+def test_profile_store_ttl_decides_whether_journaled_profiles_are_reused(tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    journal.record_profile('alice', {**empty_profile_data(), 'bio_text': 'hello@example.com'})
+    store = ProfileStore(str(tmp_path / "profiles.sqlite"), ttl_seconds=3600)
+    store.save('alice', journal.profile_results['alice'])
+    with store.connection:
+        store.connection.execute("UPDATE profiles SET last_seen = last_seen - 7200") # Scraped two hours ago
+
+    run = HarvestRun(make_args(), CrashingBrowser(), journal, ListWriter(), RateLimiter(0), profile_store=store)
+    try:
+        assert not run.has_profile('alice')
+    finally:
+        store.close()
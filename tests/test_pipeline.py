@@ -0,0 +1,51 @@
+import sqlite3
+
+from tiktok_harvester import pipeline
+from tiktok_harvester.crawl import HarvestRun
+from tiktok_harvester.journal import RunJournal
+from tiktok_harvester.pipeline import AsyncPipeline
+from tiktok_harvester.pool import RateLimiter
+from tiktok_harvester.sinks import SinkGroup, SqliteSink
+
+from tests.test_crawl import CrashingBrowser, ListWriter, make_args
+
+def make_run(tmp_path, **overrides):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    args = make_args(scroll_floor_ms=0, scroll_idle_timeout_ms=0, prune_keep=0, **overrides)
+    return HarvestRun(args, CrashingBrowser(), journal, ListWriter(), RateLimiter(0), retry_queue=None)
+
+def test_failed_profile_without_retry_queue_still_gets_its_rows(tmp_path):
+    run = make_run(tmp_path)
+    crawl = AsyncPipeline(run)
+    try:
+        crawl.harvest(['kw'])
+    finally:
+        crawl.close()
+
+    assert sorted(row['username'] for row in run.output_writer.rows) == ['alice', 'bob']
+    assert 'kw' in run.journal.keywords_done
+
+def test_streaming_is_turned_off_without_a_profile_browser(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline.ManagedDriver, 'start', lambda self: False)
+    crawl = AsyncPipeline(make_run(tmp_path, stream=True))
+    try:
+        assert crawl.start() == 0
+        assert crawl.stream is False
+    finally:
+        crawl.close()
+
+def test_pipeline_writes_through_a_sqlite_sink(tmp_path):
+    run = make_run(tmp_path)
+    sinks = SinkGroup([SqliteSink(str(tmp_path / "harvest.sqlite"))], batch_size=1, on_flush=run.journal.record_rows)
+    run.output_writer = sinks
+    crawl = AsyncPipeline(run)
+    try:
+        crawl.harvest(['kw'])
+    finally:
+        crawl.close()
+        sinks.close()
+
+    with sqlite3.connect(str(tmp_path / "harvest.sqlite")) as connection:
+        usernames = sorted(row[0] for row in connection.execute("SELECT username FROM harvested_rows"))
+    assert usernames == ['alice', 'bob']
+    assert sorted(row['username'] for row in run.journal.rows) == ['alice', 'bob']
@@ -0,0 +1,59 @@
+import random
+
+from tiktok_harvester.scheduler import CrawlBudget, YieldQueue, YieldScheduler
+from tiktok_harvester.crawl import fetch_profiles_over_http
+
+def brute_force_order(scheduler, pending):
+    """Every pending creator scored and sorted again, as the queue must order them."""
+    def sort_key(username):
+        likes = pending[username][0][1].get('related_video_likes')
+        return (scheduler.score(pending[username]), likes if isinstance(likes, int) else -1)
+    return sorted(pending, key=sort_key, reverse=True)
+
+def test_yield_queue_pops_in_score_order_as_the_scheduler_learns():
+    randomizer = random.Random(7)
+    keywords = ['tech', 'ai', 'food']
+    pending = {}
+    for i in range(300):
+        username = f"user{i}"
+        found_under = randomizer.sample(keywords, randomizer.randint(1, 2))
+        user_info = {'username': username, 'related_video_likes': randomizer.choice([randomizer.randint(0, 10 ** 6), 'N/A'])}
+        pending[username] = [(keyword, user_info) for keyword in found_under]
+    scheduler = YieldScheduler()
+    queue = YieldQueue(scheduler, dict(pending))
+
+    while queue:
+        expected = brute_force_order(scheduler, pending)[0]
+        username, contexts, _ = queue.pop()
+        assert scheduler.score(contexts) == scheduler.score(pending.pop(expected))
+        for keyword, user_info in contexts:
+            scheduler.observe(keyword, user_info, randomizer.random() < (0.6 if keyword == 'ai' else 0.1))
+    assert not pending
+
+def test_yield_queue_peek_does_not_remove():
+    scheduler = YieldScheduler()
+    pending = {name: [('kw', {'username': name, 'related_video_likes': likes})]
+               for name, likes in [('a', 10), ('b', 30), ('c', 20)]}
+    queue = YieldQueue(scheduler, pending)
+    assert [contexts[0][1]['username'] for contexts in queue.peek(2)] == ['b', 'c']
+    assert len(queue) == 3
+    assert [queue.pop()[0] for _ in range(3)] == ['b', 'c', 'a']
+
+class CountingFetcher:
+    def __init__(self):
+        self.requested = []
+
+    def fetch_many(self, urls, concurrency):
+        self.requested += urls
+        return [{'bio_text': url} for url in urls]
+
+def test_http_fetch_stops_at_the_profile_budget():
+    users = [{'username': f"user{i}", 'profile_url': f"https://example.test/@user{i}"} for i in range(10)]
+    budget = CrawlBudget(max_profiles=5)
+    fetcher = CountingFetcher()
+
+    fetched = fetch_profiles_over_http(fetcher, users, {}, concurrency=2, budget=budget)
+
+    assert len(fetcher.requested) == 5
+    assert len(fetched) == 5
+    assert budget.exhausted() == 'max_profiles'
@@ -0,0 +1,39 @@
+import csv
+
+import pytest
+
+from tiktok_harvester.sinks import OUTPUT_COLUMNS, CsvSink
+
+def row(username, **values):
+    return {**{column: 'N/A' for column in OUTPUT_COLUMNS}, 'keyword_searched': 'kw', 'username': username, **values}
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as csv_file:
+        return list(csv.DictReader(csv_file))
+
+def test_rows_are_appended_under_the_existing_header(tmp_path):
+    path = tmp_path / "kw.csv"
+    old_columns = list(reversed(OUTPUT_COLUMNS)) + ['dropped_column']
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=old_columns)
+        writer.writeheader()
+        writer.writerow({**row('alice', bio_text="hi"), 'dropped_column': 'x'})
+
+    CsvSink(str(tmp_path / "{keyword}.csv")).write_batch([row('bob', bio_text="hello")])
+
+    rows = read_rows(path)
+    assert [(r['username'], r['bio_text'], r['dropped_column']) for r in rows] == [('alice', "hi", 'x'), ('bob', "hello", '')]
+
+def test_header_missing_output_columns_is_refused(tmp_path):
+    path = tmp_path / "kw.csv"
+    path.write_text("keyword_searched,username\nkw,alice\n", encoding='utf-8')
+
+    with pytest.raises(ValueError, match="bio_text"):
+        CsvSink(str(tmp_path / "{keyword}.csv")).write_batch([row('bob')])
+    assert len(read_rows(path)) == 1
+
+def test_new_file_gets_the_output_columns(tmp_path):
+    CsvSink(str(tmp_path / "{keyword}.csv")).write_batch([row('alice')])
+
+    with open(tmp_path / "kw.csv", newline='', encoding='utf-8') as csv_file:
+        assert next(csv.reader(csv_file)) == OUTPUT_COLUMNS
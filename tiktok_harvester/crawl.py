@@ -0,0 +1,651 @@
+# Crawl steps shared by the sequential run and the asyncio pipeline
+# e.g., search result handling, profile visits, output rows, the run-wide HarvestRun state
+
+import time
+
+from tiktok_harvester.scraper import (
+    search_tiktok_videos,
+    wait_for_search_results,
+    scroll_and_extract_video_data_via_js,
+    stream_video_data_via_js,
+    scrape_profile_data,
+    ScrapeError,
+    BrowserCrashed,
+    TIKTOK_BASE_URL
+)
+from tiktok_harvester.metrics import METRICS
+from tiktok_harvester.profile_data import empty_profile_data, profile_scraped, recent_video_stats
+from tiktok_harvester.scheduler import YieldQueue
+from tiktok_harvester.utils import extract_emails_from_text, normalize_counts
+
+def collect_users_to_process(video_data_list, keyword, creator_keywords, unique_usernames=None, base_url=TIKTOK_BASE_URL):
+    """
+    Builds the list of unique creators found in the video data for one keyword.
+    creator_keywords is shared across the whole run (username -> list of keywords),
+    so it records every keyword that surfaced each creator.
+    unique_usernames can be passed in to dedupe across several batches of the same keyword.
+    """
+    if unique_usernames is None:
+        unique_usernames = set()
+    users_to_process = []
+    for video_item in video_data_list:
+        creator_username = video_item.get('username')
+        if creator_username and creator_username != 'N/A' and creator_username not in unique_usernames:
+            unique_usernames.add(creator_username)
+            users_to_process.append({
+                'username': creator_username,
+                'profile_url': f"{base_url}/@{creator_username}",
+                'related_video_url': video_item.get('videoUrl', 'N/A'),
+                'related_video_likes': video_item['likeCount'] if video_item.get('likeCount') is not None else 'N/A'
+            })
+            matched = creator_keywords.setdefault(creator_username, [])
+            if keyword not in matched:
+                matched.append(keyword)
+    return users_to_process
+
+def filter_video_data(video_data_list, min_video_likes=None, max_video_likes=None):
+    """
+    Normalizes the like counts of a batch of search cards to integers and drops cards outside
+    the configured thresholds, before any profile is queued. Cards with an unknown count are kept.
+    """
+    normalize_counts(video_data_list, ['likeCount'])
+    if min_video_likes is None and max_video_likes is None:
+        return video_data_list
+    kept = []
+    for video_item in video_data_list:
+        likes = video_item.get('likeCount')
+        if likes is not None:
+            if min_video_likes is not None and likes < min_video_likes:
+                continue
+            if max_video_likes is not None and likes > max_video_likes:
+                continue
+        kept.append(video_item)
+    if len(kept) < len(video_data_list):
+        print(f"Skipped {len(video_data_list) - len(kept)}/{len(video_data_list)} videos outside the like thresholds.")
+    return kept
+
+def open_search_results(driver, keyword, base_url):
+    """Navigates to the video search results for a keyword and waits for the first cards. Returns False if the search failed."""
+    if not search_tiktok_videos(driver, keyword, base_url=base_url):
+        return False
+    print(f"Successfully navigated to video search results for '{keyword}'.")
+    print("Now executing JavaScript to scroll and extract video data (usernames, likes, video URLs)...")
+
+    print("Waiting for the first result cards before executing JS...")
+    wait_for_search_results(driver)
+    return True
+
+def load_search_results(driver, keyword, args):
+    """
+    Opens the search results for a keyword and scrolls through them.
+    Returns the video data list, or None if the search failed.
+    """
+    if not open_search_results(driver, keyword, args.base_url):
+        return None
+    return scroll_and_extract_video_data_via_js(
+        driver,
+        scroll_floor_ms=args.scroll_floor_ms,
+        idle_timeout_ms=args.scroll_idle_timeout_ms
+    )
+
+def stream_users_to_pool(driver, profile_pool, keyword, creator_keywords, has_profile, args, budget=None, retry_queue=None):
+    """
+    Streams video data from the search page and queues each new creator on the
+    profile pool as soon as their card appears, while scrolling continues.
+    has_profile(username) tells which creators need no page load; creators whose
+    profile is parked in the retry_queue are left to its retry.
+    With a budget (CrawlBudget), no more creators are queued than it has profile loads left.
+    Returns the creators found for the keyword and the pool futures of the queued profiles.
+    """
+    users_to_process = []
+    keyword_usernames = set()
+    submitted = {} # username -> Future for the profile data
+    for batch in stream_video_data_via_js(driver,
+                                          scroll_floor_ms=args.scroll_floor_ms,
+                                          idle_timeout_ms=args.scroll_idle_timeout_ms,
+                                          prune_keep=args.prune_keep):
+        batch = filter_video_data(batch, args.min_video_likes, args.max_video_likes)
+        new_users = collect_users_to_process(batch, keyword, creator_keywords, keyword_usernames, base_url=args.base_url)
+        users_to_process.extend(new_users)
+        for user_info in new_users:
+            if has_profile(user_info['username']):
+                continue
+            if retry_queue is not None and retry_queue.find('profile', user_info['username']):
+                continue
+            if budget is not None and (budget.exhausted() or (budget.max_profiles is not None
+                                                              and budget.profiles_loaded + len(submitted) >= budget.max_profiles)):
+                continue
+            submitted[user_info['username']] = profile_pool.submit(user_info['profile_url'])
+        print(f"Queued {len(new_users)} new creators for profile scraping ({len(submitted)} queued for '{keyword}').")
+
+    print(f"Search harvest finished for '{keyword}'. {len(submitted)} profiles queued.")
+    return users_to_process, submitted
+
+def fetch_profiles_over_http(http_fetcher, users_to_process, profile_results, concurrency, budget=None):
+    """
+    Fetches the not-yet-scraped profiles over plain HTTP.
+    Returns a dict of username -> profile data for the profiles fetched. Profiles whose
+    response lacks the data are left out, so the browser path picks them up afterwards.
+    With a budget (CrawlBudget), profiles are fetched in batches of concurrency, each checked
+    against the budget first and capped at the profile loads it has left; fetched profiles count
+    as loads. Profiles past the budget are left out too.
+    """
+    pending_users = [user_info for user_info in users_to_process if user_info['username'] not in profile_results]
+    if not pending_users:
+        return {}
+    print(f"Fetching {len(pending_users)} profiles over HTTP ({concurrency} concurrent requests)...")
+    batch_size = max(1, concurrency) if budget is not None else len(pending_users)
+    fetched = {}
+    attempted = 0
+    while attempted < len(pending_users):
+        batch = pending_users[attempted:attempted + batch_size]
+        if budget is not None:
+            if budget.exhausted():
+                break
+            if budget.max_profiles is not None:
+                batch = batch[:budget.max_profiles - budget.profiles_loaded]
+        http_results = http_fetcher.fetch_many([user_info['profile_url'] for user_info in batch], concurrency)
+        for user_info, profile_page_data in zip(batch, http_results):
+            if profile_page_data is not None:
+                fetched[user_info['username']] = profile_page_data
+                if budget is not None:
+                    budget.record_profile_load()
+        attempted += len(batch)
+    print(f"Fetched {len(fetched)}/{len(pending_users)} profiles over HTTP; {attempted - len(fetched)} fall back to the browser"
+          + (f", {len(pending_users) - attempted} are past the crawl budget." if attempted < len(pending_users) else "."))
+    return fetched
+
+def refresh_stale_profiles(profile_store, browser, rate_limiter, base_url=TIKTOK_BASE_URL, limit=None, http_fetcher=None):
+    """
+    Visits again the profiles in the store that were scraped longer than its TTL ago,
+    most followers first, and saves what changed. Returns the number of profiles per
+    outcome ('new', 'changed', 'unchanged', 'skipped' for failed loads, 'failed').
+    """
+    usernames = profile_store.stale(limit=limit)
+    print(f"Refreshing {len(usernames)} stale profile(s) from {profile_store.path}...")
+    outcomes = {}
+    for i, username in enumerate(usernames):
+        profile_url = f"{base_url}/@{username}"
+        print(f"\nRefreshing profile {i+1}/{len(usernames)}: {username}")
+        profile_page_data = http_fetcher.fetch(profile_url) if http_fetcher else None
+        if profile_page_data is None:
+            rate_limiter.wait() # Politeness floor between profile visits
+            try:
+                profile_page_data = browser.run(scrape_profile_data, profile_url)
+            except ScrapeError as e:
+                print(f"Could not refresh {username}: {e}")
+                outcomes['failed'] = outcomes.get('failed', 0) + 1
+                continue
+        outcome = profile_store.save(username, profile_page_data)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        METRICS.inc('harvester_profile_refreshes_total', result=outcome)
+    print(f"Profile refresh done: {outcomes or 'nothing was stale'}.")
+    return outcomes
+
+def build_output_row(keyword, user_info, profile_page_data):
+    """
+    Builds one output row for a creator found under a keyword,
+    extracting emails from the scraped bio.
+    """
+    username = user_info['username']
+    profile_page_data = profile_page_data or {}
+    bio_text = profile_page_data.get("bio_text", "N/A")
+    emails_found = []
+
+    if profile_page_data:
+        if bio_text and bio_text != "N/A":
+            emails_found = extract_emails_from_text(bio_text)
+            if emails_found:
+                print(f"Emails found for {username}: {', '.join(emails_found)}")
+            else:
+                print(f"No emails found in bio for {username}.")
+        else:
+            print(f"No bio text retrieved for {username}.")
+    else:
+        print(f"Could not retrieve any profile page data for {username}.")
+
+    return {
+        'keyword_searched': keyword,
+        'username': username,
+        'profile_url': user_info['profile_url'],
+        'source_video_url': user_info.get('related_video_url', 'N/A'),
+        'source_video_likes': user_info.get('related_video_likes', 'N/A'),
+        'bio_text': bio_text,
+        'emails_found': ', '.join(emails_found) if emails_found else "N/A",
+        'profile_following_count': profile_page_data.get("following_count", "N/A"),
+        'profile_followers_count': profile_page_data.get("followers_count", "N/A"),
+        'profile_likes_count': profile_page_data.get("likes_count", "N/A"),
+        'profile_nickname': profile_page_data.get("nickname", "N/A"),
+        'profile_verified': profile_page_data.get("verified", "N/A"),
+        'profile_bio_link': profile_page_data.get("bio_link", "N/A"),
+        'profile_video_count': profile_page_data.get("video_count", "N/A"),
+        **recent_video_stats(profile_page_data.get("recent_videos"))
+    }
+
+class HarvestRun:
+    """
+    Run-wide state and the per-keyword crawl. Each creator is scraped once and the
+    result is reused for every keyword that surfaces them.
+    With a retry_queue (non-interactive mode), failed searches and profiles are parked
+    and retried later in the run instead of pausing for the user. A keyword is only
+    journaled as finished once none of its profiles is left waiting.
+    With a profile_store, profiles scraped within its TTL by earlier runs are not loaded again;
+    the store's TTL then also decides whether the journal's profiles are reused.
+    With a prefetcher (TabPrefetcher, single-browser runs only), the next profiles of a keyword
+    load in background tabs while the current one is extracted.
+    With a budget (CrawlBudget), no profile is loaded once it is spent; the creators left
+    keep their keywords unfinished in the journal, so a later run picks them up.
+    """
+    def __init__(self, args, browser, journal, output_writer, rate_limiter,
+                 http_fetcher=None, profile_pool=None, retry_queue=None, profile_store=None, prefetcher=None,
+                 budget=None):
+        self.args = args
+        self.browser = browser # ManagedDriver used for searches and for profiles when there is no pool
+        self.journal = journal
+        self.output_writer = output_writer
+        self.rate_limiter = rate_limiter
+        self.http_fetcher = http_fetcher
+        self.profile_pool = profile_pool
+        self.retry_queue = retry_queue
+        self.profile_store = profile_store # ProfileStore of earlier runs' profiles, or None
+        self.prefetcher = prefetcher
+        self.budget = budget
+        # username -> profile page data. The journal's profiles are in the store too, where they can go stale.
+        self.profile_results = dict(journal.profile_results) if profile_store is None else {}
+        self.creator_keywords = {} # username -> keywords that surfaced the creator
+        self.creator_rows = {} # username -> first collected row, for the combined output
+        self.keywords_searched = set() # Keywords whose search and first pass over creators are over
+        self.unresolved = {} # keyword -> usernames whose profile is parked for a retry
+        for row in journal.rows:
+            matched = self.creator_keywords.setdefault(row['username'], [])
+            if row['keyword_searched'] not in matched:
+                matched.append(row['keyword_searched'])
+            self.creator_rows.setdefault(row['username'], row)
+
+    def search_keyword(self, keyword, load_profiles=True):
+        """
+        Searches one keyword and returns the creators found and the pool futures of profiles
+        already queued, or (None, None) if there is nothing to process.
+        With load_profiles=False, no profile is fetched or queued yet (see harvest_scheduled).
+        Raises ScrapeError in non-interactive mode if the search fails.
+        """
+        args = self.args
+        profile_futures = {} # username -> pool Future for profiles being scraped by the workers
+
+        if args.stream and self.profile_pool:
+            if not self.browser.run(open_search_results, keyword, args.base_url):
+                print(f"Failed to search for videos with keyword '{keyword}'. Skipping.")
+                METRICS.inc('harvester_keywords_total', result='search_failed')
+                return None, None
+            try:
+                users_to_process, profile_futures = stream_users_to_pool(self.browser.driver, self.profile_pool, keyword,
+                                                                         self.creator_keywords, self.has_profile, args,
+                                                                         budget=self.budget, retry_queue=self.retry_queue)
+            except BrowserCrashed:
+                # A half-streamed keyword cannot be resumed in place; the next search gets a fresh browser.
+                self.browser.restart("crash")
+                raise
+        else:
+            video_data_list = self.browser.run(load_search_results, keyword, args)
+            if video_data_list is None:
+                print(f"Failed to search for videos with keyword '{keyword}'. Skipping.")
+                METRICS.inc('harvester_keywords_total', result='search_failed')
+                return None, None
+
+            if not video_data_list:
+                print(f"No video data extracted for keyword '{keyword}'. Skipping.")
+                METRICS.inc('harvester_keywords_total', result='no_results')
+                return None, None
+
+            print(f"Found {len(video_data_list)} video data items for '{keyword}'. Now processing unique users from this data...")
+
+            video_data_list = filter_video_data(video_data_list, args.min_video_likes, args.max_video_likes)
+            users_to_process = collect_users_to_process(video_data_list, keyword, self.creator_keywords, base_url=args.base_url)
+
+        if not users_to_process:
+            print(f"No valid unique usernames found from video data for '{keyword}'.")
+            METRICS.inc('harvester_keywords_total', result='no_results')
+            return None, None
+
+        print(f"Found {len(users_to_process)} unique users to process for bio scraping from keyword '{keyword}'.")
+        for user_info in users_to_process:
+            self.has_profile(user_info['username']) # Reuses profiles still fresh in the profile store
+
+        if self.http_fetcher and not args.stream and load_profiles:
+            for username, profile_page_data in fetch_profiles_over_http(self.http_fetcher, users_to_process, self.profile_results,
+                                                                        args.http_concurrency, budget=self.budget).items():
+                self.record_profile(username, profile_page_data)
+                METRICS.inc('harvester_profiles_total', source='http', result='success')
+
+        if self.profile_pool and not args.stream and load_profiles:
+            pending_users = [user_info for user_info in users_to_process
+                             if user_info['username'] not in self.profile_results
+                             and not (self.retry_queue is not None and self.retry_queue.find('profile', user_info['username']))]
+            if self.budget is not None:
+                if self.budget.exhausted():
+                    pending_users = []
+                elif self.budget.max_profiles is not None:
+                    pending_users = pending_users[:self.budget.max_profiles - self.budget.profiles_loaded]
+            print(f"Queuing {len(pending_users)} new profiles for {args.workers} workers...")
+            for user_info in pending_users:
+                profile_futures[user_info['username']] = self.profile_pool.submit(user_info['profile_url'])
+
+        return users_to_process, profile_futures
+
+    def harvest_keyword(self, keyword):
+        """
+        Searches one keyword and writes a row per creator found.
+        Raises ScrapeError in non-interactive mode if the search fails; failed profiles are parked instead.
+        """
+        print(f"\nProcessing keyword: '{keyword}'")
+        keyword_rows_written = 0
+        users_to_process, profile_futures = self.search_keyword(keyword)
+        if users_to_process is None:
+            return
+
+        for i, user_info in enumerate(users_to_process):
+            username = user_info['username']
+            profile_url = user_info['profile_url']
+
+            print(f"\nProcessing user {i+1}/{len(users_to_process)}: {username} ({profile_url})")
+            self.prefetch_profiles(keyword, users_to_process[i+1:], profile_futures)
+
+            if not profile_url or username == 'N/A':
+                print(f"Skipping user '{username}' due to missing URL or invalid username.")
+                continue
+
+            if self.journal.is_row_done(keyword, username):
+                print(f"Row for {username} under '{keyword}' was written in a previous run. Skipping.")
+                continue
+
+            if self.retry_queue is not None and self.retry_queue.add_context('profile', username, (keyword, user_info)):
+                print(f"Profile of {username} failed earlier in this run; its row for '{keyword}' waits on the retry.")
+                self.unresolved.setdefault(keyword, set()).add(username)
+                continue
+
+            if username in self.profile_results:
+                print(f"Using profile data already scraped for {username} (keywords: {', '.join(self.creator_keywords[username])}).")
+                profile_page_data = self.profile_results[username]
+                METRICS.inc('harvester_profiles_total', source='reused', result='success')
+            elif (self.budget is not None and self.budget.exhausted()
+                  and (username not in profile_futures or profile_futures[username].cancel())):
+                # Profiles a worker already loaded are still used; queued ones are cancelled.
+                print(f"Crawl budget spent; leaving {username} for a later run.")
+                self.unresolved.setdefault(keyword, set()).add(username)
+                continue
+            else:
+                try:
+                    profile_page_data = self.scrape_profile(user_info, profile_futures.get(username))
+                except ScrapeError as e:
+                    self.park_profile(keyword, user_info, e)
+                    continue
+
+            self.write_row(keyword, user_info, profile_page_data)
+            keyword_rows_written += 1
+
+        if self.prefetcher is not None:
+            self.prefetcher.discard()
+        self.output_writer.flush()
+        self.keywords_searched.add(keyword)
+        self.finish_keyword(keyword)
+        print(f"Finished processing users derived from videos for keyword '{keyword}'.")
+        if keyword_rows_written:
+            print(f"{keyword_rows_written} rows for keyword '{keyword}' written to: {', '.join(self.args.sinks)}")
+        else:
+            print(f"No new data collected for keyword '{keyword}'.")
+
+    def scrape_profile(self, user_info, future=None):
+        """
+        Loads one profile, from its pool future if it was queued on the workers, else with the search browser.
+        Raises ScrapeError in non-interactive mode if the profile could not be scraped.
+        """
+        username = user_info['username']
+        if future is not None:
+            source = 'pool'
+            try:
+                profile_page_data = future.result()
+            except ScrapeError:
+                raise
+            except Exception as e:
+                if self.retry_queue is not None:
+                    raise ScrapeError(f"Profile worker failed: {e}")
+                profile_page_data = None
+        elif self.prefetcher is not None:
+            source = 'browser'
+            if not self.prefetcher.is_loading(self.browser.driver, user_info['profile_url']):
+                self.rate_limiter.wait() # Prefetched pages waited for the floor when their tab was opened
+            profile_page_data = self.browser.run(self.prefetcher.scrape, user_info['profile_url'])
+        else:
+            source = 'browser'
+            self.rate_limiter.wait() # Politeness floor between profile visits
+            profile_page_data = self.browser.run(scrape_profile_data, user_info['profile_url'])
+        scraped = bool(profile_page_data) and profile_page_data != empty_profile_data()
+        METRICS.inc('harvester_profiles_total', source=source, result='success' if scraped else 'failure')
+        if self.budget is not None:
+            self.budget.record_profile_load()
+        self.record_profile(username, profile_page_data)
+        return profile_page_data
+
+    def harvest_scheduled(self, keywords, scheduler):
+        """
+        Searches every keyword first, then loads the creators found best first by the
+        scheduler's expected yield (YieldScheduler) until the budget is spent. Each creator is
+        loaded once and gets a row for every keyword that surfaced it. Search failures are
+        parked (non-interactive mode) or skipped, as in the keyword-by-keyword crawl.
+        """
+        pending = {} # username -> [(keyword, user_info), ...] waiting for a row
+        searched = []
+        for keyword in keywords:
+            if self.budget is not None and self.budget.exhausted():
+                break
+            print(f"\nSearching keyword: '{keyword}'")
+            try:
+                users_to_process, _ = self.search_keyword(keyword, load_profiles=False)
+            except ScrapeError as e:
+                if self.retry_queue is None:
+                    print(f"Search for '{keyword}' failed ({e}). Skipping.")
+                    continue
+                self.park_search(keyword, e)
+                continue
+            if users_to_process is None:
+                continue
+            searched.append(keyword)
+            self.keywords_searched.add(keyword)
+            for user_info in users_to_process:
+                username = user_info['username']
+                if not user_info['profile_url'] or username == 'N/A' or self.journal.is_row_done(keyword, username):
+                    continue
+                if self.retry_queue is not None and self.retry_queue.add_context('profile', username, (keyword, user_info)):
+                    self.unresolved.setdefault(keyword, set()).add(username)
+                    continue
+                pending.setdefault(username, []).append((keyword, user_info))
+                self.unresolved.setdefault(keyword, set()).add(username)
+
+        # Creators loaded earlier (other runs, the profile store) cost nothing and go first.
+        for username in [username for username in pending if self.has_profile(username)]:
+            METRICS.inc('harvester_profiles_total', source='reused', result='success')
+            self.write_scheduled_rows(username, pending.pop(username), self.profile_results[username], scheduler)
+
+        queue = YieldQueue(scheduler, pending)
+        print(f"\n{len(queue)} creators to load across {len(searched)} keyword(s), best expected yield first.")
+        while queue:
+            if self.budget is not None and self.budget.exhausted():
+                break
+            username, contexts, expected_yield = queue.pop()
+            keyword, user_info = contexts[0]
+            print(f"\nProcessing user {username} (expected yield {expected_yield:.2f}, "
+                  f"keywords: {', '.join(keyword for keyword, _ in contexts)}; {len(queue)} left)")
+            if self.prefetcher is not None:
+                self.prefetch_profiles(keyword, [upcoming[0][1] for upcoming in queue.peek(self.prefetcher.lookahead)], {})
+            profile_page_data = self.http_fetcher.fetch(user_info['profile_url']) if self.http_fetcher else None
+            if profile_page_data is not None:
+                METRICS.inc('harvester_profiles_total', source='http', result='success')
+                if self.budget is not None:
+                    self.budget.record_profile_load()
+                self.record_profile(username, profile_page_data)
+            else:
+                try:
+                    profile_page_data = self.scrape_profile(user_info)
+                except ScrapeError as e:
+                    self.park_profile(keyword, user_info, e)
+                    if self.retry_queue is not None:
+                        for other_keyword, other_user_info in contexts[1:]:
+                            self.retry_queue.add_context('profile', username, (other_keyword, other_user_info))
+                    else:
+                        # park_profile wrote the first keyword's row without profile data; the others follow.
+                        for other_keyword, other_user_info in contexts[1:]:
+                            self.write_row(other_keyword, other_user_info, empty_profile_data())
+                        for context_keyword, _ in contexts:
+                            self.unresolved.get(context_keyword, set()).discard(username)
+                    continue
+            self.write_scheduled_rows(username, contexts, profile_page_data, scheduler)
+
+        if queue:
+            print(f"{len(queue)} creators were not loaded within the budget; their keywords stay unfinished for a later run.")
+        if self.prefetcher is not None:
+            self.prefetcher.discard()
+        self.output_writer.flush()
+        for keyword in searched:
+            self.finish_keyword(keyword)
+
+    def write_scheduled_rows(self, username, contexts, profile_page_data, scheduler):
+        """Writes a creator's row for each keyword that surfaced it and lets the scheduler learn from it."""
+        for keyword, user_info in contexts:
+            row = self.write_row(keyword, user_info, profile_page_data)
+            scheduler.observe(keyword, user_info, row['emails_found'] != "N/A")
+            self.unresolved.get(keyword, set()).discard(username)
+
+    def prefetch_profiles(self, keyword, upcoming_users, profile_futures):
+        """Starts loading the next profiles of a keyword that will need the browser in background tabs."""
+        if self.prefetcher is None or self.browser.driver is None:
+            return
+        limit = self.prefetcher.lookahead
+        if self.budget is not None:
+            if self.budget.exhausted():
+                return
+            if self.budget.max_profiles is not None:
+                # The current profile takes one more load; tabs past the budget would be wasted visits.
+                limit = min(limit, self.budget.max_profiles - self.budget.profiles_loaded - 1)
+        urls = []
+        for user_info in upcoming_users:
+            if len(urls) >= limit:
+                break
+            username = user_info['username']
+            if (not user_info['profile_url'] or username == 'N/A' or username in profile_futures
+                    or username in self.profile_results or self.journal.is_row_done(keyword, username)
+                    or (self.retry_queue is not None and self.retry_queue.find('profile', username))):
+                continue
+            urls.append(user_info['profile_url'])
+        self.prefetcher.top_up(self.browser.driver, urls, before_open=self.rate_limiter.wait)
+
+    def has_profile(self, username):
+        """
+        True if the profile was loaded earlier in this run or is still fresh in the profile store,
+        in which case the stored data is reused for the rest of the run.
+        """
+        if username in self.profile_results:
+            return True
+        if self.profile_store is None:
+            return False
+        profile_page_data = self.profile_store.get_fresh(username)
+        if profile_page_data is None:
+            return False
+        self.profile_results[username] = profile_page_data
+        return True
+
+    def record_profile(self, username, profile_page_data):
+        """
+        Keeps a loaded profile for the rest of the run. Successful scrapes are also journaled and
+        saved to the profile store; failed ones are not, so a resumed run loads them again.
+        """
+        self.profile_results[username] = profile_page_data
+        if profile_scraped(profile_page_data):
+            self.journal.record_profile(username, profile_page_data)
+        if self.profile_store is not None:
+            self.profile_store.save(username, profile_page_data)
+
+    def write_row(self, keyword, user_info, profile_page_data):
+        row = build_output_row(keyword, user_info, profile_page_data)
+        # Scraped profiles are already journaled, so an unflushed row costs no page load on resume.
+        self.output_writer.write(row)
+        self.creator_rows.setdefault(user_info['username'], row)
+        if self.budget is not None:
+            self.budget.record_row(row)
+        return row
+
+    def finish_keyword(self, keyword):
+        """Journals a keyword as finished once its search is over and no profile of it is waiting for a retry."""
+        if keyword in self.keywords_searched and not self.unresolved.get(keyword):
+            self.output_writer.flush()
+            self.journal.record_keyword(keyword)
+            METRICS.inc('harvester_keywords_total', result='done')
+
+    def park_profile(self, keyword, user_info, error):
+        """
+        Parks a failed profile for a retry. Without a retry queue (interactive mode, e.g. when the
+        browser crashed for good), the creator's row is written without profile data instead.
+        """
+        username = user_info['username']
+        if self.retry_queue is None:
+            print(f"Profile of {username} failed ({error}). Writing its row without profile data.")
+            METRICS.inc('harvester_profiles_total', source='browser', result='failure')
+            self.record_profile(username, empty_profile_data())
+            self.write_row(keyword, user_info, empty_profile_data())
+            return
+        self.unresolved.setdefault(keyword, set()).add(username)
+        if self.retry_queue.park('profile', username, error, context=(keyword, user_info), needs_human=error.needs_human):
+            print(f"Profile of {username} failed ({error}). Parked for a retry later in the run.")
+        else:
+            print(f"Profile of {username} failed ({error}). Set aside for manual attention.")
+
+    def park_search(self, keyword, error):
+        """Parks a failed search for a retry; without a retry queue, the keyword is skipped."""
+        if self.retry_queue is None:
+            print(f"Search for '{keyword}' failed ({error}). Skipping.")
+            METRICS.inc('harvester_keywords_total', result='search_failed')
+            return
+        if self.retry_queue.park('search', keyword, error, needs_human=error.needs_human):
+            print(f"Search for '{keyword}' failed ({error}). Parked for a retry later in the run.")
+        else:
+            print(f"Search for '{keyword}' failed ({error}). Set aside for manual attention.")
+
+    def retry_parked(self, wait=False):
+        """
+        Retries the parked searches and profiles whose backoff has passed.
+        With wait=True, keeps sleeping until the next item is due until the queue is empty.
+        """
+        while len(self.retry_queue):
+            if self.budget is not None and self.budget.exhausted():
+                return
+            due_items = self.retry_queue.due()
+            if not due_items:
+                if not wait:
+                    return
+                delay = self.retry_queue.seconds_until_next()
+                print(f"\n{len(self.retry_queue)} item(s) waiting for a retry. Next attempt in {delay:.0f}s...")
+                with METRICS.timer('retry_backoff_sleep'):
+                    time.sleep(delay)
+                continue
+            for item in due_items:
+                print(f"\nRetrying {item.kind} '{item.key}' (attempt {item.attempts + 1}/{self.retry_queue.max_attempts})...")
+                METRICS.inc('harvester_retries_total', kind=item.kind)
+                if item.kind == 'search':
+                    try:
+                        self.harvest_keyword(item.key)
+                    except ScrapeError as e:
+                        self.park_search(item.key, e)
+                        continue
+                    self.retry_queue.resolve(item)
+                else:
+                    keyword, user_info = item.contexts[0]
+                    try:
+                        profile_page_data = self.scrape_profile(user_info)
+                    except ScrapeError as e:
+                        self.park_profile(keyword, user_info, e)
+                        continue
+                    self.retry_queue.resolve(item)
+                    for keyword, user_info in item.contexts:
+                        if not self.journal.is_row_done(keyword, item.key):
+                            self.write_row(keyword, user_info, profile_page_data)
+                        self.unresolved.get(keyword, set()).discard(item.key)
+                        self.finish_keyword(keyword)
@@ -0,0 +1,91 @@
+# Email extraction engine for creator bios
+# e.g., batch extraction, normalization, TLD validation against the bundled public-suffix table
+
+import os
+import re
+from functools import lru_cache
+
+TLD_FILE = os.path.join(os.path.dirname(__file__), "data", "public_suffix_tlds.txt")
+
+# Candidate addresses; the domain is validated and trimmed afterwards.
+EMAIL_CANDIDATE_REGEX = re.compile(r"(?<![A-Za-z0-9._%+-])([A-Za-z0-9._%+-]+)@([A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+)")
+DOMAIN_LABEL_REGEX = re.compile(r"[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?")
+# Obfuscated separators, e.g. 'me [at] brand (dot) com'. Bare words ('me at brand dot com') are too ambiguous.
+# OBFUSCATED_AT_REGEX is what bios are searched for; starting at the bracket keeps that search cheap.
+OBFUSCATED_AT_REGEX = re.compile(r"[\[({]\s*at\s*[\])}]", re.IGNORECASE)
+OBFUSCATED_AT_SEPARATOR_REGEX = re.compile(r"\s*[\[({]\s*at\s*[\])}]\s*", re.IGNORECASE)
+OBFUSCATED_DOT_SEPARATOR_REGEX = re.compile(r"\s*[\[({]\s*dot\s*[\])}]\s*", re.IGNORECASE)
+
+_valid_tlds = None
+
+def load_tlds(path=TLD_FILE):
+    """Loads the set of valid top-level domains from the bundled public-suffix table."""
+    with open(path, 'r', encoding='utf-8') as tld_file:
+        return frozenset(line.strip().lower() for line in tld_file if line.strip() and not line.startswith('#'))
+
+def valid_tlds():
+    global _valid_tlds
+    if _valid_tlds is None:
+        _valid_tlds = load_tlds()
+    return _valid_tlds
+
+@lru_cache(maxsize=65536)
+def normalize_domain(domain):
+    """
+    Lowercases a candidate domain and trims trailing labels that are not part of it,
+    e.g. 'Brand.co.uk.Thanks' -> 'brand.co.uk'. A capitalized word right after a lowercase
+    label starts the next sentence even if it is a TLD, e.g. 'brand.com.Music' -> 'brand.com'.
+    Returns None if no prefix of at least two labels ends in a known TLD.
+    """
+    labels = domain.rstrip('-').split('.')
+    while len(labels) > 2 and labels[-1][:1].isupper() and not labels[-1].isupper() and labels[-2].islower():
+        labels.pop()
+    labels = [label.lower() for label in labels]
+    tlds = valid_tlds()
+    while len(labels) >= 2:
+        if labels[-1] in tlds and all(DOMAIN_LABEL_REGEX.fullmatch(label) for label in labels):
+            return '.'.join(labels)
+        labels.pop()
+    return None
+
+def normalize_email(local_part, domain):
+    """Returns the normalized, lowercase address, or None if it is not a valid email."""
+    local_part = local_part.strip('.')
+    if not local_part or len(local_part) > 64 or '..' in local_part:
+        return None
+    domain = normalize_domain(domain)
+    if not domain:
+        return None
+    return f"{local_part.lower()}@{domain}"
+
+def deobfuscate(text):
+    """Turns bracketed [at] / (dot) separators into '@' and '.', e.g. 'me [at] brand (dot) com' -> 'me@brand.com'."""
+    return OBFUSCATED_DOT_SEPARATOR_REGEX.sub('.', OBFUSCATED_AT_SEPARATOR_REGEX.sub('@', text))
+
+def extract_emails(text):
+    """
+    Extracts normalized, validated email addresses from one text, including
+    addresses written with bracketed [at] / (dot) separators.
+    Returns a list of unique addresses in order of first appearance.
+    """
+    if not text:
+        return []
+    if OBFUSCATED_AT_REGEX.search(text):
+        text = deobfuscate(text)
+    if '@' not in text:
+        return []
+    emails = []
+    seen = set()
+    for local_part, domain in EMAIL_CANDIDATE_REGEX.findall(text):
+        email = normalize_email(local_part, domain)
+        if email and email not in seen:
+            seen.add(email)
+            emails.append(email)
+    return emails
+
+def extract_emails_batch(texts):
+    """
+    Extracts emails from many texts (e.g., stored bios) in one call.
+    Returns one list of addresses per text, in the same order as texts.
+    """
+    return [extract_emails(text) for text in texts]
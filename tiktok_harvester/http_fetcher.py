@@ -0,0 +1,83 @@
+# Browserless profile fetching over plain HTTP
+# e.g., a pooled keep-alive session, optional asyncio concurrency
+
+import asyncio
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tiktok_harvester.metrics import METRICS
+from tiktok_harvester.profile_data import profile_data_from_user_info, user_info_from_html
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9"
+}
+
+class HttpProfileFetcher:
+    """
+    Fetches profile pages without a browser and parses their embedded hydration data
+    into the same dict shape scrape_profile_data returns.
+    One keep-alive session is shared by all requests, so connections are reused.
+    fetch() returns None when the response lacks the data, so callers can fall back to Selenium.
+    """
+    def __init__(self, proxy_string=None, timeout=15, pool_size=10, rate_limiter=None, headers=None):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        if proxy_string:
+            proxy_url = proxy_string if "://" in proxy_string else f"http://{proxy_string}"
+            self.session.proxies.update({"http": proxy_url, "https": proxy_url})
+
+    def fetch(self, profile_url):
+        """
+        Fetches one profile page over HTTP.
+        Returns the profile data dict, or None if the page could not be fetched or had no profile data.
+        """
+        if self.rate_limiter:
+            self.rate_limiter.wait()
+        with METRICS.timer('http_profile_fetch') as stage:
+            try:
+                response = self.session.get(profile_url, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"HTTP fetch failed for {profile_url}: {e}")
+                stage.fail()
+                return None
+            if response.status_code != 200:
+                print(f"HTTP fetch for {profile_url} returned status {response.status_code}.")
+                stage.fail()
+                return None
+        user_info = user_info_from_html(response.text)
+        METRICS.record_selector('hydration', bool(user_info), page='profile_http')
+        if not user_info:
+            print(f"No embedded profile data in HTTP response for {profile_url}.")
+            return None
+        return profile_data_from_user_info(user_info)
+
+    async def fetch_many_async(self, profile_urls, concurrency=None):
+        """
+        Fetches several profiles concurrently from asyncio, at most `concurrency` at a time.
+        Returns results (profile dict or None) in the same order as profile_urls.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.pool_size)
+
+        async def fetch_one(profile_url):
+            async with semaphore:
+                return await asyncio.to_thread(self.fetch, profile_url)
+
+        return await asyncio.gather(*(fetch_one(profile_url) for profile_url in profile_urls))
+
+    def fetch_many(self, profile_urls, concurrency=None):
+        """Synchronous wrapper around fetch_many_async."""
+        if not profile_urls:
+            return []
+        return asyncio.run(self.fetch_many_async(profile_urls, concurrency))
+
+    def close(self):
+        self.session.close()
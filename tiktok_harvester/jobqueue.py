@@ -0,0 +1,286 @@
+# Lease-based job queue shared by worker processes
+# e.g., keyword searches and profile visits handed out to workers on one or more machines
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+class Job:
+    """
+    One leased unit of work: a keyword search ('search') or a profile visit ('profile').
+    contexts lists what the job feeds, e.g. the [keyword, user_info] pairs that need a row
+    from a profile; the first contexts_done of them have been handled by earlier leases.
+    result holds what an earlier lease already fetched, so a job re-queued only for new
+    contexts does not need another page load.
+    """
+    def __init__(self, row):
+        self.id = row['id']
+        self.kind = row['kind']
+        self.key = row['key']
+        self.payload = json.loads(row['payload']) if row['payload'] else {}
+        self.contexts = json.loads(row['contexts']) if row['contexts'] else []
+        self.contexts_done = row['contexts_done']
+        self.result = json.loads(row['result']) if row['result'] else None
+        self.attempts = row['attempts']
+        self.lease_token = row['lease_token']
+
+    def __repr__(self):
+        return f"Job({self.kind} '{self.key}', attempt {self.attempts})"
+
+class SqliteJobQueue:
+    """
+    Job queue in a SQLite file, safe to share between processes.
+    Delivery is at least once: a leased job is invisible to other workers until its lease
+    runs out (lease_seconds), so a worker must renew the lease with heartbeat() while it works
+    and call complete() or fail() when done. A worker that dies simply stops renewing, and
+    the job is handed to the next worker once the lease expires. Jobs are unique per
+    (kind, key), so a profile queued by several searches is visited once.
+    Failed jobs are retried with exponential backoff up to max_attempts leases in a row, then marked failed.
+    For workers on several machines, the file must be on a filesystem with working file locks.
+    """
+    def __init__(self, path, lease_seconds=120, max_attempts=5, base_delay=30, max_delay=600):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock() # The connection is shared with the heartbeat thread
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT,
+                contexts TEXT NOT NULL DEFAULT '[]',
+                contexts_done INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_token TEXT,
+                lease_expires_at REAL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE (kind, key)
+            )""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, priority, available_at)")
+
+    def _transaction(self):
+        """BEGIN IMMEDIATE takes the write lock up front, so two workers cannot lease the same job."""
+        return _Transaction(self)
+
+    def enqueue(self, kind, key, payload=None, context=None, priority=0):
+        """
+        Adds a job, or attaches context to the existing job for (kind, key).
+        A finished job that gets a new context is queued again; it keeps its result,
+        so the next worker only handles the new context. Returns the job's status.
+        """
+        now = time.time()
+        with self._transaction() as cursor:
+            row = cursor.execute("SELECT id, status, contexts FROM jobs WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+            if row is None:
+                contexts = [context] if context is not None else []
+                cursor.execute("INSERT INTO jobs (kind, key, payload, contexts, priority, created_at, updated_at) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (kind, key, json.dumps(payload or {}, ensure_ascii=False),
+                                json.dumps(contexts, ensure_ascii=False), priority, now, now))
+                return 'queued'
+            contexts = json.loads(row['contexts'])
+            if context is None or context in contexts:
+                return row['status']
+            contexts.append(context)
+            status = 'queued' if row['status'] == 'done' else row['status']
+            cursor.execute("UPDATE jobs SET contexts = ?, status = ?, available_at = CASE WHEN ? = 'done' THEN 0 ELSE available_at END, "
+                           "updated_at = ? WHERE id = ?",
+                           (json.dumps(contexts, ensure_ascii=False), status, row['status'], now, row['id']))
+            return status
+
+    def lease(self, worker_id, kinds=None):
+        """
+        Leases the next available job (highest priority, then oldest) for lease_seconds.
+        Jobs whose lease expired are available again. Returns a Job, or None if nothing is available.
+        """
+        now = time.time()
+        kind_filter = ""
+        params = [now, now]
+        if kinds:
+            kind_filter = f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params += list(kinds)
+        with self._transaction() as cursor:
+            # Jobs whose workers died on every attempt are given up on rather than handed out forever.
+            cursor.execute("UPDATE jobs SET status = 'failed', last_error = 'lease expired on the last attempt', updated_at = ? "
+                           "WHERE status = 'leased' AND lease_expires_at <= ? AND attempts >= ?", (now, now, self.max_attempts))
+            row = cursor.execute("SELECT * FROM jobs WHERE ((status = 'queued' AND available_at <= ?) "
+                                 "OR (status = 'leased' AND lease_expires_at <= ?))" + kind_filter +
+                                 " ORDER BY priority DESC, id LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            token = uuid.uuid4().hex
+            cursor.execute("UPDATE jobs SET status = 'leased', lease_owner = ?, lease_token = ?, lease_expires_at = ?, "
+                           "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                           (worker_id, token, now + self.lease_seconds, now, row['id']))
+            row = cursor.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone()
+        return Job(row)
+
+    def heartbeat(self, job):
+        """Extends the job's lease. Returns False if the lease was lost to another worker."""
+        now = time.time()
+        with self._lock:
+            cursor = self.connection.execute("UPDATE jobs SET lease_expires_at = ?, updated_at = ? "
+                                             "WHERE id = ? AND lease_token = ? AND status = 'leased'",
+                                             (now + self.lease_seconds, now, job.id, job.lease_token))
+        return cursor.rowcount == 1
+
+    def complete(self, job, result=None, contexts_done=None):
+        """
+        Marks the job done, keeping result for later contexts. contexts_done is how many of
+        job.contexts were handled (default: all of them); if more contexts arrived meanwhile,
+        the job is queued again for them. Returns False if the lease was lost to another worker.
+        """
+        now = time.time()
+        if contexts_done is None:
+            contexts_done = len(job.contexts)
+        with self._transaction() as cursor:
+            row = cursor.execute("SELECT contexts FROM jobs WHERE id = ? AND lease_token = ? AND status = 'leased'",
+                                 (job.id, job.lease_token)).fetchone()
+            if row is None:
+                return False
+            status = 'done' if contexts_done >= len(json.loads(row['contexts'])) else 'queued'
+            cursor.execute("UPDATE jobs SET status = ?, result = ?, contexts_done = ?, attempts = 0, available_at = 0, lease_owner = NULL, "
+                           "lease_token = NULL, lease_expires_at = NULL, last_error = NULL, updated_at = ? WHERE id = ?",
+                           (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                            contexts_done, now, job.id))
+        return True
+
+    def fail(self, job, error, retry=True):
+        """
+        Records a failed attempt. The job is queued again after a backoff of
+        base_delay * 2 ** (attempts - 1) seconds (plus up to 20% jitter, capped at max_delay),
+        or marked failed if retry is False or it has used up max_attempts.
+        Returns True if the job will be retried, False if it was marked failed, or None if the
+        lease was lost to another worker, in which case nothing is recorded.
+        """
+        now = time.time()
+        will_retry = retry and job.attempts < self.max_attempts
+        delay = min(self.max_delay, self.base_delay * 2 ** (job.attempts - 1)) * random.uniform(1.0, 1.2)
+        with self._lock:
+            cursor = self.connection.execute("UPDATE jobs SET status = ?, available_at = ?, last_error = ?, lease_owner = NULL, "
+                                             "lease_token = NULL, lease_expires_at = NULL, updated_at = ? "
+                                             "WHERE id = ? AND lease_token = ? AND status = 'leased'",
+                                             ('queued' if will_retry else 'failed', now + delay if will_retry else 0,
+                                              str(error), now, job.id, job.lease_token))
+        if cursor.rowcount != 1:
+            return None
+        return will_retry
+
+    def counts(self):
+        """Number of jobs per kind and status, e.g. {'profile': {'done': 40, 'queued': 3}}."""
+        with self._lock:
+            rows = self.connection.execute("SELECT kind, status, COUNT(*) AS n FROM jobs GROUP BY kind, status").fetchall()
+        counts = {}
+        for row in rows:
+            counts.setdefault(row['kind'], {})[row['status']] = row['n']
+        return counts
+
+    def outstanding(self):
+        """Number of jobs queued or leased, i.e. not yet done or failed."""
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'leased')").fetchone()[0]
+
+    def seconds_until_next(self):
+        """Seconds until a queued job becomes available or a lease expires (None if nothing is outstanding)."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT MIN(CASE WHEN status = 'queued' THEN available_at ELSE lease_expires_at END) "
+                "FROM jobs WHERE status IN ('queued', 'leased')").fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def failed_jobs(self):
+        """The jobs given up on, as dicts for the needs-attention file."""
+        with self._lock:
+            rows = self.connection.execute("SELECT kind, key, attempts, last_error, contexts FROM jobs WHERE status = 'failed'").fetchall()
+        return [{
+            'kind': row['kind'],
+            'key': row['key'],
+            'attempts': row['attempts'],
+            'last_error': row['last_error'],
+            'keywords': sorted({context[0] for context in json.loads(row['contexts']) if isinstance(context, list)})
+        } for row in rows]
+
+    def write_needs_attention(self, path):
+        """Writes the failed jobs as a JSON list, for manual follow-up. Returns the number written."""
+        jobs = self.failed_jobs()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as attention_file:
+            json.dump(jobs, attention_file, indent=2, ensure_ascii=False)
+        return len(jobs)
+
+    def close(self):
+        self.connection.close()
+
+class _Transaction:
+    def __init__(self, queue):
+        self.queue = queue
+
+    def __enter__(self):
+        self.queue._lock.acquire()
+        try:
+            self.queue.connection.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self.queue._lock.release()
+            raise
+        return self.queue.connection.cursor()
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            self.queue.connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        finally:
+            self.queue._lock.release()
+        return False
+
+class LeaseKeeper:
+    """
+    Renews a job's lease from a background thread every interval seconds
+    (default: a third of the lease) while the with-block runs.
+    lost becomes True if another worker took the job over after the lease expired.
+    """
+    def __init__(self, queue, job, interval=None):
+        self.queue = queue
+        self.job = job
+        self.interval = interval or max(1.0, queue.lease_seconds / 3)
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _beat(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.job):
+                    self.lost = True
+                    print(f"Lost the lease on {self.job!r}; another worker has taken it over.")
+                    return
+            except sqlite3.Error as e:
+                print(f"Heartbeat for {self.job!r} failed: {e}")
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._beat, name=f"lease-{self.job.id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._stop.set()
+        self._thread.join()
+        return False
@@ -0,0 +1,90 @@
+# Run journal for crash-safe, resumable runs
+# e.g., which profiles were scraped, which rows were written, which keywords are finished
+
+import json
+import os
+
+from tiktok_harvester.profile_data import profile_scraped
+
+class RunJournal:
+    """
+    Append-only JSON-lines journal of completed work.
+    Every entry is flushed and synced to disk when it is recorded, so a run that
+    crashes or is interrupted can be restarted and skip straight past finished work.
+    Entries:
+        {"event": "profile", "username": ..., "data": {...}}  a successfully scraped profile
+        {"event": "row", "row": {...}}                        an output row written for a keyword
+        {"event": "keyword", "keyword": ...}                  a keyword finished
+    """
+    def __init__(self, path):
+        self.path = path
+        self.profile_results = {} # username -> profile data
+        self.rows = [] # Output rows already written, in order
+        self.rows_done = set() # (keyword, username) pairs already written
+        self.keywords_done = set()
+        self._needs_newline = False # True if the file ends in a line cut short by a crash
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as journal_file:
+            for line in journal_file:
+                self._needs_newline = not line.endswith("\n")
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue # A line cut short by a crash
+                self._apply(entry)
+
+    def _apply(self, entry):
+        event = entry.get("event")
+        if event == "profile":
+            if profile_scraped(entry.get("data")): # Journals of older runs also list failed scrapes
+                self.profile_results[entry["username"]] = entry.get("data")
+        elif event == "row":
+            row = entry["row"]
+            self.rows.append(row)
+            self.rows_done.add((row.get('keyword_searched'), row.get('username')))
+        elif event == "keyword":
+            self.keywords_done.add(entry["keyword"])
+
+    def _append(self, *entries):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as journal_file:
+            if self._needs_newline:
+                journal_file.write("\n")
+                self._needs_newline = False
+            for entry in entries:
+                journal_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        for entry in entries:
+            self._apply(entry)
+
+    def record_profile(self, username, profile_data):
+        self._append({"event": "profile", "username": username, "data": profile_data})
+
+    def record_row(self, row):
+        self._append({"event": "row", "row": row})
+
+    def record_rows(self, rows):
+        """Records a batch of written rows with a single disk sync."""
+        if rows:
+            self._append(*({"event": "row", "row": row} for row in rows))
+
+    def record_keyword(self, keyword):
+        self._append({"event": "keyword", "keyword": keyword})
+
+    def is_row_done(self, keyword, username):
+        return (keyword, username) in self.rows_done
+
+    def reset(self):
+        """Forgets all recorded work and deletes the journal file."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._needs_newline = False
+        self.profile_results = {}
+        self.rows = []
+        self.rows_done = set()
+        self.keywords_done = set()
@@ -0,0 +1,154 @@
+# Browser lifecycle management for long runs
+# e.g., recycling Chrome after N page loads or past a memory cap, restarting it after a crash
+
+import os
+import time
+
+from tiktok_harvester.metrics import METRICS
+from tiktok_harvester.scraper import initialize_driver, close_driver, BrowserCrashed
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+def browser_rss_mb(driver):
+    """
+    Resident memory of the chromedriver process tree (driver and all Chrome processes), in MB.
+    Returns None if psutil is not installed or the processes are gone.
+    """
+    if psutil is None or driver is None:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass # Exited while we were looking
+        return total / (1024 * 1024)
+    except Exception:
+        return None
+
+class ManagedDriver:
+    """
+    Owns one Chrome instance and keeps it healthy over a long run.
+    Work goes through run(func, ...), which calls func(driver, ...):
+    - before the call, the browser is recycled once it has served max_page_loads calls
+      or its process tree uses more than max_rss_mb (needs psutil; 0 disables either check);
+    - if the browser crashes during the call (BrowserCrashed), it is restarted and the
+      call is repeated once, so the work item is not lost.
+    With a user_data_dir in driver_options, each browser keeps its own profile in a
+    subdirectory named after it, since Chrome locks a profile to one running instance.
+    """
+    def __init__(self, driver_options=None, max_page_loads=0, max_rss_mb=0, name="browser", restart_attempts=3):
+        self.driver_options = driver_options or {} # Keyword arguments for initialize_driver
+        self.max_page_loads = max_page_loads
+        self.max_rss_mb = max_rss_mb
+        self.name = name
+        self.restart_attempts = restart_attempts
+        self.driver = None
+        self.page_loads = 0 # Since the current browser started
+        self.total_page_loads = 0
+        self.recycles = 0
+        self.crash_restarts = 0
+        self.last_rss_mb = None
+        self.peak_rss_mb = None
+        self.startup_seconds = [] # Time taken by each browser start
+        if max_rss_mb and psutil is None:
+            print(f"[{name}] Browser memory cap of {max_rss_mb} MB needs psutil (pip install psutil); only the page-load limit applies.")
+
+    def start(self):
+        """Starts the browser. Returns True on success."""
+        driver_options = dict(self.driver_options)
+        if driver_options.get('user_data_dir'):
+            driver_options['user_data_dir'] = os.path.join(driver_options['user_data_dir'], self.name)
+        started = time.monotonic()
+        self.driver = initialize_driver(**driver_options)
+        self.page_loads = 0
+        if self.driver is not None:
+            self.startup_seconds.append(time.monotonic() - started)
+        return self.driver is not None
+
+    def restart(self, reason):
+        """
+        Replaces the browser with a fresh one, trying a few times with a growing pause.
+        reason is 'crash' or a recycle reason. Raises BrowserCrashed if no browser could be started.
+        """
+        self.sample_memory()
+        if self.driver:
+            close_driver(self.driver)
+            self.driver = None
+        METRICS.inc('harvester_browser_restarts_total', browser=self.name, reason=reason.split(':')[0])
+        for attempt in range(1, self.restart_attempts + 1):
+            print(f"[{self.name}] Restarting the browser ({reason}), attempt {attempt}/{self.restart_attempts}...")
+            if self.start():
+                return
+            time.sleep(5 * attempt)
+        raise BrowserCrashed(f"[{self.name}] Could not restart the browser after {self.restart_attempts} attempts.")
+
+    def sample_memory(self):
+        """Measures the browser's memory (None without psutil) and tracks the peak."""
+        rss = browser_rss_mb(self.driver)
+        if rss is not None:
+            self.last_rss_mb = rss
+            self.peak_rss_mb = max(self.peak_rss_mb or 0, rss)
+            METRICS.set_gauge('harvester_browser_rss_mb', round(rss, 1), browser=self.name)
+            METRICS.max_gauge('harvester_browser_peak_rss_mb', round(rss, 1), browser=self.name)
+        return rss
+
+    def recycle_reason(self):
+        """Returns why the browser should be recycled before the next page load, or None."""
+        if self.max_page_loads and self.page_loads >= self.max_page_loads:
+            return f"recycle: {self.page_loads} page loads"
+        rss = self.sample_memory()
+        if self.max_rss_mb and rss is not None and rss > self.max_rss_mb:
+            return f"recycle: {rss:.0f} MB over the {self.max_rss_mb} MB cap"
+        return None
+
+    def run(self, func, *args, **kwargs):
+        """
+        Calls func(driver, *args, **kwargs) as one page load and returns its result.
+        Recycles the browser first if it is due, and restarts it and repeats the call once if it crashes.
+        """
+        if self.driver is None:
+            self.restart("not running")
+        else:
+            reason = self.recycle_reason()
+            if reason:
+                self.recycles += 1
+                self.restart(reason)
+        self.page_loads += 1
+        self.total_page_loads += 1
+        try:
+            return func(self.driver, *args, **kwargs)
+        except BrowserCrashed as e:
+            print(f"[{self.name}] {e}")
+            self.crash_restarts += 1
+            self.restart("crash")
+            self.page_loads += 1
+            self.total_page_loads += 1
+            return func(self.driver, *args, **kwargs)
+
+    def stats(self):
+        """Lifecycle and memory figures for the run summary."""
+        self.sample_memory()
+        return {
+            'browser': self.name,
+            'page_loads': self.total_page_loads,
+            'recycles': self.recycles,
+            'crash_restarts': self.crash_restarts,
+            'starts': len(self.startup_seconds),
+            'first_startup_s': round(self.startup_seconds[0], 2) if self.startup_seconds else None,
+            'avg_startup_s': round(sum(self.startup_seconds) / len(self.startup_seconds), 2) if self.startup_seconds else None,
+            'last_rss_mb': round(self.last_rss_mb, 1) if self.last_rss_mb is not None else None,
+            'peak_rss_mb': round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None
+        }
+
+    def close(self):
+        if self.driver:
+            self.sample_memory()
+            close_driver(self.driver)
+            self.driver = None
@@ -1,173 +1,544 @@
 # Main script to run the TikTok Email Harvester
 
-import time
-import random
+import argparse
 import os # Needed for path operations
-from tiktok_harvester.scraper import (
-    initialize_driver,
-    close_driver,
-    search_tiktok_videos,
-    scroll_and_extract_video_data_via_js,
-    scrape_profile_data
-)
-from tiktok_harvester.utils import extract_emails_from_text, write_to_csv
-
-def main():
+import sys
+from tiktok_harvester.scraper import set_interactive, set_driver_cache, set_recent_videos, ScrapeError, TIKTOK_BASE_URL
+from tiktok_harvester.crawl import HarvestRun, refresh_stale_profiles
+from tiktok_harvester.http_fetcher import HttpProfileFetcher
+from tiktok_harvester.jobqueue import SqliteJobQueue
+from tiktok_harvester.journal import RunJournal
+from tiktok_harvester.lifecycle import ManagedDriver
+from tiktok_harvester.metrics import METRICS
+from tiktok_harvester.network_trace import NETWORK_TRACE
+from tiktok_harvester.pipeline import AsyncPipeline
+from tiktok_harvester.pool import DriverPool, RateLimiter
+from tiktok_harvester.prefetch import TabPrefetcher
+from tiktok_harvester.profile_store import ProfileStore
+from tiktok_harvester.retry import RetryQueue
+from tiktok_harvester.scheduler import CrawlBudget, YieldScheduler
+from tiktok_harvester.selector_registry import SELECTORS
+from tiktok_harvester.timeouts import TIMEOUTS, STAGE_TIMEOUTS
+from tiktok_harvester.sinks import OUTPUT_COLUMNS, SINK_TYPES, SinkGroup, create_sinks
+from tiktok_harvester.utils import write_to_csv, load_config
+from tiktok_harvester.worker import QueueWorker, enqueue_keywords, default_worker_id
+
+OUTPUT_DIR = "tiktok_harvester/output/"
+
+def write_creator_summary(creator_rows, creator_keywords):
+    """
+    Writes one row per creator for the whole run, listing every keyword that hit them.
+    """
+    if not creator_rows:
+        return
+    summary_rows = []
+    for username, row in creator_rows.items():
+        summary_row = {key: value for key, value in row.items() if key != 'keyword_searched'}
+        summary_row['matched_keywords'] = ', '.join(creator_keywords.get(username, []))
+        summary_rows.append(summary_row)
+    headers = ['matched_keywords'] + [header for header in OUTPUT_COLUMNS if header != 'keyword_searched']
+    output_filename = os.path.join(OUTPUT_DIR, "all_keywords_creators.csv")
+    with METRICS.timer('summary_csv_write'):
+        write_to_csv(summary_rows, filename=output_filename, headers=headers)
+    print(f"Combined creator data for all keywords saved to {output_filename}")
+
+# Config values that toggle flags such as non_interactive or stream
+BOOLEAN_WORDS = {'true': True, 'yes': True, 'on': True, 'false': False, 'no': False, 'off': False}
+
+def config_to_argv(settings):
+    """
+    Turns settings from a config file into the equivalent command-line arguments,
+    e.g. {'workers': '2', 'stream': 'true', 'sinks': 'csv, jsonl'} ->
+    ['--workers', '2', '--stream', '--sink', 'csv', '--sink', 'jsonl'].
+    """
+    argv = []
+    for name, value in settings.items():
+        option = "--" + name.replace('_', '-')
+        flag = BOOLEAN_WORDS.get(value.strip().lower())
+        if flag is not None:
+            if flag:
+                argv.append(option)
+        elif name in ('sink', 'sinks'):
+            for sink in value.split(','):
+                argv += ['--sink', sink.strip()]
+        else:
+            argv += [option, value]
+    return argv
+
+def parse_timeout_bounds(text):
+    """
+    Parses --timeout-bounds, e.g. 'profile_extract_wait=4:40, scroll_extract_js=30:600'
+    -> {'profile_extract_wait': (4.0, 40.0), 'scroll_extract_js': (30.0, 600.0)}.
+    Stages not listed keep their bounds from STAGE_TIMEOUTS.
+    """
+    bounds = {}
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        try:
+            stage, limits = item.split('=')
+            floor, ceiling = (float(value) for value in limits.split(':'))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected STAGE=FLOOR:CEILING, got '{item.strip()}'")
+        stage = stage.strip()
+        if stage not in STAGE_TIMEOUTS:
+            raise argparse.ArgumentTypeError(f"unknown stage '{stage}' (stages: {', '.join(STAGE_TIMEOUTS)})")
+        bounds[stage] = (floor, ceiling)
+    return bounds
+
+def parse_args(argv=None):
+    config_parser = argparse.ArgumentParser(add_help=False)
+    config_parser.add_argument("--config", default=None,
+                               help="INI file with a [harvester] section of default settings, named like the "
+                                    "options (e.g. keywords = tech, ai). Command-line options override it.")
+    config_args, _ = config_parser.parse_known_args(argv)
+
+    parser = argparse.ArgumentParser(description="Search TikTok videos by keyword and harvest emails from creator bios.",
+                                     parents=[config_parser])
+    parser.add_argument("--keywords", default=None,
+                        help="Comma-separated search keywords. Prompted for if not given (unless --non-interactive).")
+    parser.add_argument("--proxy", default=None,
+                        help="Proxy for all browsers and HTTP requests, e.g. 127.0.0.1:8080. Prompted for if not given (unless --non-interactive).")
+    parser.add_argument("--non-interactive", action="store_true",
+                        help="Never wait for console input: failed searches and profiles are retried later in the run "
+                             "with backoff, and what still fails (e.g. CAPTCHAs) is listed in the needs-attention file.")
+    parser.add_argument("--retry-attempts", type=int, default=3,
+                        help="In non-interactive mode, attempts per failed search or profile before it needs attention (default: 3).")
+    parser.add_argument("--retry-base-delay", type=float, default=30,
+                        help="In non-interactive mode, seconds before the first retry; doubles with every attempt (default: 30).")
+    parser.add_argument("--retry-max-delay", type=float, default=600,
+                        help="In non-interactive mode, longest wait between two attempts, in seconds (default: 600).")
+    parser.add_argument("--needs-attention", default=os.path.join(OUTPUT_DIR, "needs_attention.json"),
+                        help="Where non-interactive runs list the searches and profiles that need manual attention "
+                             "(default: tiktok_harvester/output/needs_attention.json).")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Run the crawl as an asyncio pipeline (search -> dedupe -> profile fetch -> extract -> sink) "
+                             "with bounded queues, so searching, profile fetching and writing overlap. Profiles are "
+                             "loaded by --workers browsers of their own, plus the HTTP fetcher with --fetcher http.")
+    parser.add_argument("--queue-size", type=int, default=100,
+                        help="In pipeline mode, capacity of each queue between two stages (default: 100).")
+    parser.add_argument("--fetch-concurrency", type=int, default=None,
+                        help="In pipeline mode, profiles fetched at once (default: --workers, plus --http-concurrency with --fetcher http).")
+    parser.add_argument("--extract-workers", type=int, default=1,
+                        help="In pipeline mode, concurrent tasks building output rows and extracting emails (default: 1).")
+    parser.add_argument("--job-queue", default=None,
+                        help="SQLite job queue shared by worker processes, on this or other machines (the file must be "
+                             "on a filesystem with working file locks). Keywords given are queued as search jobs; "
+                             "without --worker, the script exits after queuing them.")
+    parser.add_argument("--worker", action="store_true",
+                        help="With --job-queue, run as a queue worker: lease searches and profiles until the queue has drained.")
+    parser.add_argument("--keep-polling", action="store_true",
+                        help="In worker mode, keep waiting for new jobs once the queue has drained, until interrupted.")
+    parser.add_argument("--worker-id", default=None,
+                        help="Name of this worker in the job queue (default: hostname:pid).")
+    parser.add_argument("--lease-seconds", type=int, default=120,
+                        help="In worker mode, how long a job stays leased without a heartbeat before another worker "
+                             "may take it over (default: 120). Leases are renewed every third of this.")
+    parser.add_argument("--profile-store", default=None,
+                        help="SQLite store of scraped profiles kept across runs, e.g. tiktok_harvester/output/profiles.sqlite. "
+                             "Profiles scraped within --profile-ttl-hours are reused instead of loaded again.")
+    parser.add_argument("--profile-ttl-hours", type=float, default=24,
+                        help="How long a stored profile counts as fresh, in hours (default: 24).")
+    parser.add_argument("--refresh-stale", action="store_true",
+                        help="With --profile-store, first visit again the stored profiles older than the TTL, "
+                             "most followers first. Keywords are optional in this mode.")
+    parser.add_argument("--refresh-limit", type=int, default=None,
+                        help="With --refresh-stale, the most profiles to refresh in this run (default: all stale ones).")
+    parser.add_argument("--bio-changes", default=os.path.join(OUTPUT_DIR, "bio_changes.json"),
+                        help="Where the bios that changed since they were last stored are listed "
+                             "(default: tiktok_harvester/output/bio_changes.json).")
+    parser.add_argument("--schedule", choices=["arrival", "yield"], default="arrival",
+                        help="'arrival' (default) visits each keyword's creators in search result order. 'yield' searches "
+                             "every keyword first, then visits the creators most likely to have an email first "
+                             "(single browser only).")
+    parser.add_argument("--max-profiles", type=int, default=None,
+                        help="Stop loading profiles after this many page loads.")
+    parser.add_argument("--max-minutes", type=float, default=None,
+                        help="Stop loading profiles once the run has taken this many minutes.")
+    parser.add_argument("--target-emails", type=int, default=None,
+                        help="Stop loading profiles once this many creators with an email were found.")
+    parser.add_argument("--recycle-after", type=int, default=250,
+                        help="Restart each browser after this many page loads, so memory does not grow without "
+                             "bound on long runs (default: 250, 0 disables).")
+    parser.add_argument("--max-browser-mb", type=int, default=0,
+                        help="Also restart a browser once its process tree uses more than this much memory, in MB. "
+                             "Needs psutil (default: 0, disabled).")
+    parser.add_argument("--user-data-dir", default=None,
+                        help="Keep Chrome profiles (and their HTTP cache) in this directory between runs, one subdirectory "
+                             "per browser, so static assets are not downloaded again on every start. Cookies persist too.")
+    parser.add_argument("--driver-cache", default=os.path.join(OUTPUT_DIR, "driver_cache.json"),
+                        help="Where the chromedriver path resolved by Selenium Manager is kept between runs "
+                             "(default: tiktok_harvester/output/driver_cache.json, '' disables).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of Chrome instances scraping profiles in parallel (default: 1, no pool).")
+    parser.add_argument("--lookahead", type=int, default=0,
+                        help="With a single browser, keep this many upcoming profiles loading in background tabs "
+                             "while the current one is extracted (default: 0, disabled). Each tab costs browser memory.")
+    parser.add_argument("--max-rate", type=float, default=0.5,
+                        help="Politeness floor: maximum profile visits per second across all workers (default: 0.5). 0 disables the cap.")
+    parser.add_argument("--scroll-floor-ms", type=int, default=500,
+                        help="Politeness floor: minimum time between two scrolls of the search results (default: 500).")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream search results into the profile workers while scrolling continues.")
+    parser.add_argument("--prune-keep", type=int, default=40,
+                        help="In streaming mode, number of most recent result cards kept intact in the page (default: 40, 0 disables pruning).")
+    parser.add_argument("--scroll-idle-timeout-ms", type=int, default=4000,
+                        help="How long to wait for new result cards after a scroll before counting it as idle (default: 4000).")
+    parser.add_argument("--fetcher", choices=["browser", "http"], default="browser",
+                        help="How to load profile pages: 'browser' (Selenium) or 'http' (plain HTTP requests, "
+                             "falling back to the browser when a response lacks the profile data). Default: browser.")
+    parser.add_argument("--http-concurrency", type=int, default=4,
+                        help="Concurrent HTTP profile requests in 'http' fetcher mode (default: 4).")
+    parser.add_argument("--recent-videos", action="store_true",
+                        help="Also read each profile's recent videos grid from the page already loaded, adding median views "
+                             "and posting recency columns (no extra page loads; not available with --fetcher http).")
+    parser.add_argument("--lean", action="store_true",
+                        help="Lean browser mode: headless, 'eager' page loads, and media, images and fonts blocked.")
+    parser.add_argument("--journal", default=os.path.join(OUTPUT_DIR, "run_journal.jsonl"),
+                        help="Run journal of completed profiles and keywords, used to resume an interrupted run "
+                             "(default: tiktok_harvester/output/run_journal.jsonl).")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore and clear the run journal and start over, replacing previous per-keyword CSVs.")
+    parser.add_argument("--min-video-likes", type=int, default=None,
+                        help="Skip creators whose search-result video has fewer likes than this (checked before visiting the profile).")
+    parser.add_argument("--max-video-likes", type=int, default=None,
+                        help="Skip creators whose search-result video has more likes than this (checked before visiting the profile).")
+    parser.add_argument("--base-url", default=TIKTOK_BASE_URL,
+                        help="Site to crawl (default: https://www.tiktok.com). Point it at a local replay server "
+                             "(python -m tiktok_harvester.replay_server) to run offline.")
+    parser.add_argument("--sink", dest="sinks", action="append", choices=SINK_TYPES,
+                        help="Output sink; repeat for several (default: csv). csv writes one file per keyword; "
+                             "jsonl, sqlite and parquet write one typed dataset for the whole run.")
+    parser.add_argument("--batch-size", type=int, default=50,
+                        help="Rows buffered before they are written to the sinks (default: 50).")
+    parser.add_argument("--selectors", default=None,
+                        help="JSON file of {element: [selector, ...]} overriding the built-in candidate selectors, "
+                             "e.g. after a site update (element names are listed in the run report).")
+    parser.add_argument("--breaker-miss-rate", type=float, default=0.8,
+                        help="Share of misses in an element's last 20 lookups that trips its circuit breaker, after "
+                             "which pages get a few seconds for it instead of the full wait (default: 0.8).")
+    parser.add_argument("--breaker-cooldown", type=float, default=120,
+                        help="Seconds a tripped selector breaker stays open before one page is given the full wait again (default: 120).")
+    parser.add_argument("--static-timeouts", action="store_true",
+                        help="Use the fixed default timeouts instead of timeouts learned from observed latencies.")
+    parser.add_argument("--timeout-multiplier", type=float, default=3.0,
+                        help="Learned timeouts are this multiple of the stage's observed p95 latency (default: 3).")
+    parser.add_argument("--timeout-bounds", type=parse_timeout_bounds, default={},
+                        help="Floors and ceilings of learned timeouts in seconds, as STAGE=FLOOR:CEILING pairs separated "
+                             "by commas (defaults: " + ", ".join(f"{stage}={floor:g}:{ceiling:g}" for stage, (_, floor, ceiling, _)
+                                                                  in STAGE_TIMEOUTS.items()) + ").")
+    parser.add_argument("--timeouts-file", default=os.path.join(OUTPUT_DIR, "learned_timeouts.json"),
+                        help="Where the observed latencies are kept between runs "
+                             "(default: tiktok_harvester/output/learned_timeouts.json).")
+    parser.add_argument("--network-trace", type=float, default=0,
+                        help="Share of page loads (0-1) whose network waterfall is captured from Chrome's performance log "
+                             "and summarized per page type in the run report (default: 0, off).")
+    parser.add_argument("--network-trace-file", default=os.path.join(OUTPUT_DIR, "network_trace.json"),
+                        help="Trace of the captured page loads, for chrome://tracing or ui.perfetto.dev "
+                             "(default: tiktok_harvester/output/network_trace.json).")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve live metrics in Prometheus text format at http://127.0.0.1:PORT/metrics during the run.")
+    parser.add_argument("--report", default=os.path.join(OUTPUT_DIR, "run_report.json"),
+                        help="JSON run report with per-stage timings and success/failure counts per stage and selector "
+                             "(default: tiktok_harvester/output/run_report.json).")
+    config_argv = config_to_argv(load_config(config_args.config)) if config_args.config else []
+    args = parser.parse_args(config_argv + (sys.argv[1:] if argv is None else list(argv)))
+    args.sinks = list(dict.fromkeys(args.sinks or ['csv'])) # Sinks from the config and the command line are combined
+    if args.worker and not args.job_queue:
+        parser.error("--worker needs --job-queue.")
+    if args.refresh_stale and not args.profile_store:
+        parser.error("--refresh-stale needs --profile-store.")
+    if not 0 <= args.network_trace <= 1:
+        parser.error("--network-trace takes a share of page loads between 0 and 1, e.g. 0.1.")
+    if args.schedule == "yield" and (args.workers > 1 or args.stream or args.pipeline or args.job_queue):
+        parser.error("--schedule yield needs a single browser (no --workers, --stream, --pipeline or --job-queue).")
+    return args
+
+def print_browser_summary(browser_stats):
+    """Prints startup times, page loads, recycles, crash restarts and memory of every browser used in the run."""
+    if not browser_stats:
+        return
+    print("\nBrowser summary:")
+    for stats in browser_stats:
+        memory = (f"last {stats['last_rss_mb']} MB, peak {stats['peak_rss_mb']} MB"
+                  if stats['peak_rss_mb'] is not None else "memory not measured (pip install psutil)")
+        startup = (f"started {stats['starts']}x, first start {stats['first_startup_s']}s, average {stats['avg_startup_s']}s"
+                   if stats['starts'] else "never started")
+        print(f"  {stats['browser']}: {startup}, {stats['page_loads']} page loads, {stats['recycles']} recycles, "
+              f"{stats['crash_restarts']} crash restarts, {memory}")
+
+def read_keywords(args):
+    """
+    Keywords from --keywords or the config, else from a console prompt
+    (never in non-interactive mode, nor for queue workers, which take keywords from the queue,
+    nor when refreshing stale profiles).
+    """
+    if args.keywords is not None:
+        keywords_input = args.keywords
+    elif args.worker or args.refresh_stale:
+        return []
+    elif args.non_interactive:
+        print("No keywords given. Pass --keywords or set 'keywords' in the config file.")
+        return []
+    else:
+        keywords_input = input("Enter TikTok search keyword(s), separated by commas: ")
+    return [keyword.strip() for keyword in keywords_input.split(',') if keyword.strip()]
+
+def read_proxy(args):
+    """Proxy from --proxy or the config, else asked for on the console (never in non-interactive or worker mode)."""
+    if args.proxy is not None or args.non_interactive or args.worker:
+        return args.proxy or None
+    proxy_to_use = None
+    use_proxy_input = input("Do you want to use a proxy? (yes/no, default: no): ").strip().lower()
+    if use_proxy_input == 'yes' or use_proxy_input == 'y':
+        proxy_input_str = input("Enter proxy (e.g., 127.0.0.1:8080 or http://username:password@ip:port): ").strip()
+        if proxy_input_str:
+            proxy_to_use = proxy_input_str
+        else:
+            print("No proxy string entered. Proceeding without proxy.")
+    return proxy_to_use
+
+def main(argv=None):
+    args = parse_args(argv)
     print("Starting TikTok Email Harvester...")
-    driver = None
+    browser = None
+    profile_pool = None
+    pipeline = None
+    http_fetcher = None
+    output_writer = None
+    run = None
+    retry_queue = None
+    keywords = []
+    metrics_server = None
+    job_queue = None
+    worker = None
+    profile_store = None
+    prefetcher = None
+    budget = None
+    if args.max_profiles is not None or args.max_minutes is not None or args.target_emails is not None:
+        budget = CrawlBudget(args.max_profiles, args.max_minutes * 60 if args.max_minutes is not None else None,
+                             args.target_emails)
+        if args.pipeline or args.worker:
+            print("The crawl budget (--max-profiles, --max-minutes, --target-emails) is not applied with --pipeline or --worker.")
+
+    if args.metrics_port:
+        try:
+            metrics_server = METRICS.start_http_server(args.metrics_port)
+            print(f"Serving metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+        except OSError as e:
+            print(f"Could not start the metrics endpoint on port {args.metrics_port}: {e}")
 
     try:
-        keywords_input = input("Enter TikTok search keyword(s), separated by commas: ")
-        if not keywords_input.strip():
+        SELECTORS.configure(max_miss_rate=args.breaker_miss_rate, cooldown=args.breaker_cooldown)
+        TIMEOUTS.configure(multiplier=args.timeout_multiplier, enabled=not args.static_timeouts, bounds=args.timeout_bounds)
+        if not args.static_timeouts and TIMEOUTS.load(args.timeouts_file):
+            print("Timeouts learned in earlier runs: " +
+                  ", ".join(f"{stage} {entry['timeout_s']}s" for stage, entry in TIMEOUTS.report().items()))
+        if args.selectors:
+            print(f"Selectors overridden from {args.selectors}: {', '.join(SELECTORS.load(args.selectors))}")
+
+        keywords = read_keywords(args)
+        if args.job_queue:
+            job_queue = SqliteJobQueue(args.job_queue, lease_seconds=args.lease_seconds, max_attempts=args.retry_attempts,
+                                       base_delay=args.retry_base_delay, max_delay=args.retry_max_delay)
+            if keywords:
+                added = enqueue_keywords(job_queue, keywords)
+                print(f"Queued {added} new search job(s) in {args.job_queue} ({len(keywords) - added} already there).")
+            if not args.worker:
+                print(f"Job queue status: {job_queue.counts()}")
+                print("Start workers with --job-queue and --worker to crawl them.")
+                return
+        elif not keywords and not args.refresh_stale:
             print("No keywords provided. Exiting.")
             return
-        
-        keywords = [keyword.strip() for keyword in keywords_input.split(',')]
-
-        proxy_to_use = None
-        use_proxy_input = input("Do you want to use a proxy? (yes/no, default: no): ").strip().lower()
-        if use_proxy_input == 'yes' or use_proxy_input == 'y':
-            proxy_input_str = input("Enter proxy (e.g., 127.0.0.1:8080 or http://username:password@ip:port): ").strip()
-            if proxy_input_str:
-                proxy_to_use = proxy_input_str
-            else:
-                print("No proxy string entered. Proceeding without proxy.")
-        
-        driver = initialize_driver(proxy_string=proxy_to_use)
-        if not driver:
+
+        proxy_to_use = read_proxy(args)
+
+        set_recent_videos(args.recent_videos)
+        if args.non_interactive or args.worker:
+            set_interactive(False) # Queue workers retry through the job queue instead
+        if args.non_interactive:
+            retry_queue = RetryQueue(args.retry_attempts, args.retry_base_delay, args.retry_max_delay)
+
+        journal = RunJournal(args.journal)
+        if args.fresh:
+            journal.reset()
+        elif journal.rows or journal.profile_results:
+            print(f"Resuming from {args.journal}: {len(journal.keywords_done)} keyword(s) finished, "
+                  f"{len(journal.profile_results)} profiles scraped, {len(journal.rows)} rows written.")
+
+        # Rows are journaled only once their batch is in every sink.
+        output_writer = SinkGroup(create_sinks(args.sinks, OUTPUT_DIR, overwrite=args.fresh),
+                                  batch_size=args.batch_size, on_flush=journal.record_rows)
+
+        set_driver_cache(args.driver_cache)
+        driver_options = {'proxy_string': proxy_to_use, 'lean': args.lean, 'user_data_dir': args.user_data_dir,
+                          'network_log': args.network_trace > 0}
+        NETWORK_TRACE.configure(args.network_trace)
+        lifecycle = {'max_page_loads': args.recycle_after, 'max_rss_mb': args.max_browser_mb}
+        browser = ManagedDriver(driver_options, name="search-browser", **lifecycle)
+        if not browser.start():
             print("Failed to initialize WebDriver. Exiting.")
             return
 
-        for keyword in keywords:
-            print(f"\nProcessing keyword: '{keyword}'")
-            current_keyword_data = [] # Data for the current keyword
-            
-            if not search_tiktok_videos(driver, keyword):
-                print(f"Failed to search for videos with keyword '{keyword}'. Skipping.")
-                continue
-
-            print(f"Successfully navigated to video search results for '{keyword}'.")
-            print("Now executing JavaScript to scroll and extract video data (usernames, likes, video URLs)...")
-            
-            print("Waiting 5 seconds for page to settle before executing JS...")
-            time.sleep(5) # Give page a bit more time to settle
-            
-            video_data_list = scroll_and_extract_video_data_via_js(driver)
-
-            if not video_data_list:
-                print(f"No video data extracted for keyword '{keyword}'. Skipping.")
-                continue
-
-            print(f"Found {len(video_data_list)} video data items for '{keyword}'. Now processing unique users from this data...")
-
-            unique_usernames = set()
-            users_to_process = []
-            for video_item in video_data_list:
-                creator_username = video_item.get('username')
-                if creator_username and creator_username != 'N/A' and creator_username not in unique_usernames:
-                    unique_usernames.add(creator_username)
-                    users_to_process.append({
-                        'username': creator_username,
-                        'profile_url': f"https://www.tiktok.com/@{creator_username}",
-                        'related_video_url': video_item.get('videoUrl', 'N/A'),
-                        'related_video_likes': video_item.get('likeCount', 'N/A')
-                    })
-            
-            if not users_to_process:
-                print(f"No valid unique usernames found from video data for '{keyword}'.")
-                continue
-
-            print(f"Found {len(users_to_process)} unique users to process for bio scraping from keyword '{keyword}'.")
-
-            for i, user_info in enumerate(users_to_process):
-                username = user_info['username']
-                profile_url = user_info['profile_url']
-                
-                print(f"\nProcessing user {i+1}/{len(users_to_process)}: {username} ({profile_url})")
-
-                if not profile_url or username == 'N/A':
-                    print(f"Skipping user '{username}' due to missing URL or invalid username.")
+        rate_limiter = RateLimiter(args.max_rate)
+        if args.fetcher == "http":
+            http_fetcher = HttpProfileFetcher(proxy_string=proxy_to_use, pool_size=args.http_concurrency,
+                                              rate_limiter=rate_limiter)
+        if (args.workers > 1 or args.stream) and not (args.pipeline or args.worker):
+            # Streaming needs the search browser to stay on the results page,
+            # so profiles always go to separate worker browsers.
+            profile_pool = DriverPool(max(args.workers, 1), driver_options=driver_options, rate_limiter=rate_limiter,
+                                      http_fetcher=http_fetcher if args.stream else None, lifecycle=lifecycle)
+            if not profile_pool.start():
+                print("No profile workers could be started. Falling back to the search browser for profiles.")
+                profile_pool.close()
+                profile_pool = None
+
+        if args.profile_store:
+            profile_store = ProfileStore(args.profile_store, ttl_seconds=args.profile_ttl_hours * 3600)
+            print(f"Using the profile store {args.profile_store} ({len(profile_store)} profiles, "
+                  f"fresh for {args.profile_ttl_hours:g} hours).")
+            if args.refresh_stale:
+                refresh_stale_profiles(profile_store, browser, rate_limiter, base_url=args.base_url,
+                                       limit=args.refresh_limit, http_fetcher=http_fetcher)
+                if not keywords and not args.worker:
+                    return
+
+        if args.worker:
+            worker = QueueWorker(job_queue, args, browser, output_writer, rate_limiter, http_fetcher=http_fetcher,
+                                 worker_id=args.worker_id or default_worker_id(), profile_store=profile_store)
+            worker.run(keep_polling=args.keep_polling)
+            if job_queue.failed_jobs():
+                count = job_queue.write_needs_attention(args.needs_attention)
+                print(f"\n{count} job(s) in the queue have failed; see {args.needs_attention}.")
+            print(f"Job queue status: {job_queue.counts()}")
+            return
+
+        if args.lookahead > 0:
+            if profile_pool or args.pipeline:
+                print("--lookahead only applies when a single browser scrapes the profiles. Ignoring it.")
+            else:
+                prefetcher = TabPrefetcher(args.lookahead)
+
+        run = HarvestRun(args, browser, journal, output_writer, rate_limiter, http_fetcher=http_fetcher,
+                         profile_pool=profile_pool, retry_queue=retry_queue, profile_store=profile_store,
+                         prefetcher=prefetcher, budget=budget)
+
+        if args.pipeline:
+            pipeline = AsyncPipeline(run, driver_options=driver_options, lifecycle=lifecycle, profile_browsers=args.workers,
+                                     queue_size=args.queue_size, fetch_concurrency=args.fetch_concurrency,
+                                     http_concurrency=args.http_concurrency, extract_workers=args.extract_workers)
+            pipeline.start()
+            pipeline.harvest(keywords)
+        elif args.schedule == "yield":
+            scheduler = YieldScheduler()
+            scheduler.learn_from_rows(journal.rows) # Email hit rates of earlier runs
+            for keyword in keywords:
+                if keyword in journal.keywords_done:
+                    print(f"\nKeyword '{keyword}' was finished in a previous run. Skipping.")
+            run.harvest_scheduled([keyword for keyword in keywords if keyword not in journal.keywords_done], scheduler)
+        else:
+            for keyword in keywords:
+                if keyword in journal.keywords_done:
+                    print(f"\nKeyword '{keyword}' was finished in a previous run. Skipping.")
                     continue
-                
-                delay = 2 # Fixed 2-second delay
-                print(f"Waiting for {delay} seconds before visiting profile...")
-                time.sleep(delay)
-
-                profile_page_data = scrape_profile_data(driver, profile_url)
-                
-                bio_text = "N/A"
-                emails_found = []
-                profile_following = "N/A"
-                profile_followers = "N/A"
-                profile_likes = "N/A"
-
-                if profile_page_data:
-                    bio_text = profile_page_data.get("bio_text", "N/A")
-                    profile_following = profile_page_data.get("following_count", "N/A")
-                    profile_followers = profile_page_data.get("followers_count", "N/A")
-                    profile_likes = profile_page_data.get("likes_count", "N/A")
-
-                    if bio_text and bio_text != "N/A":
-                        emails_found = extract_emails_from_text(bio_text)
-                        if emails_found:
-                            print(f"Emails found for {username}: {', '.join(emails_found)}")
-                        else:
-                            print(f"No emails found in bio for {username}.")
+                if budget is not None and budget.exhausted():
+                    print(f"\nCrawl budget spent. Keyword '{keyword}' is left for a later run.")
+                    continue
+                try:
+                    run.harvest_keyword(keyword)
+                except ScrapeError as e:
+                    if retry_queue is not None:
+                        run.park_search(keyword, e)
                     else:
-                        print(f"No bio text retrieved for {username}.")
-                else:
-                    print(f"Could not retrieve any profile page data for {username}.")
-                
-                current_keyword_data.append({ # Changed from all_collected_data
-                    'keyword_searched': keyword,
-                    'username': username,
-                    'profile_url': profile_url,
-                    'source_video_url': user_info.get('related_video_url', 'N/A'),
-                    'source_video_likes': user_info.get('related_video_likes', 'N/A'),
-                    'bio_text': bio_text,
-                    'emails_found': ', '.join(emails_found) if emails_found else "N/A",
-                    'profile_following_count': profile_following,
-                    'profile_followers_count': profile_followers,
-                    'profile_likes_count': profile_likes
-                })
-            
-            print(f"Finished processing users derived from videos for keyword '{keyword}'.")
-
-            # Save data for the current keyword
-            if current_keyword_data:
-                # Sanitize keyword for filename
-                safe_keyword_filename = "".join(c if c.isalnum() or c in (' ', '_') else '' for c in keyword).rstrip().replace(' ', '_')
-                if not safe_keyword_filename:
-                    safe_keyword_filename = "untitled_keyword_search" # Fallback filename
-                
-                # Ensure output directory exists (though utils.write_to_csv also does this)
-                output_dir = "tiktok_harvester/output/"
-                os.makedirs(output_dir, exist_ok=True)
-                
-                output_filename = os.path.join(output_dir, f"{safe_keyword_filename}.csv")
-                
-                headers = [
-                    'keyword_searched', 'username', 'profile_url', 
-                    'source_video_url', 'source_video_likes', 
-                    'bio_text', 'emails_found', 
-                    'profile_following_count', 'profile_followers_count', 'profile_likes_count'
-                ]
-                write_to_csv(current_keyword_data, filename=output_filename, headers=headers)
-                print(f"Data for keyword '{keyword}' saved to {output_filename}")
-            else:
-                print(f"No data collected for keyword '{keyword}' to save.")
-        
+                        print(f"Search for '{keyword}' failed ({e}). Skipping.")
+                if retry_queue is not None:
+                    run.retry_parked() # Items whose backoff has passed, without waiting for the rest
+
+        if retry_queue is not None:
+            run.retry_parked(wait=True)
+            output_writer.flush()
+            if retry_queue.needs_attention:
+                count = retry_queue.write_needs_attention(args.needs_attention)
+                print(f"\n{count} search(es)/profile(s) need manual attention; see {args.needs_attention}. "
+                      "Rerun with the same keywords after resolving them to pick them up.")
+
         print("\nAll keywords processed.")
+        print(f"Visited {len(run.profile_results)} unique profiles across {len(keywords)} keyword(s).")
+        write_creator_summary(run.creator_rows, run.creator_keywords)
 
     except KeyboardInterrupt:
         print("\nProcess interrupted by user (Ctrl+C).")
     except Exception as e:
         print(f"An unexpected error occurred in the main process: {e}")
     finally:
-        if driver:
+        browser_stats = []
+        if output_writer:
+            output_writer.close()
+        if http_fetcher:
+            http_fetcher.close()
+        if profile_pool:
+            browser_stats += profile_pool.browser_stats()
+            print("Closing profile worker pool...")
+            profile_pool.close()
+        if pipeline:
+            browser_stats += pipeline.browser_stats()
+            print("Closing pipeline browsers...")
+            pipeline.close()
+        if browser:
+            browser_stats.insert(0, browser.stats())
             print("Closing WebDriver...")
-            close_driver(driver)
+            browser.close()
+        print_browser_summary(browser_stats)
+        if not args.static_timeouts:
+            try:
+                TIMEOUTS.save(args.timeouts_file)
+            except OSError as e:
+                print(f"Could not save the learned timeouts to {args.timeouts_file}: {e}")
+        if NETWORK_TRACE.pages:
+            try:
+                count = NETWORK_TRACE.save(args.network_trace_file)
+                print(f"Network waterfall of {count} sampled page load(s) written to {args.network_trace_file}.")
+            except OSError as e:
+                print(f"Could not write the network trace to {args.network_trace_file}: {e}")
+        if job_queue:
+            job_queue.close()
+        if profile_store:
+            if profile_store.changes:
+                try:
+                    count = profile_store.write_changes(args.bio_changes)
+                    print(f"{count} bio(s) changed since they were last stored; see {args.bio_changes}.")
+                except OSError as e:
+                    print(f"Could not write the bio changes to {args.bio_changes}: {e}")
+            profile_store.close()
+        try:
+            METRICS.write_report(args.report, extra={'run': {
+                'keywords': keywords,
+                'unique_profiles': len(run.profile_results) if run else 0,
+                'creators_with_rows': len(run.creator_rows) if run else 0,
+                'browsers': browser_stats,
+                'needs_attention': [item.to_dict() for item in retry_queue.needs_attention.values()] if retry_queue is not None else [],
+                'sinks': args.sinks,
+                'workers': args.workers,
+                'fetcher': args.fetcher,
+                'prefetch': prefetcher.stats() if prefetcher else None,
+                'schedule': args.schedule,
+                'budget': budget.stats() if budget else None,
+                'selectors': SELECTORS.report(),
+                'timeouts': TIMEOUTS.report(),
+                'network': NETWORK_TRACE.report() if args.network_trace else None,
+                'profile_store': {'path': args.profile_store, 'fresh_hits': profile_store.hits,
+                                  'bio_changes': len(profile_store.changes)} if profile_store else None,
+                'worker': {'id': worker.worker_id, 'jobs_done': worker.jobs_done, 'jobs_failed': worker.jobs_failed,
+                           'rows_written': worker.rows_written} if worker else None
+            }})
+            print(f"Run report written to {args.report}")
+        except OSError as e:
+            print(f"Could not write the run report to {args.report}: {e}")
+        if metrics_server:
+            metrics_server.shutdown()
         print("TikTok Email Harvester finished.")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
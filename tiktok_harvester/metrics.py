@@ -0,0 +1,226 @@
+# Run metrics for the TikTok Harvester
+# e.g., per-stage counters and latency histograms, a Prometheus-style endpoint, the JSON run report
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Latency histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers (0.0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+class Histogram:
+    """Cumulative-bucket latency histogram that also keeps the most recent samples for percentiles."""
+    def __init__(self, buckets=DEFAULT_BUCKETS, max_samples=2000):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=max_samples)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+
+class StageOutcome:
+    """Handed out by MetricsRegistry.timer; call fail() when the stage did not succeed without raising."""
+    def __init__(self):
+        self.success = True
+
+    def fail(self):
+        self.success = False
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for key, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+class MetricsRegistry:
+    """
+    Thread-safe store of counters and latency histograms, keyed by metric name and labels.
+    Stage timings go to the 'harvester_stage_seconds' histogram and success/failure counts to
+    'harvester_stage_total'; selector lookups go to 'harvester_selector_lookups_total'.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {} # (name, label_key) -> value
+        self.histograms = {} # (name, label_key) -> Histogram
+        self.gauges = {} # (name, label_key) -> value
+        self.started_at = time.time()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def max_gauge(self, name, value, **labels):
+        """Keeps the highest value seen, e.g. for peak memory."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            if value > self.gauges.get(key, float('-inf')):
+                self.gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def record_stage(self, stage, seconds, success=True):
+        self.observe('harvester_stage_seconds', seconds, stage=stage)
+        self.inc('harvester_stage_total', stage=stage, result='success' if success else 'failure')
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Times a block as one run of the given stage. The block counts as a failure
+        if it raises or calls fail() on the yielded outcome.
+        """
+        outcome = StageOutcome()
+        started = time.perf_counter()
+        try:
+            yield outcome
+        except BaseException:
+            outcome.fail()
+            raise
+        finally:
+            self.record_stage(stage, time.perf_counter() - started, outcome.success)
+
+    def record_selector(self, selector, hit, page="", amount=1):
+        """Counts lookups of a selector (or other data source such as the hydration JSON) that found or missed their target."""
+        if amount:
+            self.inc('harvester_selector_lookups_total', amount, selector=selector, page=page, result='hit' if hit else 'miss')
+
+    def render_prometheus(self):
+        """Renders all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+        for kind, items in (("counter", counters), ("gauge", gauges)):
+            typed = set()
+            for (name, label_key), value in items:
+                if name not in typed:
+                    lines.append(f"# TYPE {name} {kind}")
+                    typed.add(name)
+                lines.append(f"{name}{_format_labels(label_key)} {value}")
+        typed = set()
+        for (name, label_key), histogram in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for bound, bucket_count in zip(histogram.buckets, histogram.bucket_counts):
+                lines.append(f"{name}_bucket{_format_labels(label_key, [('le', bound)])} {bucket_count}")
+            lines.append(f"{name}_bucket{_format_labels(label_key, [('le', '+Inf')])} {histogram.count}")
+            lines.append(f"{name}_sum{_format_labels(label_key)} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{_format_labels(label_key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        """Summarizes the run: per-stage latency and success/failure counts, per-selector hit rates, counters and gauges."""
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = dict(self.histograms)
+        stages = {}
+        for (name, label_key), histogram in histograms.items():
+            if name != 'harvester_stage_seconds':
+                continue
+            stage = dict(label_key)['stage']
+            samples = list(histogram.samples)
+            stages[stage] = {
+                'count': histogram.count,
+                'success': counters.get(('harvester_stage_total', _label_key({'stage': stage, 'result': 'success'})), 0),
+                'failure': counters.get(('harvester_stage_total', _label_key({'stage': stage, 'result': 'failure'})), 0),
+                'total_s': round(histogram.sum, 3),
+                'mean_s': round(histogram.sum / histogram.count, 3) if histogram.count else 0.0,
+                'p50_s': round(percentile(samples, 0.5), 3),
+                'p95_s': round(percentile(samples, 0.95), 3),
+                'max_s': round(max(samples), 3) if samples else 0.0
+            }
+        selectors = {}
+        other_counters = {}
+        for (name, label_key), value in counters.items():
+            labels = dict(label_key)
+            if name == 'harvester_selector_lookups_total':
+                key = f"{labels.get('page')}:{labels['selector']}" if labels.get('page') else labels['selector']
+                entry = selectors.setdefault(key, {'hit': 0, 'miss': 0})
+                entry[labels['result']] += value
+            elif name != 'harvester_stage_total':
+                other_counters[name + _format_labels(label_key)] = value
+        for entry in selectors.values():
+            lookups = entry['hit'] + entry['miss']
+            entry['hit_rate'] = round(entry['hit'] / lookups, 3) if lookups else None
+        return {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            'duration_s': round(time.time() - self.started_at, 3),
+            'stages': stages,
+            'selectors': selectors,
+            'counters': other_counters,
+            'gauges': {name + _format_labels(label_key): value for (name, label_key), value in gauges.items()}
+        }
+
+    def write_report(self, path, extra=None):
+        """Writes the JSON run report (plus any extra top-level fields) to path."""
+        report = self.report()
+        if extra:
+            report.update(extra)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2, default=str)
+        return report
+
+    def start_http_server(self, port, host="127.0.0.1"):
+        """Serves the metrics in Prometheus text format at http://host:port/metrics from a background thread."""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        return server
+
+# Process-wide registry used by the scraper, pool, fetchers and sinks
+METRICS = MetricsRegistry()
@@ -0,0 +1,223 @@
+# Network waterfall capture for sampled page loads, from Chrome's performance log
+# e.g., bytes, requests and critical-path timing per page type, written as a trace viewable in Perfetto
+
+import json
+import os
+import random
+import threading
+from urllib.parse import urlparse
+
+from tiktok_harvester.metrics import METRICS, percentile
+
+# Network events read from the performance log; the rest are ignored
+NETWORK_METHODS = {'Network.requestWillBeSent', 'Network.responseReceived',
+                   'Network.loadingFinished', 'Network.loadingFailed'}
+
+def read_network_events(driver):
+    """Drains the browser's performance log and returns its Network events as (method, params) pairs."""
+    events = []
+    for entry in driver.get_log('performance'):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        if message.get('method') in NETWORK_METHODS:
+            events.append((message['method'], message.get('params') or {}))
+    return events
+
+# Request phases as (name, start, end) fields of Chrome's ResourceTiming, in ms after its requestTime.
+# 'ssl' lies within 'connect'; 'wait' is the time to first byte.
+TIMING_PHASES = [('dns', 'dnsStart', 'dnsEnd'), ('connect', 'connectStart', 'connectEnd'), ('ssl', 'sslStart', 'sslEnd'),
+                 ('send', 'sendStart', 'sendEnd'), ('wait', 'sendEnd', 'receiveHeadersEnd')]
+
+def _new_request(params):
+    return {'url': params['request']['url'], 'type': params.get('type', 'Other'), 'start': params.get('timestamp'),
+            'end': None, 'status': None, 'bytes': 0, 'cached': False, 'failed': None, 'timing': None}
+
+def build_requests(events):
+    """
+    Folds Network events into one dict per request: url, type, status, bytes, cached,
+    failure, start/end (seconds, browser monotonic clock) and the response's raw ResourceTiming.
+    Each redirect hop counts as a request of its own.
+    """
+    requests = {}
+    for method, params in events:
+        request_id = params.get('requestId')
+        if method == 'Network.requestWillBeSent':
+            if request_id in requests and params.get('redirectResponse'):
+                hop = requests.pop(request_id)
+                hop.update(end=params.get('timestamp'), status=params['redirectResponse'].get('status'))
+                requests[f"{request_id}:{len(requests)}"] = hop
+            requests.setdefault(request_id, _new_request(params))
+            continue
+        request = requests.get(request_id)
+        if request is None:
+            continue
+        if method == 'Network.responseReceived':
+            response = params.get('response') or {}
+            request['status'] = response.get('status')
+            request['cached'] = bool(response.get('fromDiskCache') or response.get('fromServiceWorker'))
+            request['timing'] = response.get('timing')
+        elif method == 'Network.loadingFinished':
+            request['end'] = params.get('timestamp')
+            request['bytes'] = params.get('encodedDataLength') or 0
+        elif method == 'Network.loadingFailed':
+            request['end'] = params.get('timestamp')
+            request['failed'] = params.get('blockedReason') or params.get('errorText') or 'failed'
+    return [request for request in requests.values() if request['start'] is not None]
+
+def request_phases(request):
+    """
+    The phases of a request as (name, start in seconds, duration in ms), skipping those that
+    did not happen (e.g. no DNS lookup on a reused connection), then the download.
+    """
+    timing = request['timing']
+    if not timing:
+        return []
+    phases = []
+    for name, start, end in TIMING_PHASES:
+        if timing.get(start, -1) >= 0 and timing.get(end, -1) > timing[start]:
+            phases.append((name, timing['requestTime'] + timing[start] / 1000, timing[end] - timing[start]))
+    headers_at = timing['requestTime'] + timing.get('receiveHeadersEnd', 0) / 1000
+    if request['end'] is not None and request['end'] > headers_at:
+        phases.append(('download', headers_at, (request['end'] - headers_at) * 1000))
+    return phases
+
+def summarize_page(requests):
+    """Totals for one page load, including the main document's phases (the start of the critical path)."""
+    if not requests:
+        return None
+    started = min(request['start'] for request in requests)
+    finished = max(request['end'] or request['start'] for request in requests)
+    documents = [request for request in requests if request['type'] == 'Document']
+    document = max(documents, key=lambda request: request['start']) if documents else requests[0] # After redirects
+    first_byte_ms = None
+    if document['timing']:
+        first_byte_ms = round((document['timing']['requestTime'] + document['timing'].get('receiveHeadersEnd', 0) / 1000
+                               - started) * 1000, 1)
+    bytes_by_type = {}
+    for request in requests:
+        bytes_by_type[request['type']] = bytes_by_type.get(request['type'], 0) + request['bytes']
+    slowest = sorted(requests, key=lambda request: (request['end'] or request['start']) - request['start'], reverse=True)[:5]
+    return {
+        'requests': len(requests),
+        'bytes': sum(request['bytes'] for request in requests),
+        'cached': sum(1 for request in requests if request['cached']),
+        'failed': sum(1 for request in requests if request['failed']),
+        'duration_ms': round((finished - started) * 1000, 1),
+        'document_ms': {name: round(ms, 1) for name, _, ms in request_phases(document)},
+        'first_byte_ms': first_byte_ms, # From the first request, redirects included
+        'bytes_by_type': bytes_by_type,
+        'slowest': [{'url': request['url'][:200], 'type': request['type'],
+                     'ms': round(((request['end'] or request['start']) - request['start']) * 1000, 1)}
+                    for request in slowest]
+    }
+
+class NetworkTracer:
+    """
+    Captures the network waterfall of a sample of page loads. Browsers started with
+    network_log=True keep a performance log; begin() drains it right before a navigation
+    and end() reads what the page loaded once the scraper is done with it. Sampled pages
+    are summarized per page type ('search', 'profile') for the run report and kept as
+    trace events (Chrome trace event format) for save().
+    Thread-safe: profile workers trace their pages concurrently.
+    """
+    def __init__(self, sample_rate=0.0, max_pages=200):
+        self._lock = threading.Lock()
+        self.sample_rate = sample_rate
+        self.max_pages = max_pages
+        self.open_pages = {} # id(driver) -> (page_type, url)
+        self.pages = [] # (page_type, url, requests) of the sampled pages, at most max_pages
+        self.summaries = {} # page_type -> list of page summaries
+
+    def configure(self, sample_rate):
+        self.sample_rate = sample_rate
+
+    def begin(self, driver, page_type, url):
+        """Call right before navigating. Decides whether this page load is sampled."""
+        if not self.sample_rate:
+            return
+        with self._lock:
+            self.open_pages.pop(id(driver), None) # An earlier page of this browser that never got to end()
+        try:
+            read_network_events(driver) # Drops what earlier pages logged
+        except Exception:
+            return # The browser was not started with network_log
+        if random.random() < self.sample_rate:
+            with self._lock:
+                self.open_pages[id(driver)] = (page_type, url)
+
+    def end(self, driver):
+        """Call once the page is scraped (or failed). Summarizes the page if it was sampled."""
+        with self._lock:
+            page = self.open_pages.pop(id(driver), None)
+        if page is None:
+            return
+        page_type, url = page
+        try:
+            requests = build_requests(read_network_events(driver))
+        except Exception as e:
+            print(f"Could not read the network log for {url}: {e}")
+            return
+        summary = summarize_page(requests)
+        if summary is None:
+            return
+        METRICS.inc('harvester_traced_pages_total', page=page_type)
+        METRICS.observe('harvester_page_bytes', summary['bytes'], page=page_type)
+        with self._lock:
+            self.summaries.setdefault(page_type, []).append(summary)
+            if len(self.pages) < self.max_pages:
+                self.pages.append((page_type, url, requests))
+
+    def report(self):
+        """Per page type: sampled pages, median and p95 requests, bytes and load duration, and the biggest hosts."""
+        report = {}
+        with self._lock:
+            summaries = {page_type: list(pages) for page_type, pages in self.summaries.items()}
+            pages = list(self.pages)
+        for page_type, page_summaries in summaries.items():
+            bytes_by_host = {}
+            for traced_type, _, requests in pages:
+                if traced_type == page_type:
+                    for request in requests:
+                        host = urlparse(request['url']).netloc or request['url'][:40]
+                        bytes_by_host[host] = bytes_by_host.get(host, 0) + request['bytes']
+            entry = {'pages': len(page_summaries)}
+            for field in ('requests', 'bytes', 'duration_ms', 'first_byte_ms'):
+                values = [summary[field] for summary in page_summaries if summary[field] is not None]
+                entry[f"{field}_p50"] = round(percentile(values, 0.5), 1)
+                entry[f"{field}_p95"] = round(percentile(values, 0.95), 1)
+            entry['failed_requests'] = sum(summary['failed'] for summary in page_summaries)
+            entry['top_hosts_by_bytes'] = dict(sorted(bytes_by_host.items(), key=lambda item: item[1], reverse=True)[:10])
+            report[page_type] = entry
+        return report
+
+    def trace_events(self):
+        """The sampled pages as Chrome trace events: one process per page, one row per request, phases nested."""
+        with self._lock:
+            pages = list(self.pages)
+        events = []
+        for pid, (page_type, url, requests) in enumerate(pages, start=1):
+            events.append({'ph': 'M', 'name': 'process_name', 'pid': pid, 'args': {'name': f"{page_type} {url}"}})
+            for tid, request in enumerate(sorted(requests, key=lambda request: request['start']), start=1):
+                start_us = request['start'] * 1e6
+                end = request['end'] or request['start']
+                args = {'url': request['url'], 'status': request['status'], 'bytes': request['bytes'],
+                        'cached': request['cached'], 'failed': request['failed']}
+                events.append({'ph': 'X', 'cat': request['type'], 'name': request['url'][:120], 'pid': pid, 'tid': tid,
+                               'ts': start_us, 'dur': max(1.0, (end - request['start']) * 1e6), 'args': args})
+                for name, started, ms in request_phases(request):
+                    events.append({'ph': 'X', 'cat': 'phase', 'name': name, 'pid': pid, 'tid': tid,
+                                   'ts': started * 1e6, 'dur': ms * 1000})
+        return events
+
+    def save(self, path):
+        """Writes the sampled pages as a trace file for chrome://tracing or ui.perfetto.dev. Returns the number of pages."""
+        events = self.trace_events()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file)
+        return len(self.pages)
+
+# Process-wide tracer used by the scraper
+NETWORK_TRACE = NetworkTracer()
@@ -0,0 +1,294 @@
+# Asyncio orchestration of a crawl run
+# e.g., search -> dedupe -> profile fetch -> extract -> sink, with bounded queues between the stages
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from tiktok_harvester.crawl import (
+    open_search_results,
+    load_search_results,
+    filter_video_data,
+    collect_users_to_process,
+    build_output_row
+)
+from tiktok_harvester.lifecycle import ManagedDriver
+from tiktok_harvester.metrics import METRICS
+from tiktok_harvester.profile_data import empty_profile_data
+from tiktok_harvester.scraper import scrape_profile_data, stream_video_data_via_js, ScrapeError, BrowserCrashed
+
+class AsyncPipeline:
+    """
+    Runs the crawl of a HarvestRun as five asyncio stages connected by bounded queues:
+
+        search -> dedupe -> profile fetch -> extract -> sink
+
+    A full queue blocks the stage feeding it, so a slow stage holds back the ones before it
+    instead of letting work pile up in memory. Selenium calls run in thread executors: one
+    thread for the search browser, one per profile browser. The fetch stage runs
+    fetch_concurrency profiles at once, trying the HTTP fetcher first (at most http_concurrency
+    requests) and falling back to a free profile browser. All journal and sink writes happen
+    in the sink stage, one at a time.
+    Keywords are journaled as finished once every creator they surfaced has reached the sink.
+    """
+    def __init__(self, run, driver_options=None, lifecycle=None, profile_browsers=1, queue_size=100,
+                 fetch_concurrency=None, http_concurrency=4, extract_workers=1):
+        self.run = run
+        self.args = run.args
+        self.driver_options = driver_options or {}
+        self.lifecycle = lifecycle or {}
+        self.profile_browser_count = max(1, profile_browsers)
+        self.queue_size = queue_size
+        self.fetch_concurrency = fetch_concurrency or (self.profile_browser_count + (http_concurrency if run.http_fetcher else 0))
+        self.http_concurrency = http_concurrency
+        self.extract_workers = max(1, extract_workers)
+        self.stream = self.args.stream
+        self.profile_browsers = []
+        self.search_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-browser")
+        self.profile_executor = None
+        self.pending = {} # keyword -> creators queued but not yet at the sink
+        self.searched = set() # Keywords whose search has finished
+        self.finished = set()
+        self.waiting = {} # username -> (keyword, user_info) sightings waiting on the profile fetch
+
+    def start(self):
+        """Starts the profile browsers. Falls back to the search browser if none start."""
+        for i in range(self.profile_browser_count):
+            browser = ManagedDriver(self.driver_options, name=f"profile-browser-{i+1}", **self.lifecycle)
+            if browser.start():
+                self.profile_browsers.append(browser)
+            else:
+                print(f"Failed to initialize WebDriver for profile browser {i+1}.")
+        if self.profile_browsers:
+            self.profile_executor = ThreadPoolExecutor(max_workers=len(self.profile_browsers), thread_name_prefix="profile-browser")
+        else:
+            print("No profile browsers could be started. The search browser will load profiles too.")
+            if self.stream:
+                # A profile loaded in the search browser would navigate it away from the results it is scrolling.
+                print("Streaming needs a profile browser of its own; each keyword's results are read in full before its profiles instead.")
+                self.stream = False
+        print(f"Pipeline started with {len(self.profile_browsers)} profile browser(s), {self.fetch_concurrency} concurrent "
+              f"profile fetches and queues of {self.queue_size} items.")
+        return len(self.profile_browsers)
+
+    def harvest(self, keywords):
+        """Runs the pipeline over the keywords until every stage has drained."""
+        asyncio.run(self._harvest(keywords))
+
+    async def _harvest(self, keywords):
+        self.dedupe_queue = asyncio.Queue(self.queue_size)
+        self.fetch_queue = asyncio.Queue(self.queue_size)
+        self.extract_queue = asyncio.Queue(self.queue_size)
+        self.sink_queue = asyncio.Queue(self.queue_size)
+        self.http_slots = asyncio.Semaphore(self.http_concurrency)
+        self.free_browsers = asyncio.Queue()
+        for browser in self.profile_browsers or [self.run.browser]:
+            self.free_browsers.put_nowait(browser)
+
+        workers = [asyncio.create_task(self._consume(self.dedupe_queue, self.dedupe))]
+        workers += [asyncio.create_task(self._consume(self.fetch_queue, self.fetch)) for _ in range(self.fetch_concurrency)]
+        workers += [asyncio.create_task(self._consume(self.extract_queue, self.extract)) for _ in range(self.extract_workers)]
+        workers.append(asyncio.create_task(self._consume(self.sink_queue, self.sink)))
+        try:
+            await self.search_stage(keywords)
+            # Each stage hands its items on before marking them done, so joining in order drains the pipeline.
+            for stage_queue in (self.dedupe_queue, self.fetch_queue, self.extract_queue, self.sink_queue):
+                await stage_queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _consume(self, stage_queue, handler):
+        while True:
+            item = await stage_queue.get()
+            try:
+                await handler(item)
+            except Exception as e:
+                print(f"Pipeline stage {handler.__name__} failed on {item!r:.120}: {e}")
+                await self.on_item_error(handler, item)
+            finally:
+                stage_queue.task_done()
+
+    async def on_item_error(self, handler, item):
+        """Keeps the per-keyword counts right when a stage fails on an item."""
+        if handler == self.dedupe or handler == self.extract:
+            await self.put(self.sink_queue, 'sink', ('skipped', item[0]))
+        elif handler == self.fetch:
+            for keyword, _ in self.waiting.pop(item['username'], []):
+                await self.put(self.sink_queue, 'sink', ('skipped', keyword))
+
+    async def put(self, stage_queue, name, item):
+        await stage_queue.put(item)
+        METRICS.set_gauge('harvester_queue_depth', stage_queue.qsize(), queue=name)
+
+    def in_search_thread(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self.search_executor, func, *args)
+
+    # Stage 1: search. One keyword at a time on the search browser.
+    async def search_stage(self, keywords):
+        args = self.args
+        for keyword in keywords:
+            if keyword in self.run.journal.keywords_done:
+                print(f"\nKeyword '{keyword}' was finished in a previous run. Skipping.")
+                continue
+            print(f"\nProcessing keyword: '{keyword}'")
+            keyword_usernames = set()
+            queued = 0
+            try:
+                if self.stream:
+                    if not await self.in_search_thread(self.run.browser.run, open_search_results, keyword, args.base_url):
+                        print(f"Failed to search for videos with keyword '{keyword}'. Skipping.")
+                        METRICS.inc('harvester_keywords_total', result='search_failed')
+                        continue
+                    batches = stream_video_data_via_js(self.run.browser.driver, scroll_floor_ms=args.scroll_floor_ms,
+                                                       idle_timeout_ms=args.scroll_idle_timeout_ms, prune_keep=args.prune_keep)
+                    try:
+                        while True:
+                            batch = await self.in_search_thread(next, batches, None)
+                            if batch is None:
+                                break
+                            queued += await self.enqueue_cards(keyword, batch, keyword_usernames)
+                    except BrowserCrashed:
+                        await self.in_search_thread(self.run.browser.restart, "crash")
+                        raise
+                else:
+                    video_data_list = await self.in_search_thread(self.run.browser.run, load_search_results, keyword, args)
+                    if video_data_list is None:
+                        print(f"Failed to search for videos with keyword '{keyword}'. Skipping.")
+                        METRICS.inc('harvester_keywords_total', result='search_failed')
+                        continue
+                    queued = await self.enqueue_cards(keyword, video_data_list, keyword_usernames)
+            except ScrapeError as e:
+                if self.run.retry_queue is not None:
+                    self.run.park_search(keyword, e)
+                else:
+                    print(f"Search for '{keyword}' failed ({e}). Skipping.")
+                continue # Creators already queued are still processed; the keyword stays unfinished
+            if not queued:
+                print(f"No valid unique usernames found from video data for '{keyword}'.")
+                METRICS.inc('harvester_keywords_total', result='no_results')
+                continue
+            print(f"Search for '{keyword}' done: {queued} creators queued.")
+            await self.put(self.sink_queue, 'sink', ('searched', keyword))
+
+    async def enqueue_cards(self, keyword, video_data_list, keyword_usernames):
+        video_data_list = filter_video_data(video_data_list, self.args.min_video_likes, self.args.max_video_likes)
+        new_users = collect_users_to_process(video_data_list, keyword, self.run.creator_keywords, keyword_usernames,
+                                             base_url=self.args.base_url)
+        for user_info in new_users:
+            self.pending[keyword] = self.pending.get(keyword, 0) + 1
+            await self.put(self.dedupe_queue, 'dedupe', (keyword, user_info))
+        return len(new_users)
+
+    # Stage 2: dedupe. Each creator is fetched once; other sightings wait for that fetch or reuse its result.
+    async def dedupe(self, item):
+        keyword, user_info = item
+        username = user_info['username']
+        run = self.run
+        if not user_info['profile_url'] or username == 'N/A':
+            await self.put(self.sink_queue, 'sink', ('skipped', keyword))
+        elif run.journal.is_row_done(keyword, username):
+            print(f"Row for {username} under '{keyword}' was written in a previous run. Skipping.")
+            await self.put(self.sink_queue, 'sink', ('skipped', keyword))
+        elif run.retry_queue is not None and run.retry_queue.add_context('profile', username, (keyword, user_info)):
+            run.unresolved.setdefault(keyword, set()).add(username)
+            await self.put(self.sink_queue, 'sink', ('skipped', keyword))
+        elif run.has_profile(username):
+            METRICS.inc('harvester_profiles_total', source='reused', result='success')
+            await self.put(self.extract_queue, 'extract', (keyword, user_info, run.profile_results[username]))
+        elif username in self.waiting:
+            self.waiting[username].append((keyword, user_info))
+        else:
+            self.waiting[username] = [(keyword, user_info)]
+            await self.put(self.fetch_queue, 'fetch', user_info)
+
+    # Stage 3: profile fetch. HTTP first when configured, else (or as fallback) a free profile browser.
+    async def fetch(self, user_info):
+        username = user_info['username']
+        run = self.run
+        try:
+            profile_page_data, source = await self.fetch_profile(user_info)
+        except ScrapeError as e:
+            sightings = self.waiting.pop(username, [])
+            if run.retry_queue is None:
+                # As in the sequential crawl, the creator's rows are written without profile data.
+                print(f"Profile of {username} failed ({e}). Writing its rows without profile data.")
+                METRICS.inc('harvester_profiles_total', source='browser', result='failure')
+                run.profile_results[username] = empty_profile_data()
+                for keyword, sighting in sightings:
+                    await self.put(self.extract_queue, 'extract', (keyword, sighting, empty_profile_data()))
+                return
+            for i, (keyword, sighting) in enumerate(sightings):
+                if i == 0:
+                    run.park_profile(keyword, sighting, e)
+                else:
+                    run.retry_queue.add_context('profile', username, (keyword, sighting))
+                    run.unresolved.setdefault(keyword, set()).add(username)
+                await self.put(self.sink_queue, 'sink', ('skipped', keyword))
+            return
+        scraped = bool(profile_page_data) and profile_page_data != empty_profile_data()
+        METRICS.inc('harvester_profiles_total', source=source, result='success' if scraped else 'failure')
+        run.profile_results[username] = profile_page_data
+        if profile_page_data is not None:
+            await self.put(self.sink_queue, 'sink', ('profile', username, profile_page_data))
+        for keyword, sighting in self.waiting.pop(username, []):
+            await self.put(self.extract_queue, 'extract', (keyword, sighting, profile_page_data))
+
+    async def fetch_profile(self, user_info):
+        http_fetcher = self.run.http_fetcher
+        if http_fetcher:
+            async with self.http_slots:
+                profile_page_data = await asyncio.to_thread(http_fetcher.fetch, user_info['profile_url'])
+            if profile_page_data is not None:
+                return profile_page_data, 'http'
+        browser = await self.free_browsers.get()
+        try:
+            executor = self.search_executor if browser is self.run.browser else self.profile_executor
+            profile_page_data = await asyncio.get_running_loop().run_in_executor(
+                executor, self.scrape_in_browser, browser, user_info['profile_url'])
+        finally:
+            self.free_browsers.put_nowait(browser)
+        return profile_page_data, 'browser'
+
+    def scrape_in_browser(self, browser, profile_url):
+        self.run.rate_limiter.wait() # Politeness floor between profile visits
+        return browser.run(scrape_profile_data, profile_url)
+
+    # Stage 4: extract. Emails and the output row.
+    async def extract(self, item):
+        keyword, user_info, profile_page_data = item
+        row = build_output_row(keyword, user_info, profile_page_data)
+        await self.put(self.sink_queue, 'sink', ('row', keyword, row))
+
+    # Stage 5: sink. The only stage that writes to the journal and the output sinks.
+    async def sink(self, message):
+        run = self.run
+        kind, keyword = message[0], message[1]
+        if kind == 'profile':
+            await asyncio.to_thread(run.record_profile, message[1], message[2])
+            return
+        if kind == 'row':
+            row = message[2]
+            await asyncio.to_thread(run.output_writer.write, row)
+            run.creator_rows.setdefault(row['username'], row)
+            self.pending[keyword] -= 1
+        elif kind == 'skipped':
+            self.pending[keyword] -= 1
+        elif kind == 'searched':
+            self.searched.add(keyword)
+        if keyword in self.searched and not self.pending.get(keyword) and keyword not in self.finished:
+            self.finished.add(keyword)
+            run.keywords_searched.add(keyword)
+            await asyncio.to_thread(run.finish_keyword, keyword)
+            print(f"Finished processing users derived from videos for keyword '{keyword}'.")
+
+    def browser_stats(self):
+        return [browser.stats() for browser in self.profile_browsers]
+
+    def close(self):
+        for browser in self.profile_browsers:
+            browser.close()
+        self.profile_browsers = []
+        self.search_executor.shutdown(wait=False)
+        if self.profile_executor:
+            self.profile_executor.shutdown(wait=False)
@@ -0,0 +1,136 @@
+# Worker pool for scraping profiles with several WebDriver instances in parallel
+# e.g., a shared profile queue, a global request-rate cap
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from tiktok_harvester.metrics import METRICS
+from tiktok_harvester.lifecycle import ManagedDriver
+from tiktok_harvester.scraper import scrape_profile_data
+
+class RateLimiter:
+    """
+    Global request-rate cap shared by every worker thread.
+    Hands out at most max_per_second navigation slots per second in total,
+    no matter how many browsers are running.
+    """
+    def __init__(self, max_per_second):
+        self.min_interval = 1.0 / max_per_second if max_per_second and max_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def wait(self):
+        """Blocks the calling thread until its next navigation slot."""
+        if self.min_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            with METRICS.timer('politeness_sleep'):
+                time.sleep(slot - now)
+
+class DriverPool:
+    """
+    A pool of Chrome instances, each owned by one worker thread.
+    Workers take profile URLs from a shared queue and run scrape_profile_data on them.
+    Results are returned in submission order, so output is deterministic
+    regardless of the number of workers.
+    If an http_fetcher is given, workers try it first and only load the page
+    in their browser when the HTTP response lacks the profile data.
+    Each browser is a ManagedDriver; lifecycle holds its recycling limits
+    (max_page_loads, max_rss_mb), and crashed browsers are restarted without losing the profile.
+    """
+    def __init__(self, size, driver_options=None, rate_limiter=None, http_fetcher=None, lifecycle=None):
+        self.size = size
+        self.driver_options = driver_options or {} # Keyword arguments for initialize_driver
+        self.rate_limiter = rate_limiter or RateLimiter(0)
+        self.http_fetcher = http_fetcher
+        self.lifecycle = lifecycle or {} # Keyword arguments for ManagedDriver
+        self._queue = queue.Queue()
+        self._browsers = []
+        self._threads = []
+
+    def start(self):
+        """Starts the browsers and worker threads. Returns the number of workers running."""
+        for i in range(self.size):
+            browser = ManagedDriver(self.driver_options, name=f"profile-worker-{i+1}", **self.lifecycle)
+            if not browser.start():
+                print(f"Failed to initialize WebDriver for worker {i+1}.")
+                continue
+            self._browsers.append(browser)
+            thread = threading.Thread(target=self._worker, args=(browser,), name=f"profile-worker-{i+1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"Profile worker pool started with {len(self._threads)}/{self.size} browser(s).")
+        return len(self._threads)
+
+    def _worker(self, browser):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            future, profile_url = item
+            if not future.set_running_or_notify_cancel():
+                self._queue.task_done()
+                continue
+            try:
+                profile_data = self.http_fetcher.fetch(profile_url) if self.http_fetcher else None
+                if profile_data is None:
+                    self.rate_limiter.wait()
+                    profile_data = browser.run(scrape_profile_data, profile_url)
+                future.set_result(profile_data)
+            except Exception as e:
+                print(f"[{threading.current_thread().name}] Error scraping {profile_url}: {e}")
+                future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, profile_url):
+        """Queues one profile URL. Returns a Future for its profile data."""
+        future = Future()
+        self._queue.put((future, profile_url))
+        return future
+
+    def scrape_profiles(self, profile_urls):
+        """
+        Scrapes all profile URLs across the pool.
+        Returns a list of profile data dicts (None for failures) in the same order as profile_urls.
+        """
+        futures = [self.submit(profile_url) for profile_url in profile_urls]
+        return [self.collect(future) for future in futures]
+
+    @staticmethod
+    def collect(future):
+        """Waits for a submitted profile. Returns its profile data, or None if scraping raised."""
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def close(self):
+        """Cancels queued profiles, stops the worker threads and closes their browsers."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[0].cancel()
+            self._queue.task_done()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        for browser in self._browsers:
+            browser.close()
+        self._threads = []
+        self._browsers = []
+
+    def browser_stats(self):
+        """Lifecycle and memory figures of every worker browser."""
+        return [browser.stats() for browser in self._browsers]
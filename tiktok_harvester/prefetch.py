@@ -0,0 +1,96 @@
+# Lookahead profile prefetching in background tabs of a single browser
+# e.g., the next K profiles load while the current one is extracted, hiding network latency
+
+from tiktok_harvester.metrics import METRICS
+from tiktok_harvester.scraper import scrape_profile_data
+
+class TabPrefetcher:
+    """
+    Keeps up to lookahead upcoming profile pages loading in background tabs of one browser.
+    top_up() opens tabs for the next URLs (calling before_open first, e.g. the rate limiter,
+    so the politeness floor still applies to every page load); scrape() extracts a profile
+    from its tab if it was prefetched, else loads it in the main tab as usual.
+    Tabs belong to one driver: when the browser is recycled or restarted, they are forgotten.
+    """
+    def __init__(self, lookahead=3):
+        self.lookahead = lookahead
+        self.driver = None
+        self.home_handle = None # The main tab, where searches and unprefetched profiles load
+        self.tabs = {} # profile URL -> window handle of the tab loading it
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+    def _attach(self, driver):
+        if driver is not self.driver:
+            self.driver = driver
+            self.home_handle = driver.current_window_handle
+            self.tabs = {}
+
+    def is_loading(self, driver, url):
+        return driver is self.driver and url in self.tabs
+
+    def top_up(self, driver, urls, before_open=None):
+        """Opens background tabs for the first of urls not loading yet, up to lookahead tabs in total."""
+        self._attach(driver)
+        for url in urls:
+            if len(self.tabs) >= self.lookahead:
+                break
+            if url in self.tabs:
+                continue
+            if before_open:
+                before_open()
+            try:
+                driver.switch_to.new_window('tab')
+                self.tabs[url] = driver.current_window_handle
+                # Assigning the location returns at once; driver.get would block until the page loaded.
+                driver.execute_script("window.location.href = arguments[0];", url)
+                METRICS.inc('harvester_prefetch_tabs_total')
+            except Exception as e:
+                print(f"Could not open a prefetch tab for {url}: {e}")
+                break
+            finally:
+                self._switch_home()
+
+    def scrape(self, driver, url):
+        """
+        Scrapes a profile, from its prefetch tab if there is one (the tab is closed afterwards).
+        Used with ManagedDriver.run, like scrape_profile_data.
+        """
+        self._attach(driver)
+        handle = self.tabs.pop(url, None)
+        if handle is None:
+            self.misses += 1
+            METRICS.inc('harvester_prefetch_total', result='miss')
+            return scrape_profile_data(driver, url)
+        self.hits += 1
+        METRICS.inc('harvester_prefetch_total', result='hit')
+        try:
+            driver.switch_to.window(handle)
+            return scrape_profile_data(driver, url, navigate=False)
+        finally:
+            self._close_tab(handle)
+
+    def discard(self, keep_urls=()):
+        """Closes the prefetch tabs of profiles that will not be scraped after all."""
+        for url in [url for url in self.tabs if url not in keep_urls]:
+            self._close_tab(self.tabs.pop(url))
+            self.discarded += 1
+
+    def _close_tab(self, handle):
+        try:
+            if self.driver.current_window_handle != handle:
+                self.driver.switch_to.window(handle)
+            self.driver.close()
+        except Exception:
+            pass # Already gone, e.g. the browser crashed
+        self._switch_home()
+
+    def _switch_home(self):
+        try:
+            self.driver.switch_to.window(self.home_handle)
+        except Exception:
+            pass
+
+    def stats(self):
+        return {'lookahead': self.lookahead, 'hits': self.hits, 'misses': self.misses, 'discarded': self.discarded}
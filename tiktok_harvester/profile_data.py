@@ -0,0 +1,177 @@
+# Helpers for turning the data found on a profile page into the profile dict
+# returned by scrape_profile_data, e.g., from the page's embedded hydration JSON
+
+import json
+import re
+import statistics
+import time
+
+from tiktok_harvester.utils import parse_count
+
+HYDRATION_SCRIPT_REGEXES = [
+    re.compile(r'<script[^>]*id="__UNIVERSAL_DATA_FOR_REHYDRATION__"[^>]*>(.*?)</script>', re.DOTALL),
+    re.compile(r'<script[^>]*id="SIGI_STATE"[^>]*>(.*?)</script>', re.DOTALL)
+]
+
+PROFILE_COUNT_FIELDS = ["following_count", "followers_count", "likes_count", "video_count"]
+
+PROFILE_DEFAULTS = {
+    "bio_text": "N/A",
+    "following_count": "N/A",
+    "followers_count": "N/A",
+    "likes_count": "N/A",
+    "nickname": "N/A",
+    "verified": "N/A",
+    "bio_link": "N/A",
+    "video_count": "N/A"
+}
+
+# Per-creator aggregates of the recent videos grid (see recent_video_stats), emitted as output columns
+RECENT_VIDEO_STAT_FIELDS = ["recent_videos_count", "recent_median_views", "last_posted_at",
+                            "days_since_last_post", "median_hours_between_posts"]
+
+def empty_profile_data():
+    """Returns a profile dict with every field set to 'N/A'."""
+    return dict(PROFILE_DEFAULTS)
+
+def profile_scraped(profile_data):
+    """True if a profile load returned data, i.e. not None nor the 'N/A' dict of a failed scrape."""
+    return bool(profile_data) and profile_data != empty_profile_data()
+
+def profile_data_from_user_info(user_info):
+    """
+    Maps the 'userInfo' object from the page's hydration JSON
+    ({'user': {...}, 'stats': {...}}) to the profile dict shape.
+    Counts are kept as exact integers.
+    """
+    profile_data = empty_profile_data()
+    if not user_info:
+        return profile_data
+    user = user_info.get("user") or {}
+    stats = user_info.get("stats") or {}
+
+    if user.get("signature") is not None:
+        profile_data["bio_text"] = user["signature"].strip()
+    if user.get("nickname") is not None:
+        profile_data["nickname"] = user["nickname"]
+    if user.get("verified") is not None:
+        profile_data["verified"] = bool(user["verified"])
+    bio_link = (user.get("bioLink") or {}).get("link")
+    if bio_link:
+        profile_data["bio_link"] = bio_link
+
+    for field, stat_keys in (("following_count", ("followingCount",)),
+                             ("followers_count", ("followerCount",)),
+                             ("likes_count", ("heartCount", "heart")),
+                             ("video_count", ("videoCount",))):
+        for stat_key in stat_keys:
+            if stats.get(stat_key) is not None:
+                profile_data[field] = stats[stat_key]
+                break
+    return profile_data
+
+def merge_extracted_profile(extracted):
+    """
+    Builds the profile dict from one extraction result of the profile page:
+    {'userInfo': <hydration userInfo or None>, 'dom': <dict of DOM texts or None>}.
+    Hydration data wins; DOM texts fill whatever it lacks, with display counts
+    such as '1.2M' converted to integers.
+    """
+    if not extracted:
+        return empty_profile_data()
+    profile_data = profile_data_from_user_info(extracted.get("userInfo"))
+    for field, value in (extracted.get("dom") or {}).items():
+        if field in profile_data and profile_data[field] == "N/A" and value:
+            if field in PROFILE_COUNT_FIELDS:
+                value = parse_count(value)
+                if value is None:
+                    continue
+            profile_data[field] = value
+    if extracted.get("videos") is not None:
+        profile_data["recent_videos"] = recent_videos_from_grid(extracted["videos"])
+    return profile_data
+
+def video_posted_at(video_id):
+    """
+    Unix time a video was posted, decoded from its ID (the upper 32 bits of TikTok video IDs
+    are the creation timestamp). None for IDs that do not carry a plausible time.
+    """
+    try:
+        timestamp = int(video_id) >> 32
+    except (TypeError, ValueError):
+        return None
+    return timestamp if 1_400_000_000 <= timestamp <= time.time() + 86400 else None
+
+def recent_videos_from_grid(videos):
+    """
+    Normalizes the grid items read from a profile page ({'id', 'views', 'pinned'}, views as
+    displayed, e.g. '12.3K') to {'id', 'views' (int or None), 'pinned', 'posted_at' (Unix time or None)}.
+    """
+    return [{
+        "id": str(video["id"]),
+        "views": parse_count(video.get("views")),
+        "pinned": bool(video.get("pinned")),
+        "posted_at": video_posted_at(video["id"])
+    } for video in videos if video.get("id")]
+
+def recent_video_stats(recent_videos, now=None):
+    """
+    Aggregates over a creator's recent videos, leaving out pinned ones (often old hits):
+    their count, median views, date of the last post, days since then and median hours
+    between consecutive posts. Every field is 'N/A' when the grid was not read or a value is unknown.
+    """
+    stats = {field: "N/A" for field in RECENT_VIDEO_STAT_FIELDS}
+    if recent_videos is None:
+        return stats
+    videos = [video for video in recent_videos if not video.get("pinned")]
+    stats["recent_videos_count"] = len(videos)
+    views = [video["views"] for video in videos if video.get("views") is not None]
+    if views:
+        stats["recent_median_views"] = int(statistics.median(views))
+    posted = sorted((video["posted_at"] for video in videos if video.get("posted_at")), reverse=True)
+    if posted:
+        now = time.time() if now is None else now
+        stats["last_posted_at"] = time.strftime('%Y-%m-%d', time.gmtime(posted[0]))
+        stats["days_since_last_post"] = max(0, int((now - posted[0]) // 86400))
+    if len(posted) > 1:
+        gaps = [(newer - older) / 3600 for newer, older in zip(posted, posted[1:])]
+        stats["median_hours_between_posts"] = int(round(statistics.median(gaps)))
+    return stats
+
+def find_user_info(hydration):
+    """
+    Finds the profile's userInfo ({'user': {...}, 'stats': {...}}) in parsed hydration JSON,
+    either the __UNIVERSAL_DATA_FOR_REHYDRATION__ or the older SIGI_STATE layout.
+    Returns None if the data has no user.
+    """
+    if not isinstance(hydration, dict):
+        return None
+    detail = (hydration.get("__DEFAULT_SCOPE__") or {}).get("webapp.user-detail") or {}
+    user_info = detail.get("userInfo")
+    if user_info and user_info.get("user"):
+        return user_info
+    user_module = hydration.get("UserModule") or {}
+    users = user_module.get("users") or {}
+    if users:
+        name = next(iter(users))
+        return {"user": users[name], "stats": (user_module.get("stats") or {}).get(name) or {}}
+    return None
+
+def user_info_from_html(html):
+    """
+    Extracts the profile's userInfo from the server-rendered HTML of a profile page.
+    Returns None if the page has no usable hydration data (e.g., a CAPTCHA or login wall).
+    """
+    if not html:
+        return None
+    for regex in HYDRATION_SCRIPT_REGEXES:
+        match = regex.search(html)
+        if not match:
+            continue
+        try:
+            user_info = find_user_info(json.loads(match.group(1)))
+        except ValueError:
+            continue
+        if user_info:
+            return user_info
+    return None
@@ -0,0 +1,136 @@
+# Persistent store of scraped profiles, shared across runs
+# e.g., skipping profiles visited within a TTL, picking stale profiles to refresh, logging bio changes
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from tiktok_harvester.profile_data import profile_scraped
+from tiktok_harvester.utils import parse_count
+
+def content_hash(data):
+    """Stable hash of a JSON-serializable value, e.g. a profile dict or a bio text."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+class ProfileStore:
+    """
+    SQLite table of the latest data scraped for each username, with a content hash and
+    the times it was first seen, last scraped and last changed. Profiles scraped within
+    ttl_seconds are fresh and can be reused instead of loading the page again; stale ones
+    are refreshed, biggest audiences first. Every bio change is logged in 'bio_changes',
+    and the changes seen by this process are kept in changes for the run report.
+    Only real scrapes are stored: failed loads (None or all fields 'N/A') never replace good data.
+    """
+    def __init__(self, path, ttl_seconds=24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.changes = [] # Bio changes seen in this run, as dicts
+        self.hits = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock() # Profiles are saved from pool and pipeline threads too
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS profiles (
+                    username TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    bio_hash TEXT NOT NULL,
+                    followers_count INTEGER,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    last_changed REAL NOT NULL
+                )""")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_profiles_last_seen ON profiles (last_seen)")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS bio_changes (
+                    username TEXT NOT NULL,
+                    changed_at REAL NOT NULL,
+                    old_bio TEXT,
+                    new_bio TEXT
+                )""")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_bio_changes_username ON bio_changes (username)")
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def get_fresh(self, username, ttl_seconds=None):
+        """Returns the stored profile data if it was scraped within the TTL, else None."""
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            row = self.connection.execute("SELECT data FROM profiles WHERE username = ? AND last_seen >= ?",
+                                          (username, time.time() - ttl_seconds)).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        return json.loads(row['data'])
+
+    def save(self, username, profile_data):
+        """
+        Stores a freshly scraped profile. Returns 'new', 'unchanged', 'changed' or 'skipped'
+        (a failed load, which is not stored). A changed bio is logged in bio_changes.
+        """
+        if not profile_scraped(profile_data):
+            return 'skipped'
+        now = time.time()
+        data_hash = content_hash(profile_data)
+        bio = profile_data.get('bio_text')
+        bio_hash = content_hash(bio)
+        followers = parse_count(profile_data.get('followers_count'))
+        with self._lock, self.connection:
+            row = self.connection.execute("SELECT data, content_hash, bio_hash FROM profiles WHERE username = ?",
+                                          (username,)).fetchone()
+            if row is None:
+                self.connection.execute("INSERT INTO profiles (username, data, content_hash, bio_hash, followers_count, "
+                                        "first_seen, last_seen, last_changed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                        (username, json.dumps(profile_data, ensure_ascii=False), data_hash, bio_hash,
+                                         followers, now, now, now))
+                return 'new'
+            if row['content_hash'] == data_hash:
+                self.connection.execute("UPDATE profiles SET last_seen = ? WHERE username = ?", (now, username))
+                return 'unchanged'
+            self.connection.execute("UPDATE profiles SET data = ?, content_hash = ?, bio_hash = ?, followers_count = ?, "
+                                    "last_seen = ?, last_changed = ? WHERE username = ?",
+                                    (json.dumps(profile_data, ensure_ascii=False), data_hash, bio_hash, followers,
+                                     now, now, username))
+            if row['bio_hash'] != bio_hash:
+                old_bio = json.loads(row['data']).get('bio_text')
+                self.connection.execute("INSERT INTO bio_changes (username, changed_at, old_bio, new_bio) VALUES (?, ?, ?, ?)",
+                                        (username, now, old_bio, bio))
+                self.changes.append({
+                    'username': username,
+                    'changed_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now)),
+                    'old_bio': old_bio,
+                    'new_bio': bio
+                })
+        return 'changed'
+
+    def stale(self, ttl_seconds=None, limit=None):
+        """
+        Usernames last scraped longer than the TTL ago, most followers first
+        (unknown counts last), then least recently seen. limit caps the number returned.
+        """
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        query = ("SELECT username FROM profiles WHERE last_seen < ? "
+                 "ORDER BY followers_count IS NULL, followers_count DESC, last_seen")
+        params = [time.time() - ttl_seconds]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [row['username'] for row in self.connection.execute(query, params)]
+
+    def write_changes(self, path):
+        """Writes the bio changes seen in this run as a JSON list. Returns the number written."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as changes_file:
+            json.dump(self.changes, changes_file, indent=2, ensure_ascii=False)
+        return len(self.changes)
+
+    def close(self):
+        self.connection.close()
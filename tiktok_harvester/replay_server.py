@@ -0,0 +1,287 @@
+# Local stand-in for TikTok, for offline testing and benchmarking
+# e.g., synthetic or recorded search pages with infinite scroll, profile pages with hydration data
+#
+# Run from the project root: python -m tiktok_harvester.replay_server --port 8765
+# then crawl it with:        python -m tiktok_harvester.main --base-url http://127.0.0.1:8765
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+from tiktok_harvester.sinks import safe_filename
+
+# TikTok usernames: letters, digits, underscores and periods. Anything else (e.g. '../') gets a 404.
+USERNAME_REGEX = re.compile(r"[A-Za-z0-9_][A-Za-z0-9_.]*")
+
+SEARCH_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title} | TikTok Search</title>
+<style>div[data-e2e="search-video-card"] {{ height: 320px; margin: 8px; border: 1px solid #ddd; }}</style>
+</head><body>
+<div id="results"></div>
+<script>
+    const cards = {cards_json};
+    const pageSize = {page_size};
+    const loadDelayMs = {load_delay_ms};
+    const results = document.getElementById('results');
+    let rendered = 0;
+    let loading = false;
+
+    function renderPage() {{
+        const end = Math.min(rendered + pageSize, cards.length);
+        for (; rendered < end; rendered++) {{
+            const card = cards[rendered];
+            const el = document.createElement('div');
+            el.setAttribute('data-e2e', 'search-video-card');
+            el.innerHTML = `<a href="https://www.tiktok.com/@${{card.username}}/video/${{card.videoId}}">` +
+                `<strong data-e2e="video-views">${{card.likeCount}}</strong></a>` +
+                `<p data-e2e="search-card-user-unique-id">${{card.username}}</p>`;
+            results.appendChild(el);
+        }}
+        if (rendered >= cards.length) {{
+            const marker = document.createElement('div');
+            marker.className = 'css-t7wus4-DivNoMoreResultsContainer eegew6e3';
+            marker.textContent = 'No more results';
+            document.body.appendChild(marker);
+        }}
+    }}
+
+    window.addEventListener('scroll', () => {{
+        if (loading || rendered >= cards.length) return;
+        if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 400) {{
+            loading = true;
+            setTimeout(() => {{ renderPage(); loading = false; }}, loadDelayMs);
+        }}
+    }});
+    renderPage();
+</script>
+</body></html>
+"""
+
+PROFILE_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{nickname} (@{username}) | TikTok</title></head><body>
+{hydration_script}
+<h1 data-e2e="user-title">{username}</h1>
+<h2 data-e2e="user-subtitle">{nickname}</h2>
+<h3 class="css-1xoqgj7-H3CountInfos e1457k4r0">
+    <strong data-e2e="following-count">{following_display}</strong> Following
+    <strong data-e2e="followers-count">{followers_display}</strong> Followers
+    <strong data-e2e="likes-count">{likes_display}</strong> Likes
+</h3>
+<h2 data-e2e="user-bio" class="css-cm3m4u-H2ShareDesc e1457k4r3">{bio_html}</h2>
+<div data-e2e="user-post-item-list">{videos_html}</div>
+</body></html>
+"""
+
+VIDEO_ITEM_TEMPLATE = """
+<div data-e2e="user-post-item">{badge_html}<a href="/@{username}/video/{video_id}"><strong data-e2e="video-views">{views_display}</strong></a></div>"""
+
+
+def _seed(*parts):
+    """Deterministic integer derived from the given strings."""
+    return int(hashlib.sha1("|".join(str(part) for part in parts).encode('utf-8')).hexdigest()[:12], 16)
+
+def display_count(value):
+    """Formats a count the way TikTok displays it, e.g. 12300 -> '12.3K'."""
+    for suffix, size in (('B', 1_000_000_000), ('M', 1_000_000), ('K', 1_000)):
+        if value >= size:
+            return f"{value / size:.1f}".rstrip('0').rstrip('.') + suffix
+    return str(value)
+
+def synthetic_search_cards(keyword, results_per_keyword, creator_pool):
+    """
+    Search results for a keyword. Usernames are drawn from a shared pool of creators,
+    so overlapping keywords surface some of the same creators, as on the live site.
+    """
+    cards = []
+    for i in range(results_per_keyword):
+        seed = _seed(keyword, i)
+        cards.append({
+            'username': f"creator{seed % creator_pool:05d}",
+            'videoId': str(7_000_000_000_000_000_000 + seed % 10**15),
+            'likeCount': display_count(seed % 5_000_000)
+        })
+    return cards
+
+def synthetic_profile(username, email_ratio=0.4):
+    """A profile's user info, in the shape of the page's hydration userInfo."""
+    seed = _seed(username)
+    bio = f"Creator {username} | daily videos"
+    if seed % 100 < email_ratio * 100:
+        bio += f"\nBusiness: {username}@example.com"
+    return {
+        'user': {
+            'uniqueId': username,
+            'nickname': f"{username.title()} Official",
+            'signature': bio,
+            'verified': seed % 10 == 0,
+            'bioLink': {'link': f"linktr.ee/{username}"} if seed % 3 == 0 else None
+        },
+        'stats': {
+            'followingCount': seed % 2_000,
+            'followerCount': seed % 3_000_000,
+            'heartCount': seed % 90_000_000,
+            'videoCount': seed % 900
+        }
+    }
+
+def synthetic_recent_videos(username, count=16):
+    """
+    A profile's recent videos grid, newest first, with IDs carrying their post time in the
+    upper 32 bits like TikTok's. Some creators have an older video pinned at the top.
+    """
+    seed = _seed(username)
+    posted_at = int(time.time()) - seed % 72 * 3600
+    videos = []
+    if seed % 4 == 0:
+        pinned_at = posted_at - 200 * 86400
+        videos.append({'id': str(pinned_at << 32 | seed % 2**32), 'views': 5_000_000 + seed % 5_000_000, 'pinned': True})
+    for i in range(min(count, synthetic_profile(username)['stats']['videoCount'])):
+        item_seed = _seed(username, 'video', i)
+        videos.append({'id': str(posted_at << 32 | item_seed % 2**32), 'views': item_seed % 800_000, 'pinned': False})
+        posted_at -= 3600 * (6 + item_seed % 66)
+    return videos
+
+def render_search_page(keyword, cards, page_size=12, load_delay_ms=300):
+    return SEARCH_PAGE_TEMPLATE.format(
+        title=html.escape(keyword),
+        cards_json=json.dumps(cards).replace('</', '<\\/'),
+        page_size=page_size,
+        load_delay_ms=load_delay_ms
+    )
+
+def render_profile_page(user_info, include_hydration=True, recent_videos=()):
+    user = user_info['user']
+    stats = user_info['stats']
+    hydration_script = ""
+    if include_hydration:
+        hydration = {'__DEFAULT_SCOPE__': {'webapp.user-detail': {'userInfo': user_info}}}
+        hydration_script = ('<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">'
+                            + json.dumps(hydration).replace('</', '<\\/') + '</script>')
+    return PROFILE_PAGE_TEMPLATE.format(
+        hydration_script=hydration_script,
+        username=html.escape(user['uniqueId']),
+        nickname=html.escape(user['nickname']),
+        following_display=display_count(stats['followingCount']),
+        followers_display=display_count(stats['followerCount']),
+        likes_display=display_count(stats['heartCount']),
+        bio_html=html.escape(user['signature']).replace('\n', '<br>'),
+        videos_html="".join(VIDEO_ITEM_TEMPLATE.format(
+            badge_html='<div data-e2e="video-card-badge">Pinned</div>' if video['pinned'] else '',
+            username=html.escape(user['uniqueId']),
+            video_id=video['id'],
+            views_display=display_count(video['views'])
+        ) for video in recent_videos)
+    )
+
+class ReplayRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves /search/video?q=<keyword> and /@<username> (with a recent videos grid).
+    A recorded page is served when the record directory has one
+    (search/<keyword>.html or profiles/<username>.html); otherwise a synthetic page is generated.
+    """
+    def do_GET(self):
+        config = self.server.replay_config
+        parsed = urlparse(self.path)
+        if parsed.path == '/search/video':
+            keyword = parse_qs(parsed.query).get('q', [''])[0]
+            page = self._recorded_page('search', safe_filename(keyword))
+            if page is None:
+                cards = synthetic_search_cards(keyword, config['results_per_keyword'], config['creator_pool'])
+                page = render_search_page(keyword, cards, config['page_size'], config['scroll_load_delay_ms'])
+            self._send_html(page)
+        elif parsed.path.startswith('/@'):
+            username = unquote(parsed.path[2:]).strip('/')
+            if not USERNAME_REGEX.fullmatch(username):
+                self._send_html("<html><body>Invalid username</body></html>", status=404)
+                return
+            if config['profile_latency_ms']:
+                time.sleep(config['profile_latency_ms'] / 1000)
+            page = self._recorded_page('profiles', username)
+            if page is None:
+                include_hydration = _seed('hydration', username) % 100 < config['hydration_ratio'] * 100
+                page = render_profile_page(synthetic_profile(username, config['email_ratio']), include_hydration,
+                                           synthetic_recent_videos(username))
+            self._send_html(page)
+        else:
+            self._send_html("<html><body>TikTok replay server</body></html>", status=404 if parsed.path != '/' else 200)
+
+    def _recorded_page(self, kind, name):
+        record_dir = self.server.replay_config['record_dir']
+        if not record_dir:
+            return None
+        path = os.path.join(record_dir, kind, f"{name}.html")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as page_file:
+            return page_file.read()
+
+    def _send_html(self, page, status=200):
+        body = page.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Keep benchmark output readable
+
+def start_replay_server(host="127.0.0.1", port=0, record_dir=None, results_per_keyword=60, creator_pool=150,
+                        page_size=12, scroll_load_delay_ms=300, profile_latency_ms=0, hydration_ratio=1.0,
+                        email_ratio=0.4):
+    """
+    Starts the replay server in a background thread and returns it.
+    The server's base_url attribute is what --base-url / base_url should be set to.
+    port=0 picks a free port.
+    """
+    server = ThreadingHTTPServer((host, port), ReplayRequestHandler)
+    server.daemon_threads = True
+    server.replay_config = {
+        'record_dir': record_dir,
+        'results_per_keyword': results_per_keyword,
+        'creator_pool': creator_pool,
+        'page_size': page_size,
+        'scroll_load_delay_ms': scroll_load_delay_ms,
+        'profile_latency_ms': profile_latency_ms,
+        'hydration_ratio': hydration_ratio,
+        'email_ratio': email_ratio
+    }
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, name="replay-server", daemon=True)
+    thread.start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve recorded or synthetic TikTok search and profile pages locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--record-dir", default=None,
+                        help="Directory with recorded pages: search/<keyword>.html and profiles/<username>.html.")
+    parser.add_argument("--results-per-keyword", type=int, default=60)
+    parser.add_argument("--creator-pool", type=int, default=150,
+                        help="Number of distinct synthetic creators shared by all keywords (default: 150).")
+    parser.add_argument("--page-size", type=int, default=12, help="Cards loaded per infinite-scroll page.")
+    parser.add_argument("--scroll-load-delay-ms", type=int, default=300, help="Delay before each infinite-scroll page appears.")
+    parser.add_argument("--profile-latency-ms", type=int, default=0, help="Artificial server latency for profile pages.")
+    parser.add_argument("--hydration-ratio", type=float, default=1.0,
+                        help="Share of synthetic profile pages that embed hydration data (default: 1.0).")
+    args = parser.parse_args(argv)
+
+    server = start_replay_server(args.host, args.port, args.record_dir, args.results_per_keyword, args.creator_pool,
+                                 args.page_size, args.scroll_load_delay_ms, args.profile_latency_ms, args.hydration_ratio)
+    print(f"Replay server running at {server.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# Deferred retry queue for failed searches and profile visits
+# e.g., exponential backoff, bounded attempts, items set aside for manual attention
+
+import json
+import os
+import random
+import time
+
+class RetryItem:
+    """
+    One failed unit of work: a keyword search ('search') or a profile visit ('profile').
+    contexts holds what the caller needs to finish the item, e.g. the (keyword, user_info)
+    pairs whose rows are waiting for a parked profile.
+    """
+    def __init__(self, kind, key):
+        self.kind = kind
+        self.key = key
+        self.contexts = []
+        self.attempts = 0
+        self.next_attempt_at = 0.0
+        self.last_error = None
+        self.needs_human = False
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'key': self.key,
+            'attempts': self.attempts,
+            'needs_human': self.needs_human,
+            'last_error': self.last_error,
+            'keywords': sorted({context[0] for context in self.contexts if isinstance(context, tuple)})
+        }
+
+class RetryQueue:
+    """
+    Parks failed items and hands them back once their backoff has passed:
+    base_delay * 2 ** (attempts - 1) seconds, plus up to 20% jitter, capped at max_delay.
+    Items that have failed max_attempts times, or that hit a CAPTCHA, are moved to
+    needs_attention for manual follow-up at the end of the run.
+    """
+    def __init__(self, max_attempts=3, base_delay=30, max_delay=600):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._items = {} # (kind, key) -> RetryItem waiting for a retry
+        self.needs_attention = {} # (kind, key) -> RetryItem given up on
+
+    def __len__(self):
+        return len(self._items)
+
+    def find(self, kind, key):
+        """Returns the parked or given-up item for kind and key, or None."""
+        return self._items.get((kind, key)) or self.needs_attention.get((kind, key))
+
+    def add_context(self, kind, key, context):
+        """
+        Attaches more work to an item that is already parked or given up on.
+        Returns False if there is no such item.
+        """
+        item = self.find(kind, key)
+        if item is None:
+            return False
+        if context not in item.contexts:
+            item.contexts.append(context)
+        return True
+
+    def park(self, kind, key, error, context=None, needs_human=False):
+        """
+        Records a failed attempt and schedules the next one.
+        Returns True if the item will be retried, False if it now needs attention.
+        """
+        item = self._items.get((kind, key))
+        if item is None:
+            item = RetryItem(kind, key)
+            self._items[(kind, key)] = item
+        if context is not None and context not in item.contexts:
+            item.contexts.append(context)
+        item.attempts += 1
+        item.last_error = str(error)
+        item.needs_human = needs_human
+        if needs_human or item.attempts >= self.max_attempts:
+            del self._items[(kind, key)]
+            self.needs_attention[(kind, key)] = item
+            return False
+        delay = min(self.max_delay, self.base_delay * 2 ** (item.attempts - 1))
+        item.next_attempt_at = time.monotonic() + delay * random.uniform(1.0, 1.2)
+        return True
+
+    def resolve(self, item):
+        """Removes an item whose retry succeeded."""
+        self._items.pop((item.kind, item.key), None)
+
+    def due(self):
+        """Returns the parked items whose backoff has passed, oldest first."""
+        now = time.monotonic()
+        return sorted((item for item in self._items.values() if item.next_attempt_at <= now),
+                      key=lambda item: item.next_attempt_at)
+
+    def seconds_until_next(self):
+        """Seconds until the next parked item is due (0 if one is due now, None if the queue is empty)."""
+        if not self._items:
+            return None
+        return max(0.0, min(item.next_attempt_at for item in self._items.values()) - time.monotonic())
+
+    def write_needs_attention(self, path):
+        """Writes the items given up on as a JSON list, for manual follow-up. Returns the number written."""
+        items = [item.to_dict() for item in self.needs_attention.values()]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as attention_file:
+            json.dump(items, attention_file, indent=2, ensure_ascii=False)
+        return len(items)
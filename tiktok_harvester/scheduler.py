@@ -0,0 +1,157 @@
+# Budgeted, yield-prioritized scheduling of profile visits
+# e.g., creators most likely to have an email first, stopping at a profile, time or email budget
+
+import math
+import time
+
+class CrawlBudget:
+    """
+    Limits a run to max_profiles profile loads, max_seconds of wall-clock time or
+    target_emails creators with an email found, whichever comes first (None: no limit).
+    Profiles reused from earlier visits cost nothing.
+    """
+    def __init__(self, max_profiles=None, max_seconds=None, target_emails=None):
+        self.max_profiles = max_profiles
+        self.max_seconds = max_seconds
+        self.target_emails = target_emails
+        self.started = time.monotonic()
+        self.profiles_loaded = 0
+        self.creators_with_emails = set()
+        self.stopped_by = None
+
+    def record_profile_load(self):
+        self.profiles_loaded += 1
+
+    def record_row(self, row):
+        if row.get('emails_found') not in (None, '', 'N/A'):
+            self.creators_with_emails.add(row['username'])
+
+    def exhausted(self):
+        """Returns why the budget is spent ('max_profiles', 'max_time' or 'target_emails'), or None."""
+        if self.stopped_by is None:
+            if self.max_profiles is not None and self.profiles_loaded >= self.max_profiles:
+                self.stopped_by = 'max_profiles'
+            elif self.max_seconds is not None and time.monotonic() - self.started >= self.max_seconds:
+                self.stopped_by = 'max_time'
+            elif self.target_emails is not None and len(self.creators_with_emails) >= self.target_emails:
+                self.stopped_by = 'target_emails'
+            if self.stopped_by:
+                print(f"\nCrawl budget reached ({self.stopped_by}): {self.profiles_loaded} profiles loaded, "
+                      f"{len(self.creators_with_emails)} creators with emails, "
+                      f"{time.monotonic() - self.started:.0f}s elapsed. No more profiles will be loaded.")
+        return self.stopped_by
+
+    def stats(self):
+        return {
+            'max_profiles': self.max_profiles,
+            'max_seconds': self.max_seconds,
+            'target_emails': self.target_emails,
+            'profiles_loaded': self.profiles_loaded,
+            'creators_with_emails': len(self.creators_with_emails),
+            'elapsed_s': round(time.monotonic() - self.started, 1),
+            'stopped_by': self.stopped_by
+        }
+
+def likes_bucket(likes):
+    """Order of magnitude of a source video's like count, e.g. 12300 -> 4, or None if unknown."""
+    if not isinstance(likes, int) or likes < 0:
+        return None
+    return int(math.log10(likes)) if likes else 0
+
+class YieldScheduler:
+    """
+    Ranks creators by expected yield: the email hit rate seen so far for creators found
+    with similar source videos (same like-count order of magnitude) and under the same
+    keywords, shrunk towards the overall rate while there are few observations, times a
+    bonus per extra keyword that surfaced the creator. Source-video likes break ties.
+    Rates are learned from the rows of earlier runs (learn_from_rows) and from every row
+    written in this one (observe), so the order adapts as the crawl goes.
+    """
+    def __init__(self, prior_weight=5, keyword_bonus=0.25):
+        self.prior_weight = prior_weight
+        self.keyword_bonus = keyword_bonus
+        self.visits = {} # ('likes', bucket) or ('keyword', keyword) -> [creators with emails, creators]
+        self.total = [0, 0]
+
+    def observe(self, keyword, user_info, has_email):
+        """Records whether a creator found under a keyword turned out to have an email."""
+        for signal in (('likes', likes_bucket(user_info.get('related_video_likes'))), ('keyword', keyword)):
+            counts = self.visits.setdefault(signal, [0, 0])
+            counts[0] += int(has_email)
+            counts[1] += 1
+        self.total[0] += int(has_email)
+        self.total[1] += 1
+
+    def learn_from_rows(self, rows):
+        """Learns the hit rates from output rows, e.g. the journal's rows of earlier runs."""
+        for row in rows:
+            user_info = {'related_video_likes': row.get('source_video_likes')}
+            self.observe(row.get('keyword_searched'), user_info, row.get('emails_found') not in (None, '', 'N/A'))
+
+    def _rate(self, signal, overall):
+        hits, seen = self.visits.get(signal, (0, 0))
+        return (hits + self.prior_weight * overall) / (seen + self.prior_weight)
+
+    def score(self, contexts):
+        """Expected yield of a creator, from the (keyword, user_info) pairs it was found under."""
+        overall = (self.total[0] + 1) / (self.total[1] + 2)
+        user_info = contexts[0][1]
+        keywords = list(dict.fromkeys(keyword for keyword, _ in contexts))
+        keyword_rate = sum(self._rate(('keyword', keyword), overall) for keyword in keywords) / len(keywords)
+        rate = (self._rate(('likes', likes_bucket(user_info.get('related_video_likes'))), overall) + keyword_rate) / 2
+        return rate * (1 + self.keyword_bonus * (len(keywords) - 1))
+
+def score_signature(contexts):
+    """What a creator's score depends on: its source video's likes bucket and the keywords that surfaced it."""
+    return (likes_bucket(contexts[0][1].get('related_video_likes')), tuple(sorted({keyword for keyword, _ in contexts})))
+
+def _source_likes(contexts):
+    likes = contexts[0][1].get('related_video_likes')
+    return likes if isinstance(likes, int) else -1
+
+class YieldQueue:
+    """
+    Pending creators ({username: [(keyword, user_info), ...]}) ranked by a YieldScheduler, best
+    first, source-video likes breaking ties. Creators with the same score_signature always score
+    alike, so they share a group kept sorted by likes; only the groups are ranked before each pop,
+    and they are only scored again once new observations have changed the scheduler's rates.
+    """
+    def __init__(self, scheduler, pending):
+        self.scheduler = scheduler
+        self.groups = {} # signature -> [(likes, -arrival, username, contexts), ...], best last
+        for arrival, (username, contexts) in enumerate(pending.items()):
+            self.groups.setdefault(score_signature(contexts), []).append((_source_likes(contexts), -arrival, username, contexts))
+        for group in self.groups.values():
+            group.sort(key=lambda entry: entry[:2]) # Equal likes: the first found is popped first
+        self.scores = {} # signature -> score, as of scored_at observations
+        self.scored_at = None
+        self.size = len(pending)
+
+    def __len__(self):
+        return self.size
+
+    def _ranked_groups(self):
+        if self.scored_at != self.scheduler.total[1]:
+            self.scores = {signature: self.scheduler.score(group[-1][3]) for signature, group in self.groups.items()}
+            self.scored_at = self.scheduler.total[1]
+        return sorted(self.groups, key=lambda signature: (self.scores[signature], self.groups[signature][-1][0]), reverse=True)
+
+    def pop(self):
+        """Removes the best creator and returns (username, contexts, expected yield)."""
+        signature = self._ranked_groups()[0]
+        group = self.groups[signature]
+        _, _, username, contexts = group.pop()
+        if not group:
+            del self.groups[signature]
+        self.size -= 1
+        return username, contexts, self.scores[signature]
+
+    def peek(self, count):
+        """The contexts of the next count creators, best first, e.g. to prefetch their profiles."""
+        upcoming = []
+        for signature in self._ranked_groups():
+            for _, _, _, contexts in reversed(self.groups[signature][-(count - len(upcoming)):]):
+                upcoming.append(contexts)
+            if len(upcoming) >= count:
+                break
+        return upcoming
@@ -8,13 +8,172 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+import json
+import os
 import time
 
-def initialize_driver(proxy_string=None):
+from tiktok_harvester.metrics import METRICS
+from tiktok_harvester.network_trace import NETWORK_TRACE
+from tiktok_harvester.profile_data import empty_profile_data, merge_extracted_profile
+from tiktok_harvester.selector_registry import SELECTORS
+from tiktok_harvester.timeouts import TIMEOUTS
+
+TIKTOK_BASE_URL = "https://www.tiktok.com"
+
+# Seconds to wait for a page element whose selector circuit breaker is open (see selector_registry)
+FAST_FAIL_TIMEOUT = 3
+
+# Default script timeout of every browser; the scroll script sets its own (see timeouts.py)
+SCRIPT_TIMEOUT = 120
+
+# JavaScript helper shared by the scroll scripts. Expects cardSelector, noMoreSelector
+# and idleTimeoutMs to be defined by the script that includes it.
+WAIT_FOR_NEW_CARDS_JS = """
+        // Resolves as soon as new cards are added or the "no more results" marker appears,
+        // or after idleTimeoutMs without either.
+        function waitForNewCards(previousCount) {
+            return new Promise(resolve => {
+                let observer = null;
+                let timer = null;
+                let settled = false;
+                const done = (reason) => {
+                    if (settled) return;
+                    settled = true;
+                    if (observer) observer.disconnect();
+                    if (timer) clearTimeout(timer);
+                    resolve(reason);
+                };
+                const check = () => {
+                    if (document.querySelector(noMoreSelector)) {
+                        done('no-more-results');
+                    } else if (document.querySelectorAll(cardSelector).length > previousCount) {
+                        done('new-cards');
+                    }
+                };
+                observer = new MutationObserver(check);
+                observer.observe(document.body, { childList: true, subtree: true });
+                timer = setTimeout(() => done('timeout'), idleTimeoutMs);
+                check();
+            });
+        }
+"""
+
+# Elements shown by TikTok's CAPTCHA / verification challenges
+CAPTCHA_SELECTORS = [
+    '#captcha-verify-image',
+    '#captcha_container',
+    '.captcha_verify_container',
+    'div[class*="captcha-verify"]',
+    'iframe[src*="captcha"]'
+]
+
+# Whether failures pause for manual CAPTCHA solving (see set_interactive)
+_interactive = True
+
+# Whether profile visits also read the recent videos grid (see set_recent_videos)
+_recent_videos = False
+
+# Seconds to wait for the recent videos grid once the profile itself has rendered
+RECENT_VIDEOS_WAIT = 3
+
+class ScrapeError(Exception):
+    """
+    Raised in non-interactive mode when a search, scroll or profile visit fails,
+    instead of pausing for the user. needs_human is True if a CAPTCHA was showing.
+    """
+    def __init__(self, message, needs_human=False):
+        super().__init__(message)
+        self.needs_human = needs_human
+
+class BrowserCrashed(ScrapeError):
+    """Raised when a stage failed because the browser or chromedriver is gone."""
+
+def set_interactive(enabled):
+    """
+    Interactive mode (the default) pauses on failures so a CAPTCHA can be solved in the browser.
+    In non-interactive mode failures raise ScrapeError right away, so callers can defer and retry them.
+    """
+    global _interactive
+    _interactive = bool(enabled)
+
+def set_recent_videos(enabled):
+    """
+    Also reads the recent videos grid (ID, views, pinned) of every profile page loaded,
+    for the per-creator aggregates of profile_data.recent_video_stats. Off by default.
+    """
+    global _recent_videos
+    _recent_videos = bool(enabled)
+
+_driver_cache_file = None # JSON file keeping the chromedriver path between runs, see set_driver_cache
+_driver_path = None # chromedriver resolved by Selenium Manager, reused by every later browser start
+
+def set_driver_cache(path):
+    """
+    Keeps the chromedriver path Selenium Manager resolves in a JSON file, so browser starts
+    in later runs skip the lookup. Within a run it is always reused (recycles, restarts, pools).
+    None or '' keeps it in memory only.
+    """
+    global _driver_cache_file, _driver_path
+    _driver_cache_file = path or None
+    if not _driver_cache_file or not os.path.exists(_driver_cache_file):
+        return
+    try:
+        with open(_driver_cache_file, 'r', encoding='utf-8') as cache_file:
+            cached_path = json.load(cache_file).get('driver_path')
+    except (OSError, ValueError) as e:
+        print(f"Could not read the chromedriver cache {_driver_cache_file}: {e}")
+        return
+    if cached_path and os.access(cached_path, os.X_OK):
+        _driver_path = cached_path
+
+def _remember_driver_path(path):
+    global _driver_path
+    if not path or path == _driver_path:
+        return
+    _driver_path = path
+    if _driver_cache_file:
+        try:
+            os.makedirs(os.path.dirname(_driver_cache_file) or ".", exist_ok=True)
+            with open(_driver_cache_file, 'w', encoding='utf-8') as cache_file:
+                json.dump({'driver_path': path}, cache_file, indent=2)
+        except OSError as e:
+            print(f"Could not write the chromedriver cache {_driver_cache_file}: {e}")
+
+def _start_chrome(chrome_options):
+    """
+    Starts Chrome with the cached chromedriver if there is one, else lets Selenium Manager
+    resolve it and caches the result. Returns (driver, 'cached' or 'resolved').
+    """
+    global _driver_path
+    if _driver_path:
+        try:
+            return webdriver.Chrome(service=ChromeService(executable_path=_driver_path), options=chrome_options), 'cached'
+        except Exception as e:
+            # e.g. Chrome updated itself and the cached chromedriver no longer matches it
+            print(f"Cached chromedriver {_driver_path} did not start ({e}). Resolving it again.")
+            _driver_path = None
+    driver = webdriver.Chrome(options=chrome_options)
+    _remember_driver_path(getattr(driver.service, 'path', None))
+    return driver, 'resolved'
+
+# URL patterns blocked in lean mode: media, images and fonts the scraper never reads.
+# Blocked through CDP Network.setBlockedURLs, which matches URL patterns with * wildcards.
+LEAN_BLOCKED_URL_PATTERNS = [
+    "*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*mime_type=video*",
+    "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.heic*", "*.image*",
+    "*.woff*", "*.woff2*", "*.ttf*", "*.otf*"
+]
+
+def initialize_driver(proxy_string=None, lean=False, user_data_dir=None, network_log=False):
     """
     Initializes and returns a Selenium WebDriver instance for Chrome.
     Optionally configures a proxy.
     proxy_string: e.g., 'ip:port' or 'http://ip:port'
+    lean: run headless with the 'eager' page-load strategy and block media, images and fonts.
+    user_data_dir: persistent Chrome profile directory, so the HTTP cache stays warm between starts.
+    It must not be used by another running Chrome at the same time.
+    network_log: keep Chrome's performance log of network events, for NETWORK_TRACE (see network_trace.py).
     """
     chrome_options = Options()
 
@@ -31,18 +190,41 @@ def initialize_driver(proxy_string=None):
         chrome_options.add_argument(f'--proxy-server={proxy_string}')
         print(f"Attempting to use proxy: {proxy_string}")
     
+    if lean:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--window-size=1920,1080")
+        chrome_options.add_argument("--mute-audio")
+        # Return from driver.get at DOMContentLoaded; the scraper waits for its own readiness signals.
+        chrome_options.page_load_strategy = "eager"
+        chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+    if network_log:
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+
+    if user_data_dir:
+        os.makedirs(user_data_dir, exist_ok=True)
+        chrome_options.add_argument(f"--user-data-dir={os.path.abspath(user_data_dir)}")
+
     # Add any other desired options here, e.g.:
-    # chrome_options.add_argument("--headless")
-    # chrome_options.add_argument("--disable-gpu")
-    # chrome_options.add_argument("--window-size=1920,1080")
     # chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36")
 
     try:
-        # Selenium 4's SeleniumManager should automatically handle driver download and setup
-        # if no service or executable_path is specified.
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.set_script_timeout(120) # Set script timeout to 120 seconds
-        print("WebDriver initialized successfully (using Selenium Manager, script timeout set to 120s).")
+        # Selenium 4's SeleniumManager handles driver download and setup the first time;
+        # later starts use the chromedriver path it resolved.
+        started = time.perf_counter()
+        with METRICS.timer('driver_startup'):
+            driver, driver_source = _start_chrome(chrome_options)
+        startup_seconds = time.perf_counter() - started
+        METRICS.inc('harvester_driver_starts_total', driver_path=driver_source,
+                    profile='persistent' if user_data_dir else 'temporary')
+        driver.set_script_timeout(SCRIPT_TIMEOUT)
+        if lean:
+            block_heavy_resources(driver)
+        print(f"WebDriver initialized successfully in {startup_seconds:.1f}s ({driver_source} chromedriver, "
+              f"script timeout set to {SCRIPT_TIMEOUT}s{', lean mode' if lean else ''}"
+              f"{', profile ' + user_data_dir if user_data_dir else ''}).")
         return driver
     except Exception as e:
         print(f"Error initializing WebDriver: {e}")
@@ -52,6 +234,19 @@ def initialize_driver(proxy_string=None):
         print("You might also check 'webdriver-manager' installation: pip install webdriver-manager")
         return None
 
+def block_heavy_resources(driver, url_patterns=None):
+    """
+    Blocks requests for media, images and fonts through Chrome DevTools Protocol network interception.
+    Returns True if the block list was installed.
+    """
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": url_patterns or LEAN_BLOCKED_URL_PATTERNS})
+        return True
+    except Exception as e:
+        print(f"Could not install the resource block list via CDP: {e}")
+        return False
+
 def close_driver(driver):
     """Closes the WebDriver."""
     if driver:
@@ -61,25 +256,92 @@ def close_driver(driver):
         except Exception as e:
             print(f"Error closing WebDriver: {e}")
 
+def detect_captcha(driver):
+    """Returns True if the current page shows a CAPTCHA or verification challenge."""
+    if not driver:
+        return False
+    try:
+        if any(word in (driver.title or "").lower() for word in ("captcha", "verify", "security check")):
+            return True
+        return bool(driver.execute_script(
+            "return arguments[0].some(selector => document.querySelector(selector) !== null);", CAPTCHA_SELECTORS))
+    except Exception:
+        return False
+
+def is_driver_alive(driver):
+    """Returns False if the browser or chromedriver no longer answers."""
+    if not driver:
+        return False
+    try:
+        driver.window_handles
+        return True
+    except Exception:
+        return False
+
+def raise_if_crashed(driver, stage, error):
+    """Raises BrowserCrashed if a stage failed because the browser is gone."""
+    if driver and not is_driver_alive(driver):
+        METRICS.inc('harvester_failures_total', stage=stage, reason='browser_crash')
+        raise BrowserCrashed(f"{stage} failed, the browser is gone: {error}")
+
 def handle_captcha(driver):
     """
     Pauses script execution to allow manual CAPTCHA solving.
     The driver instance is passed for potential future use (e.g., checking if CAPTCHA is resolved).
+    Does not wait in non-interactive mode.
     """
     if not driver:
         print("Driver not available, cannot handle CAPTCHA.")
         return
+    if not _interactive:
+        print("CAPTCHA handling skipped: running non-interactively.")
+        return
     print("\n" + "="*50)
     print("CAPTCHA DETECTED!")
     print("Please solve the CAPTCHA in the browser window.")
     print("Press Enter in this console once you have solved it to continue...")
     print("="*50 + "\n")
-    input() # Pauses the script
+    with METRICS.timer('captcha_wait'):
+        input() # Pauses the script
     print("Resuming script...")
 
-def search_tiktok_videos(driver, keyword):
+def fail_or_pause(driver, stage, error):
+    """
+    Called when a stage fails. In interactive mode it pauses for manual CAPTCHA solving
+    and returns, so the caller retries in place. In non-interactive mode it raises ScrapeError
+    straight away, flagged as needing a human if a CAPTCHA is showing.
+    Either way it raises BrowserCrashed if the browser itself is gone.
+    """
+    raise_if_crashed(driver, stage, error)
+    if _interactive:
+        handle_captcha(driver)
+        return
+    captcha = detect_captcha(driver)
+    METRICS.inc('harvester_failures_total', stage=stage, reason='captcha' if captcha else 'error')
+    raise ScrapeError(f"{stage} failed{' (CAPTCHA shown)' if captcha else ''}: {error}", needs_human=captcha)
+
+def wait_for_search_page(driver):
+    """
+    Waits for the search page's body, with the timeout learned from earlier waits (see timeouts.py).
+    Raises TimeoutException if it does not appear.
+    """
+    timeout = TIMEOUTS.get('search_page_wait')
+    started = time.perf_counter()
+    try:
+        with METRICS.timer('search_page_wait'):
+            WebDriverWait(driver, timeout).until(
+                EC.presence_of_element_located((By.TAG_NAME, "body")) # Replace with a more specific selector for search results
+            )
+    except TimeoutException:
+        TIMEOUTS.observe_timeout('search_page_wait', timeout)
+        raise
+    TIMEOUTS.observe('search_page_wait', time.perf_counter() - started)
+
+def search_tiktok_videos(driver, keyword, base_url=TIKTOK_BASE_URL):
     """
     Navigates to the TikTok VIDEO search results page for the given keyword.
+    base_url can point at a local replay server instead of the live site.
+    Raises ScrapeError on failure in non-interactive mode.
     """
     if not driver:
         print("Driver not available for searching.")
@@ -87,17 +349,17 @@ def search_tiktok_videos(driver, keyword):
 
     # URL encode the keyword for safety
     from urllib.parse import quote
-    search_url = f"https://www.tiktok.com/search/video?q={quote(keyword)}"
+    search_url = f"{base_url}/search/video?q={quote(keyword)}"
     print(f"Navigating to VIDEO search URL: {search_url}")
 
     try:
-        driver.get(search_url)
+        NETWORK_TRACE.begin(driver, 'search', search_url)
+        with METRICS.timer('search_navigation'):
+            driver.get(search_url)
         # Wait for a known element on the search results page to ensure it loads.
         # This also serves as an implicit CAPTCHA check point, as CAPTCHA might prevent this element from appearing.
         # Using a generic body tag for now, ideally, we'd find a more specific stable element.
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body")) # Replace with a more specific selector for search results
-        )
+        wait_for_search_page(driver)
         print(f"Successfully navigated to search results for '{keyword}'.")
         
         # Basic CAPTCHA check: if a known CAPTCHA element is visible, or if the title suggests a CAPTCHA
@@ -105,37 +367,64 @@ def search_tiktok_videos(driver, keyword):
         # For example, looking for elements with 'captcha' in their ID/class, or specific text.
         # If you identify a common CAPTCHA element selector, it can be used here.
         # For now, we rely on the user to identify if a CAPTCHA page is shown and the script pauses at handle_captcha.
-        # if "captcha" in driver.title.lower() or driver.find_elements(By.ID, "captcha-verify-image"): # Example
-        #     print("Potential CAPTCHA detected on search page.")
-        #     handle_captcha(driver)
-        #     driver.get(search_url) # Re-navigate after CAPTCHA
-        #     WebDriverWait(driver, 20).until(
-        #         EC.presence_of_element_located((By.TAG_NAME, "body"))
-        #     )
 
         return True
     except Exception as e:
         print(f"Error navigating to search results for '{keyword}': {e}")
         print("A CAPTCHA might be blocking the page, or the page structure might have changed.")
         print("Attempting to call handle_captcha as a fallback.")
-        handle_captcha(driver) # Allow user to solve if it was a CAPTCHA
+        fail_or_pause(driver, 'search', e) # Allow user to solve if it was a CAPTCHA
         # Optionally, try to re-navigate after manual CAPTCHA solve
         try:
             print(f"Re-attempting navigation to: {search_url}")
-            driver.get(search_url)
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+            with METRICS.timer('search_navigation'):
+                driver.get(search_url)
+            wait_for_search_page(driver)
             print(f"Successfully navigated after CAPTCHA for '{keyword}'.")
             return True
         except Exception as e2:
             print(f"Still unable to navigate to search results for '{keyword}' after CAPTCHA attempt: {e2}")
             return False
 
-def scroll_and_extract_video_data_via_js(driver):
+def wait_for_search_results(driver, timeout=None):
+    """
+    Waits until the search results page shows its first video cards
+    (or the "no more results" marker), instead of sleeping for a fixed time.
+    The timeout defaults to the one learned from earlier waits (see timeouts.py).
+    Returns True if the page became ready within the timeout.
+    """
+    if not driver:
+        return False
+    if timeout is None:
+        timeout = TIMEOUTS.get('search_results_wait')
+    if not SELECTORS.allow_full_wait('search_card_user'):
+        timeout = min(timeout, FAST_FAIL_TIMEOUT)
+    started = time.perf_counter()
+    try:
+        with METRICS.timer('search_results_wait'):
+            WebDriverWait(driver, timeout).until(EC.any_of(
+                EC.presence_of_element_located((By.CSS_SELECTOR, SELECTORS.css('search_card_user'))),
+                EC.presence_of_element_located((By.CSS_SELECTOR, SELECTORS.css('no_more_results')))
+            ))
+        TIMEOUTS.observe('search_results_wait', time.perf_counter() - started)
+        return True
+    except Exception as e:
+        print(f"Search results did not appear within {timeout:.1f}s: {e}")
+        if isinstance(e, TimeoutException):
+            TIMEOUTS.observe_timeout('search_results_wait', timeout)
+        SELECTORS.record('search_card_user', False, page='search')
+        return False
+    finally:
+        NETWORK_TRACE.end(driver) # The search page's own load is over; the scroll's requests are not traced
+
+def scroll_and_extract_video_data_via_js(driver, scroll_floor_ms=500, idle_timeout_ms=4000, max_scrolls=70):
     """
     Executes a JavaScript snippet to scroll the video search results page
     and extract video data (username, likeCount, videoUrl).
+    After each scroll the page waits for a DOM mutation that adds new cards or shows
+    the "no more results" marker, for at most idle_timeout_ms.
+    scroll_floor_ms is the politeness floor: the minimum time between two scrolls.
+    Raises ScrapeError on failure in non-interactive mode.
     """
     if not driver:
         print("Driver not available for executing JS.")
@@ -146,42 +435,53 @@ def scroll_and_extract_video_data_via_js(driver):
     # User's JavaScript, modified to return results instead of downloading CSV
     # and to be more robust if elements are missing for a particular video.
     javascript_to_execute = """
+    const cardSelector = arguments[0];
+    const noMoreSelector = arguments[1];
+    const scrollFloorMs = arguments[2];
+    const idleTimeoutMs = arguments[3];
+    const maxScrolls = arguments[4];
+    const viewsSelector = arguments[5];
+    const videoLinkSelector = arguments[6];
+    const videoCardSelector = arguments[7];
     return (async function () {
+        """ + WAIT_FOR_NEW_CARDS_JS + """
         // "Başka sonuç yok" elementi göründüğünde duracak scroll fonksiyonu
-        async function scrollUntilNoMoreResults(waitMs = 1500) { // Increased waitMs
+        async function scrollUntilNoMoreResults() {
             let scrollCount = 0;
-            const maxScrolls = 70; // Increased maxScrolls for potentially longer pages
-            let noNewContentStreak = 0;
-            let lastHeight = 0;
-            console.log('Starting enhanced scroll function...');
+            let idleStreak = 0;
+            console.log('Starting event-driven scroll function...');
 
             while (scrollCount < maxScrolls) {
-                if (document.querySelector('.css-t7wus4-DivNoMoreResultsContainer.eegew6e3')) {
+                if (document.querySelector(noMoreSelector)) {
                     console.log('"No more results" container found. Stopping scroll.');
                     break;
                 }
 
-                lastHeight = document.body.scrollHeight;
+                const previousCount = document.querySelectorAll(cardSelector).length;
+                const startedAt = Date.now();
                 window.scrollTo(0, document.body.scrollHeight);
                 scrollCount++;
-                console.log(`Scroll attempt ${scrollCount}/${maxScrolls}. Waiting ${waitMs}ms...`);
-                await new Promise(res => setTimeout(res, waitMs));
-
-                let newHeight = document.body.scrollHeight;
-                if (newHeight === lastHeight) {
-                    noNewContentStreak++;
-                    console.log(`Page height (${newHeight}) did not change. Streak: ${noNewContentStreak}`);
-                    if (noNewContentStreak >= 3) { // If height hasn't changed for 3 consecutive scrolls
-                        console.log('Page height has not changed for 3 attempts. Assuming end of results or issue.');
+                const reason = await waitForNewCards(previousCount);
+                console.log(`Scroll attempt ${scrollCount}/${maxScrolls}: ${reason} after ${Date.now() - startedAt}ms.`);
+
+                if (reason === 'no-more-results') {
+                    console.log('"No more results" container found after scroll. Stopping scroll.');
+                    break;
+                }
+                if (reason === 'timeout') {
+                    idleStreak++;
+                    if (idleStreak >= 2) { // No new cards for two full idle timeouts
+                        console.log('No new cards arrived for 2 attempts. Assuming end of results or issue.');
                         break;
                     }
                 } else {
-                    noNewContentStreak = 0; // Reset streak if new content loaded
+                    idleStreak = 0;
                 }
-                 // Check again for "no more results" after waiting, as it might appear after content loads
-                if (document.querySelector('.css-t7wus4-DivNoMoreResultsContainer.eegew6e3')) {
-                    console.log('"No more results" container found after wait. Stopping scroll.');
-                    break;
+
+                // Politeness floor between scrolls
+                const elapsed = Date.now() - startedAt;
+                if (elapsed < scrollFloorMs) {
+                    await new Promise(res => setTimeout(res, scrollFloorMs - elapsed));
                 }
             }
 
@@ -199,15 +499,15 @@ def scroll_and_extract_video_data_via_js(driver):
         }
 
         console.log('Attempting to select elements for scraping...');
-        const userElements = document.querySelectorAll('p[data-e2e="search-card-user-unique-id"]');
-        console.log('[JS] Found ' + userElements.length + ' userElements with selector "p[data-e2e=\\"search-card-user-unique-id\\"]"');
+        const userElements = document.querySelectorAll(cardSelector);
+        console.log('[JS] Found ' + userElements.length + ' userElements with selector "' + cardSelector + '"');
         
-        const likeElements = document.querySelectorAll('strong[data-e2e="video-views"]');
-        console.log('[JS] Found ' + likeElements.length + ' likeElements with selector "strong[data-e2e=\\"video-views\\"]"');
+        const likeElements = document.querySelectorAll(viewsSelector);
+        console.log('[JS] Found ' + likeElements.length + ' likeElements with selector "' + viewsSelector + '"');
         
         // This is a broad selector, used as a fallback in the loop if specific card link isn't found.
-        const videoCardLinks = document.querySelectorAll('a[href*="/video/"]');
-        console.log('[JS] Found ' + videoCardLinks.length + ' general videoCardLinks with selector "a[href*=\\"/video/\\"]"');
+        const videoCardLinks = document.querySelectorAll(videoLinkSelector);
+        console.log('[JS] Found ' + videoCardLinks.length + ' general videoCardLinks with selector "' + videoLinkSelector + '"');
 
         const results = [];
         if (userElements.length === 0) {
@@ -222,14 +522,11 @@ def scroll_and_extract_video_data_via_js(driver):
                 let videoUrl = 'N/A';
                 // Try to find the video URL associated with this user element.
                 // This logic assumes the userElement is within a "card" that also contains the video link.
-                let parentCard = userElement.closest('div[data-e2e="search-video-card"]'); // Example: if cards have this attr
-                if (!parentCard) { // Fallback to a few levels up if specific card selector fails
-                    parentCard = userElement.closest('div.tiktok-xpd1rf-DivContainer.e1yey0rl0'); // Example from inspecting a search page
-                }
+                const parentCard = userElement.closest(videoCardSelector); // Any of the card container candidates
 
 
                 if (parentCard) {
-                    const videoLinkElement = parentCard.querySelector('a[href*="/video/"]');
+                    const videoLinkElement = parentCard.querySelector(videoLinkSelector);
                     if (videoLinkElement) {
                         videoUrl = videoLinkElement.href;
                     }
@@ -256,8 +553,34 @@ def scroll_and_extract_video_data_via_js(driver):
     })();
     """
     
+    script_args = (SELECTORS.css('search_card_user'), SELECTORS.css('no_more_results'), scroll_floor_ms, idle_timeout_ms, max_scrolls,
+                   SELECTORS.css('video_views'), SELECTORS.css('video_link'), SELECTORS.css('search_video_card'))
+
+    def run_scroll_script():
+        # The script timeout follows the scroll durations observed so far.
+        timeout = TIMEOUTS.get('scroll_extract_js')
+        driver.set_script_timeout(timeout)
+        started = time.perf_counter()
+        try:
+            with METRICS.timer('scroll_extract_js') as stage:
+                data = driver.execute_script(javascript_to_execute, *script_args)
+                if not data:
+                    stage.fail()
+        except TimeoutException:
+            TIMEOUTS.observe_timeout('scroll_extract_js', timeout)
+            raise
+        finally:
+            try:
+                driver.set_script_timeout(SCRIPT_TIMEOUT)
+            except Exception:
+                pass # The browser is gone; the caller finds out
+        if data:
+            TIMEOUTS.observe('scroll_extract_js', time.perf_counter() - started)
+        return data
+
     try:
-        extracted_data = driver.execute_script(javascript_to_execute)
+        extracted_data = run_scroll_script()
+        record_search_card_selectors(extracted_data)
         if extracted_data:
             print(f"JavaScript executed successfully, extracted {len(extracted_data)} items.")
         else:
@@ -270,7 +593,7 @@ def scroll_and_extract_video_data_via_js(driver):
         print("This could be due to a page error, CAPTCHA, or an issue in the JS itself.")
         print("Check the browser's developer console for JavaScript errors.")
         print("Attempting CAPTCHA handling and retrying JS execution...")
-        handle_captcha(driver) # Offer to solve CAPTCHA
+        fail_or_pause(driver, 'scroll_extract', e) # Offer to solve CAPTCHA
         
         # Retry JS execution after CAPTCHA
         print("Retrying JavaScript execution after CAPTCHA attempt...")
@@ -279,7 +602,8 @@ def scroll_and_extract_video_data_via_js(driver):
             # driver.refresh()
             # time.sleep(3) # Wait for refresh
             
-            extracted_data_retry = driver.execute_script(javascript_to_execute)
+            extracted_data_retry = run_scroll_script()
+            record_search_card_selectors(extracted_data_retry)
             if extracted_data_retry:
                 print(f"JavaScript re-executed successfully after CAPTCHA, extracted {len(extracted_data_retry)} items.")
             else:
@@ -291,116 +615,435 @@ def scroll_and_extract_video_data_via_js(driver):
             return []
 
 
-def scrape_profile_data(driver, profile_url,
-                        bio_selector="h2[data-e2e=\"user-bio\"].css-cm3m4u-H2ShareDesc.e1457k4r3",
-                        following_selector="strong[data-e2e=\"following-count\"]",
-                        followers_selector="strong[data-e2e=\"followers-count\"]",
-                        likes_selector="strong[data-e2e=\"likes-count\"]"):
+# Installs a harvester on the search results page that keeps scrolling in the background,
+# collects newly appeared cards into window.__tiktokHarvest.buffer and prunes old cards.
+START_STREAMING_HARVEST_JS = """
+    const userSelectors = arguments[0]; // Candidates for the card's user element
+    const userSelector = userSelectors.join(', ');
+    const cardSelector = userSelectors.map(selector => selector + ':not([data-harvested])').join(', ');
+    const noMoreSelector = arguments[1];
+    const scrollFloorMs = arguments[2];
+    const idleTimeoutMs = arguments[3];
+    const maxScrolls = arguments[4];
+    const pruneKeep = arguments[5];
+    const viewsSelector = arguments[6];
+    const videoLinkSelector = arguments[7];
+    const videoCardSelector = arguments[8];
+
+    const harvest = window.__tiktokHarvest = {
+        buffer: [], waiters: [], harvestedCards: [], done: false, error: null, total: 0, pruned: 0
+    };
+
+    """ + WAIT_FOR_NEW_CARDS_JS + """
+    // The smallest ancestor of the user element that holds exactly one card.
+    function findCard(userElement) {
+        const card = userElement.closest(videoCardSelector);
+        if (card) return card;
+        let el = userElement.parentElement;
+        for (let depth = 0; el && depth < 8; depth++, el = el.parentElement) {
+            if (el.querySelector(videoLinkSelector)) {
+                return el.querySelectorAll(userSelector).length === 1 ? el : null;
+            }
+        }
+        return null;
+    }
+
+    function notifyWaiters() {
+        const waiters = harvest.waiters.splice(0);
+        waiters.forEach(waiter => waiter());
+    }
+
+    function harvestNewCards() {
+        const batch = [];
+        document.querySelectorAll(cardSelector).forEach(userElement => {
+            userElement.setAttribute('data-harvested', '1');
+            try {
+                const username = userElement.textContent.trim();
+                const card = findCard(userElement);
+                let likeCount = 'N/A';
+                let videoUrl = 'N/A';
+                if (card) {
+                    const likeElement = card.querySelector(viewsSelector);
+                    if (likeElement) likeCount = likeElement.textContent.trim();
+                    const videoLinkElement = card.querySelector(videoLinkSelector);
+                    if (videoLinkElement) videoUrl = videoLinkElement.href;
+                    harvest.harvestedCards.push(card);
+                }
+                const urlMatch = videoUrl.match(/tiktok\\.com\\/@([^\\/]+)/);
+                batch.push({ username: urlMatch ? urlMatch[1] : username, likeCount: likeCount, videoUrl: videoUrl });
+            } catch (e) {
+                console.error('Error processing one streamed item:', e);
+            }
+        });
+        if (batch.length) {
+            harvest.buffer.push(...batch);
+            harvest.total += batch.length;
+            notifyWaiters();
+        }
+    }
+
+    // Empties cards that were harvested long ago, keeping their height so the
+    // scroll position and the infinite-scroll trigger are unaffected.
+    function pruneOldCards() {
+        if (pruneKeep <= 0) return;
+        while (harvest.harvestedCards.length > pruneKeep) {
+            const card = harvest.harvestedCards.shift();
+            card.style.height = card.offsetHeight + 'px';
+            card.replaceChildren();
+            harvest.pruned++;
+        }
+    }
+
+    (async function () {
+        let scrollCount = 0;
+        let idleStreak = 0;
+        try {
+            harvestNewCards();
+            while (scrollCount < maxScrolls && !document.querySelector(noMoreSelector)) {
+                const startedAt = Date.now();
+                window.scrollTo(0, document.body.scrollHeight);
+                scrollCount++;
+                const reason = await waitForNewCards(0);
+                harvestNewCards();
+                pruneOldCards();
+                if (reason === 'no-more-results') break;
+                if (reason === 'timeout') {
+                    idleStreak++;
+                    if (idleStreak >= 2) break;
+                } else {
+                    idleStreak = 0;
+                }
+                const elapsed = Date.now() - startedAt;
+                if (elapsed < scrollFloorMs) {
+                    await new Promise(res => setTimeout(res, scrollFloorMs - elapsed));
+                }
+            }
+            harvestNewCards();
+        } catch (e) {
+            console.error('Error during streaming harvest:', e);
+            harvest.error = String(e);
+        }
+        console.log(`[JS] Streaming harvest finished after ${scrollCount} scrolls: ${harvest.total} cards, ${harvest.pruned} pruned.`);
+        harvest.done = true;
+        notifyWaiters();
+    })();
+    return true;
+"""
+
+# Async script: hands back everything buffered so far, waiting up to arguments[0] ms
+# for the next batch if the buffer is empty.
+DRAIN_STREAMING_HARVEST_JS = """
+    const maxWaitMs = arguments[0];
+    const callback = arguments[arguments.length - 1];
+    const harvest = window.__tiktokHarvest;
+    if (!harvest) {
+        callback({ items: [], done: true, error: 'Streaming harvester is not installed on this page.' });
+        return;
+    }
+    let timer = null;
+    const flush = () => {
+        if (timer) clearTimeout(timer);
+        callback({ items: harvest.buffer.splice(0), done: harvest.done, error: harvest.error });
+    };
+    if (harvest.buffer.length || harvest.done) {
+        flush();
+        return;
+    }
+    harvest.waiters.push(flush);
+    timer = setTimeout(() => {
+        harvest.waiters = harvest.waiters.filter(waiter => waiter !== flush);
+        flush();
+    }, maxWaitMs);
+"""
+
+def stream_video_data_via_js(driver, scroll_floor_ms=500, idle_timeout_ms=4000, max_scrolls=70,
+                             prune_keep=40, max_batch_wait_ms=10000):
     """
-    Navigates to a user's profile URL and scrapes their bio, following, followers, and likes count.
-    Returns a dictionary with the scraped data.
+    Streaming version of scroll_and_extract_video_data_via_js.
+    Starts a harvester that keeps scrolling the search results page in the background and
+    yields lists of video data dicts (username, likeCount, videoUrl) as new cards appear,
+    so downstream work can start before scrolling finishes.
+    Cards older than the newest prune_keep are emptied to keep browser memory bounded (0 disables pruning).
+    Raises ScrapeError on failure in non-interactive mode.
     """
     if not driver:
-        print("Driver not available for scraping profile data.")
-        return {
-            "bio_text": "N/A (Driver error)",
-            "following_count": "N/A",
-            "followers_count": "N/A",
-            "likes_count": "N/A"
-        }
-    
-    profile_data = {
-        "bio_text": "N/A",
-        "following_count": "N/A",
-        "followers_count": "N/A",
-        "likes_count": "N/A"
-    }
-    
-    print(f"Navigating to profile: {profile_url}")
+        print("Driver not available for executing JS.")
+        return
+
+    print("Starting streaming harvest of video data...")
     try:
-        driver.get(profile_url)
-        # Wait for a general profile element to ensure page is somewhat loaded.
-        # Waiting for the bio element as a primary indicator.
-        # If bio selector is too specific and sometimes missing, can wait for a more general parent.
-        # For example, the container of the like/follower counts: h3.css-1xoqgj7-H3CountInfos
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "h3.css-1xoqgj7-H3CountInfos.e1457k4r0")) # Wait for counts container
-        )
-        
-        # Scrape Bio
-        try:
-            bio_element = driver.find_element(By.CSS_SELECTOR, bio_selector)
-            profile_data["bio_text"] = bio_element.text.strip()
-            print(f"Bio found: '{profile_data['bio_text'][:100]}...'")
-        except Exception as e_bio:
-            print(f"Could not find or scrape bio using selector '{bio_selector}': {e_bio}")
+        with METRICS.timer('stream_start_js'):
+            driver.execute_script(START_STREAMING_HARVEST_JS, SELECTORS.candidates('search_card_user'), SELECTORS.css('no_more_results'),
+                                  scroll_floor_ms, idle_timeout_ms, max_scrolls, prune_keep, SELECTORS.css('video_views'),
+                                  SELECTORS.css('video_link'), SELECTORS.css('search_video_card'))
+    except Exception as e:
+        print(f"Error starting the streaming harvester: {e}")
+        raise_if_crashed(driver, 'stream_harvest', e)
+        if not _interactive:
+            fail_or_pause(driver, 'stream_harvest', e)
+        return
 
-        # Scrape Following Count
+    total_items = 0
+    while True:
         try:
-            following_element = driver.find_element(By.CSS_SELECTOR, following_selector)
-            profile_data["following_count"] = following_element.text.strip()
-            print(f"Following count: {profile_data['following_count']}")
-        except Exception as e_following:
-            print(f"Could not find or scrape following count using selector '{following_selector}': {e_following}")
+            with METRICS.timer('stream_drain_js'):
+                state = driver.execute_async_script(DRAIN_STREAMING_HARVEST_JS, max_batch_wait_ms)
+        except Exception as e:
+            print(f"Error reading streamed video data: {e}")
+            print("A CAPTCHA might be blocking the page, or the page was navigated away.")
+            raise_if_crashed(driver, 'stream_harvest', e)
+            if not _interactive:
+                fail_or_pause(driver, 'stream_harvest', e)
+            return
+        items = state.get('items') or []
+        if items:
+            record_search_card_selectors(items)
+            total_items += len(items)
+            print(f"Streamed {len(items)} new video data items ({total_items} so far).")
+            yield items
+        if state.get('error'):
+            METRICS.inc('harvester_js_errors_total', stage='stream_harvest')
+            print(f"Streaming harvester reported an error: {state['error']}")
+        if state.get('done'):
+            print(f"Streaming harvest complete, {total_items} items in total.")
+            return
+
+# JavaScript helper reading a profile page's recent videos grid, shared by the scripts below.
+# videoSelectors holds candidate selectors for the items and, within one, its link, views and pinned badge.
+RECENT_VIDEOS_JS = """
+    function extractRecentVideos(videoSelectors) {
+        function firstIn(root, selectors) {
+            for (const selector of selectors) {
+                const el = root.querySelector(selector);
+                if (el) return el;
+            }
+            return null;
+        }
+        let items = [];
+        for (const selector of videoSelectors.item) {
+            items = document.querySelectorAll(selector);
+            if (items.length) break;
+        }
+        const videos = [];
+        items.forEach(item => {
+            const link = firstIn(item, videoSelectors.link);
+            const match = link ? /\\/video\\/(\\d+)/.exec(link.getAttribute('href') || '') : null;
+            if (!match) return;
+            const views = firstIn(item, videoSelectors.views);
+            videos.push({
+                id: match[1],
+                views: views ? (views.innerText || views.textContent || '').trim() : null,
+                pinned: firstIn(item, videoSelectors.pinned) !== null
+            });
+        });
+        return videos;
+    }
+"""
+
+# Reads every profile field in one round trip: the page's embedded hydration JSON first,
+# plus the DOM texts once the counts have rendered. Returns null while neither is
+# available, so it doubles as the page-readiness probe. Each field has an ordered list of
+# candidate selectors; the index of the one that matched is returned for the hit rates.
+EXTRACT_PROFILE_JS = RECENT_VIDEOS_JS + """
+    const fieldSelectors = arguments[0]; // field -> candidate selectors
+    const readySelectors = arguments[1];
+    const videoSelectors = arguments[2]; // null unless the recent videos are wanted
+
+    function firstMatch(selectors) {
+        for (let i = 0; i < selectors.length; i++) {
+            const el = document.querySelector(selectors[i]);
+            if (el) return { el: el, index: i };
+        }
+        return null;
+    }
+
+    let userInfo = null;
+    try {
+        const universal = document.getElementById('__UNIVERSAL_DATA_FOR_REHYDRATION__');
+        if (universal) {
+            const scope = JSON.parse(universal.textContent).__DEFAULT_SCOPE__ || {};
+            const detail = scope['webapp.user-detail'];
+            if (detail && detail.userInfo && detail.userInfo.user) userInfo = detail.userInfo;
+        }
+        if (!userInfo) {
+            const sigi = document.getElementById('SIGI_STATE');
+            const userModule = sigi ? JSON.parse(sigi.textContent).UserModule : null;
+            const name = userModule && userModule.users ? Object.keys(userModule.users)[0] : null;
+            if (name) userInfo = { user: userModule.users[name], stats: (userModule.stats || {})[name] || {} };
+        }
+    } catch (e) {
+        console.error('Could not parse profile hydration data:', e);
+    }
+
+    const ready = firstMatch(readySelectors);
+    if (!userInfo && !ready) return null;
+    let dom = null;
+    const matched = { ready: ready ? ready.index : null };
+    if (ready) {
+        dom = {};
+        for (const field in fieldSelectors) {
+            const match = firstMatch(fieldSelectors[field]);
+            dom[field] = match ? (match.el.innerText || match.el.textContent || '').trim() : null;
+            matched[field] = match ? match.index : null;
+        }
+    }
+    const videos = videoSelectors ? extractRecentVideos(videoSelectors) : null;
+    return { userInfo: userInfo, dom: dom, matched: matched, videos: videos };
+"""
+
+# Returns the recent videos once the grid has rendered, else null (for WebDriverWait)
+WAIT_RECENT_VIDEOS_JS = RECENT_VIDEOS_JS + """
+    const videos = extractRecentVideos(arguments[0]);
+    return videos.length ? videos : null;
+"""
+
+# Profile fields read from the DOM, and the registry element holding their candidate selectors
+PROFILE_FIELD_SELECTORS = {
+    'bio_text': 'profile_bio',
+    'following_count': 'profile_following',
+    'followers_count': 'profile_followers',
+    'likes_count': 'profile_likes',
+    'nickname': 'profile_nickname',
+    'bio_link': 'profile_bio_link'
+}
 
-        # Scrape Followers Count
+def recent_video_selectors():
+    """Candidate selectors for the recent videos grid, as passed to RECENT_VIDEOS_JS."""
+    return {
+        'item': SELECTORS.candidates('profile_video_item'),
+        'link': SELECTORS.candidates('video_link'),
+        'views': SELECTORS.candidates('video_views'),
+        'pinned': SELECTORS.candidates('profile_video_pinned')
+    }
+
+def wait_for_recent_videos(driver, extracted, video_selectors):
+    """
+    Gives the recent videos grid up to RECENT_VIDEOS_WAIT seconds to render if the first
+    extraction found none and the creator has videos. Updates extracted['videos'] in place.
+    """
+    video_count = ((extracted.get('userInfo') or {}).get('stats') or {}).get('videoCount')
+    if extracted.get('videos') or video_count == 0:
+        return
+    if SELECTORS.allow_full_wait('profile_video_item'):
         try:
-            followers_element = driver.find_element(By.CSS_SELECTOR, followers_selector)
-            profile_data["followers_count"] = followers_element.text.strip()
-            print(f"Followers count: {profile_data['followers_count']}")
-        except Exception as e_followers:
-            print(f"Could not find or scrape followers count using selector '{followers_selector}': {e_followers}")
+            with METRICS.timer('recent_videos_wait'):
+                extracted['videos'] = WebDriverWait(driver, RECENT_VIDEOS_WAIT).until(
+                    lambda d: d.execute_script(WAIT_RECENT_VIDEOS_JS, video_selectors))
+        except TimeoutException:
+            pass
+    SELECTORS.record('profile_video_item', bool(extracted.get('videos')), page='profile')
 
-        # Scrape Likes Count
+def record_search_card_selectors(video_data_list):
+    """Counts, per card element, how many extracted search cards it found a value for."""
+    if not video_data_list:
+        SELECTORS.record('search_card_user', False, page='search')
+        return
+    SELECTORS.record('search_card_user', True, page='search', amount=len(video_data_list))
+    for name, key in (('video_views', 'likeCount'), ('video_link', 'videoUrl')):
+        hits = sum(1 for item in video_data_list if item.get(key) not in (None, 'N/A'))
+        SELECTORS.record(name, True, page='search', amount=hits)
+        SELECTORS.record(name, False, page='search', amount=len(video_data_list) - hits)
+
+def record_profile_selectors(extracted, field_selectors):
+    """Counts hits and misses of the hydration data and of each DOM element for one extracted profile page."""
+    METRICS.record_selector('hydration', bool(extracted.get('userInfo')), page='profile')
+    dom = extracted.get('dom')
+    matched = extracted.get('matched') or {}
+    SELECTORS.record('profile_ready', dom is not None, matched.get('ready'), page='profile')
+    if dom is None:
+        return
+    for field, name in PROFILE_FIELD_SELECTORS.items():
+        index = matched.get(field)
+        if field_selectors[field] == SELECTORS.candidates(name): # Overridden selectors are not the registry's to count
+            SELECTORS.record(name, index is not None, index, page='profile')
+
+def scrape_profile_data(driver, profile_url, bio_selector=None, following_selector=None,
+                        followers_selector=None, likes_selector=None, navigate=True):
+    """
+    Navigates to a user's profile URL and scrapes their bio, following, followers, and likes count,
+    plus nickname, verified status, bio link and video count when the page's hydration data has them.
+    All fields are read by a single script call; the DOM fallback tries each field's candidate
+    selectors from the selector registry in order, unless a selector is passed in for it.
+    The page gets the timeout learned from earlier profile pages (see timeouts.py), or only
+    FAST_FAIL_TIMEOUT seconds while the breaker of the counts element is open; a page without
+    a CAPTCHA is then not offered for manual solving either.
+    With navigate=False the profile is already loading in the current tab (see prefetch.py).
+    Returns a dictionary with the scraped data. Raises ScrapeError on failure in non-interactive mode.
+    """
+    if not driver:
+        print("Driver not available for scraping profile data.")
+        profile_data = empty_profile_data()
+        profile_data["bio_text"] = "N/A (Driver error)"
+        return profile_data
+
+    overrides = {'bio_text': bio_selector, 'following_count': following_selector,
+                 'followers_count': followers_selector, 'likes_count': likes_selector}
+    field_selectors = {field: [overrides[field]] if overrides.get(field) else SELECTORS.candidates(name)
+                       for field, name in PROFILE_FIELD_SELECTORS.items()}
+    video_selectors = recent_video_selectors() if _recent_videos else None
+    script_args = (field_selectors, SELECTORS.candidates('profile_ready'), video_selectors)
+    extract_profile = lambda d: d.execute_script(EXTRACT_PROFILE_JS, *script_args)
+
+    def wait_and_extract(timeout):
+        # The extraction script returns None until hydration data or the counts container is there.
+        # A prefetched page has mostly loaded already; its short wait would drag the learned timeout
+        # down for pages that do need it, so it is timed as a stage of its own and not learned from.
+        started = time.perf_counter()
         try:
-            likes_element = driver.find_element(By.CSS_SELECTOR, likes_selector)
-            profile_data["likes_count"] = likes_element.text.strip()
-            print(f"Likes count: {profile_data['likes_count']}")
-        except Exception as e_likes:
-            print(f"Could not find or scrape likes count using selector '{likes_selector}': {e_likes}")
-            
+            with METRICS.timer('profile_extract_wait' if navigate else 'prefetched_profile_extract_wait'):
+                extracted = WebDriverWait(driver, timeout).until(extract_profile)
+        except TimeoutException:
+            if navigate:
+                TIMEOUTS.observe_timeout('profile_extract_wait', timeout)
+            record_profile_selectors({}, field_selectors) # Neither hydration data nor the counts appeared
+            raise
+        finally:
+            NETWORK_TRACE.end(driver)
+        if navigate:
+            TIMEOUTS.observe('profile_extract_wait', time.perf_counter() - started)
+        record_profile_selectors(extracted, field_selectors)
+        if video_selectors:
+            wait_for_recent_videos(driver, extracted, video_selectors)
+        return merge_extracted_profile(extracted)
+
+    try:
+        if navigate:
+            print(f"Navigating to profile: {profile_url}")
+            NETWORK_TRACE.begin(driver, 'profile', profile_url)
+            with METRICS.timer('profile_navigation'):
+                driver.get(profile_url)
+        else:
+            print(f"Switched to prefetched profile: {profile_url}")
+        profile_data = wait_and_extract(TIMEOUTS.get('profile_extract_wait') if SELECTORS.allow_full_wait('profile_ready')
+                                        else FAST_FAIL_TIMEOUT)
+        print(f"Bio found: '{str(profile_data['bio_text'])[:100]}...'")
+        print(f"Following: {profile_data['following_count']}, Followers: {profile_data['followers_count']}, Likes: {profile_data['likes_count']}")
         return profile_data
 
     except Exception as e:
         print(f"Error navigating to or scraping main data from {profile_url}: {e}")
         print("A CAPTCHA might be blocking the page, or essential elements are not found.")
-        handle_captcha(driver) # Allow user to solve if it was a CAPTCHA
+        if SELECTORS.is_open('profile_ready'):
+            raise_if_crashed(driver, 'profile', e)
+            if not detect_captcha(driver):
+                # The layout changed: neither a CAPTCHA prompt nor a second wait would help.
+                METRICS.inc('harvester_failures_total', stage='profile', reason='layout_changed')
+                if not _interactive:
+                    raise ScrapeError(f"profile failed, the page layout appears to have changed: {e}")
+                print("Profile elements are missing on most pages; skipping the CAPTCHA prompt.")
+                return empty_profile_data()
+        fail_or_pause(driver, 'profile', e) # Allow user to solve if it was a CAPTCHA
         
         # Retry scraping after CAPTCHA
         print(f"Re-attempting to scrape data from: {profile_url} after CAPTCHA")
         try:
             # driver.get(profile_url) # Re-navigate if necessary, or assume user handled it.
-            # Ensure page is in a good state, maybe wait for a known element again
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "h3.css-1xoqgj7-H3CountInfos.e1457k4r0"))
-            )
-            
-            # Retry Scrape Bio
-            try:
-                bio_element = driver.find_element(By.CSS_SELECTOR, bio_selector)
-                profile_data["bio_text"] = bio_element.text.strip()
-            except: pass
-            # Retry Scrape Following
-            try:
-                following_element = driver.find_element(By.CSS_SELECTOR, following_selector)
-                profile_data["following_count"] = following_element.text.strip()
-            except: pass
-            # Retry Scrape Followers
-            try:
-                followers_element = driver.find_element(By.CSS_SELECTOR, followers_selector)
-                profile_data["followers_count"] = followers_element.text.strip()
-            except: pass
-            # Retry Scrape Likes
-            try:
-                likes_element = driver.find_element(By.CSS_SELECTOR, likes_selector)
-                profile_data["likes_count"] = likes_element.text.strip()
-            except: pass
-            
-            print(f"Data scraped after CAPTCHA attempt: Bio='{profile_data['bio_text'][:50]}...', Following='{profile_data['following_count']}', Followers='{profile_data['followers_count']}', Likes='{profile_data['likes_count']}'")
+            profile_data = wait_and_extract(TIMEOUTS.get('profile_extract_wait'))
+            print(f"Data scraped after CAPTCHA attempt: Bio='{str(profile_data['bio_text'])[:50]}...', Following='{profile_data['following_count']}', Followers='{profile_data['followers_count']}', Likes='{profile_data['likes_count']}'")
             return profile_data
         except Exception as e_retry:
             print(f"Still unable to scrape data from {profile_url} on retry: {e_retry}")
-            return profile_data
+            return empty_profile_data()
 
 if __name__ == '__main__':
     # Example usage (for testing this module directly)
@@ -419,8 +1062,8 @@ if __name__ == '__main__':
                 print(f"Video search navigation for '{keyword_to_test}' successful.")
                 print("Attempting to scroll and extract data via JavaScript...")
                 
-                # Give the page a moment to settle before executing complex JS
-                time.sleep(3)
+                # Wait for the first result cards before executing complex JS
+                wait_for_search_results(test_driver)
                 
                 video_data_list = scroll_and_extract_video_data_via_js(test_driver)
                 
@@ -0,0 +1,177 @@
+# Registry of the page selectors the scraper relies on
+# e.g., ordered fallbacks per page element, hit rates over the run, a circuit breaker per element
+
+import json
+import threading
+import time
+from collections import deque
+
+from tiktok_harvester.metrics import METRICS
+
+# Ordered candidates per page element. Stable data-e2e attributes come first, then
+# class-name fragments that survive the hash TikTok puts in front of them on every build.
+DEFAULT_SELECTORS = {
+    'search_card_user': ['p[data-e2e="search-card-user-unique-id"]'],
+    'search_video_card': ['div[data-e2e="search-video-card"]', 'div[class*="DivContainer"][class*="e1yey0rl"]'],
+    'video_views': ['strong[data-e2e="video-views"]'],
+    'video_link': ['a[href*="/video/"]'],
+    'no_more_results': ['div[class*="DivNoMoreResultsContainer"]'],
+    'profile_ready': ['strong[data-e2e="followers-count"]', 'h3[class*="H3CountInfos"]'], # Counts have rendered
+    'profile_bio': ['h2[data-e2e="user-bio"]', 'h2[class*="H2ShareDesc"]'],
+    'profile_following': ['strong[data-e2e="following-count"]'],
+    'profile_followers': ['strong[data-e2e="followers-count"]'],
+    'profile_likes': ['strong[data-e2e="likes-count"]'],
+    'profile_nickname': ['[data-e2e="user-subtitle"]'],
+    'profile_bio_link': ['[data-e2e="user-link"]'],
+    'profile_video_item': ['div[data-e2e="user-post-item"]', 'div[class*="DivItemContainerV2"]'], # Recent videos grid
+    'profile_video_pinned': ['div[data-e2e="video-card-badge"]']
+}
+
+class CircuitBreaker:
+    """
+    Tracks the last window lookups of one selector. Once at least min_samples of them were made
+    and the share of misses reaches max_miss_rate, the breaker opens: callers stop paying
+    the full wait for the element. After cooldown seconds a single lookup is let through
+    with the full wait (half-open); any hit closes the breaker again, a miss reopens it.
+    """
+    def __init__(self, window=20, min_samples=10, max_miss_rate=0.8, cooldown=120):
+        self.window = window
+        self.min_samples = min_samples
+        self.max_miss_rate = max_miss_rate
+        self.cooldown = cooldown
+        self.outcomes = deque(maxlen=window)
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self.trips = 0
+
+    def miss_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for hit in self.outcomes if not hit) / len(self.outcomes)
+
+    def allow(self):
+        """True if the caller may wait the full time for the element."""
+        if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = 'half_open' # The next lookup is the probe
+            return True
+        return self.state == 'closed'
+
+    def record(self, hit):
+        """Records a lookup. Returns True if this lookup tripped the breaker."""
+        self.outcomes.append(hit)
+        if hit:
+            if self.state != 'closed':
+                self.state = 'closed'
+                self.outcomes.clear()
+            return False
+        if self.state == 'half_open':
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+            return False
+        if self.state == 'closed' and len(self.outcomes) >= self.min_samples and self.miss_rate() >= self.max_miss_rate:
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+            self.trips += 1
+            return True
+        return False
+
+class SelectorRegistry:
+    """
+    Holds the ordered candidate selectors of each page element, counts which candidate
+    matched (or that none did) over the run, and keeps a CircuitBreaker per element.
+    Thread-safe: profile workers record lookups concurrently.
+    """
+    def __init__(self, selectors=None, window=20, min_samples=10, max_miss_rate=0.8, cooldown=120):
+        self._lock = threading.Lock()
+        self.selectors = {name: list(candidates) for name, candidates in (selectors or DEFAULT_SELECTORS).items()}
+        self.breaker_options = {'window': window, 'min_samples': min_samples,
+                                'max_miss_rate': max_miss_rate, 'cooldown': cooldown}
+        self.breakers = {}
+        self.matches = {} # name -> {candidate: hits}
+        self.misses = {} # name -> misses
+
+    def configure(self, **breaker_options):
+        """Changes the breaker settings, e.g. configure(max_miss_rate=0.9, cooldown=60). Resets the breakers."""
+        with self._lock:
+            self.breaker_options.update(breaker_options)
+            self.breakers = {}
+
+    def load(self, path):
+        """
+        Overrides candidates from a JSON file of {name: [selector, ...]}, so a site change
+        can be worked around without editing the code. Returns the names overridden.
+        """
+        with open(path, 'r', encoding='utf-8') as selectors_file:
+            overrides = json.load(selectors_file)
+        with self._lock:
+            for name, candidates in overrides.items():
+                self.selectors[name] = [candidates] if isinstance(candidates, str) else list(candidates)
+        return sorted(overrides)
+
+    def candidates(self, name):
+        """The candidates for an element, in the order they are tried."""
+        return list(self.selectors[name])
+
+    def css(self, name):
+        """A selector list matching any candidate, for presence checks where order does not matter."""
+        return ", ".join(self.selectors[name])
+
+    def _breaker(self, name):
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = CircuitBreaker(**self.breaker_options)
+        return breaker
+
+    def allow_full_wait(self, name):
+        """False while the element's breaker is open, i.e. callers should fail fast instead of waiting."""
+        with self._lock:
+            return self._breaker(name).allow()
+
+    def is_open(self, name):
+        with self._lock:
+            return self._breaker(name).state == 'open'
+
+    def record(self, name, hit, candidate_index=None, page='', amount=1):
+        """
+        Records amount lookups of an element that found it (with the candidate that matched,
+        if known) or missed it. Prints a warning when the element's breaker trips.
+        """
+        if not amount:
+            return
+        with self._lock:
+            if hit:
+                candidate = self.selectors[name][candidate_index] if candidate_index is not None else 'any'
+                per_candidate = self.matches.setdefault(name, {})
+                per_candidate[candidate] = per_candidate.get(candidate, 0) + amount
+            else:
+                self.misses[name] = self.misses.get(name, 0) + amount
+            breaker = self._breaker(name)
+            tripped = False
+            for _ in range(min(amount, breaker.window)):
+                tripped = breaker.record(hit) or tripped
+            miss_rate = breaker.miss_rate()
+        METRICS.record_selector(name, hit, page=page, amount=amount)
+        if tripped:
+            METRICS.inc('harvester_selector_breaker_trips_total', selector=name)
+            print(f"WARNING: selector '{name}' missed {miss_rate:.0%} of its last lookups; the page layout may have changed. "
+                  f"Failing fast on it for {self.breaker_options['cooldown']}s (candidates: {self.css(name)}).")
+
+    def report(self):
+        """Per element: hits per candidate, misses, hit rate and breaker state, for the run report."""
+        with self._lock:
+            report = {}
+            for name in sorted(set(self.matches) | set(self.misses) | set(self.breakers)):
+                hits = sum(self.matches.get(name, {}).values())
+                lookups = hits + self.misses.get(name, 0)
+                breaker = self.breakers.get(name)
+                report[name] = {
+                    'hits': dict(self.matches.get(name, {})),
+                    'misses': self.misses.get(name, 0),
+                    'hit_rate': round(hits / lookups, 3) if lookups else None,
+                    'breaker': breaker.state if breaker else 'closed',
+                    'trips': breaker.trips if breaker else 0
+                }
+            return report
+
+# Process-wide registry used by the scraper
+SELECTORS = SelectorRegistry()
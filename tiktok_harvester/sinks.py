@@ -0,0 +1,261 @@
+# Output sinks for harvested rows
+# e.g., CSV, JSON lines, SQLite and Parquet writers behind one batched interface
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from tiktok_harvester.metrics import METRICS
+from tiktok_harvester.utils import parse_count, append_rows_to_csv, read_csv_header
+
+# Column name -> type ('str', 'int' or 'bool'). Typed sinks store counts as integers
+# and missing values ('N/A') as nulls.
+OUTPUT_SCHEMA = {
+    'keyword_searched': 'str',
+    'username': 'str',
+    'profile_url': 'str',
+    'source_video_url': 'str',
+    'source_video_likes': 'int',
+    'bio_text': 'str',
+    'emails_found': 'str',
+    'profile_following_count': 'int',
+    'profile_followers_count': 'int',
+    'profile_likes_count': 'int',
+    'profile_nickname': 'str',
+    'profile_verified': 'bool',
+    'profile_bio_link': 'str',
+    'profile_video_count': 'int',
+    'recent_videos_count': 'int',
+    'recent_median_views': 'int',
+    'last_posted_at': 'str',
+    'days_since_last_post': 'int',
+    'median_hours_between_posts': 'int'
+}
+
+OUTPUT_COLUMNS = list(OUTPUT_SCHEMA)
+
+SINK_TYPES = ['csv', 'jsonl', 'sqlite', 'parquet']
+
+def _coerce_value(value, column_type):
+    if value is None or value == "N/A" or value == "":
+        return None
+    if column_type == 'int':
+        return parse_count(value)
+    if column_type == 'bool':
+        if isinstance(value, str):
+            return value.strip().lower() in ('true', '1', 'yes')
+        return bool(value)
+    return str(value)
+
+def coerce_row(row, schema=OUTPUT_SCHEMA):
+    """Returns a copy of the row with every column converted to its schema type."""
+    return {column: _coerce_value(row.get(column), column_type) for column, column_type in schema.items()}
+
+def safe_filename(text, fallback="untitled_keyword_search"):
+    """Sanitizes a keyword for use as a filename."""
+    safe = "".join(c if c.isalnum() or c in (' ', '_') else '' for c in text).rstrip().replace(' ', '_')
+    return safe or fallback
+
+class BaseSink:
+    """
+    A destination for output rows. Sinks receive whole batches and only append,
+    so they are safe to reopen on a resumed run.
+    """
+    kind = 'base'
+
+    def __init__(self, path, overwrite=False):
+        self.path = path
+        self.overwrite = overwrite
+
+    def write_batch(self, rows):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class CsvSink(BaseSink):
+    """
+    Appends rows to CSV as display values, like write_to_csv.
+    If the path contains '{keyword}', each keyword gets its own file.
+    Rows appended to an existing file follow its header's column order; a file whose
+    header lacks some of the output columns raises ValueError instead of being misaligned.
+    """
+    kind = 'csv'
+
+    def __init__(self, path, overwrite=False):
+        super().__init__(path, overwrite)
+        self._started_files = set() # Files already truncated in this run when overwrite is set
+        self._file_columns = {} # filename -> column order of its header
+
+    def _filename_for(self, row):
+        return self.path.replace('{keyword}', safe_filename(row.get('keyword_searched') or ''))
+
+    def _columns_for(self, filename):
+        if filename not in self._file_columns:
+            header = read_csv_header(filename)
+            if header is not None:
+                missing = [column for column in OUTPUT_COLUMNS if column not in header]
+                if missing:
+                    raise ValueError(f"{filename} was written with older columns (missing: {', '.join(missing)}). "
+                                     "Move it aside, or pass --fresh to start the output over.")
+            self._file_columns[filename] = header or OUTPUT_COLUMNS
+        return self._file_columns[filename]
+
+    def write_batch(self, rows):
+        rows_by_file = {}
+        for row in rows:
+            rows_by_file.setdefault(self._filename_for(row), []).append(row)
+        for filename, file_rows in rows_by_file.items():
+            if self.overwrite and filename not in self._started_files and os.path.exists(filename):
+                os.remove(filename)
+            self._started_files.add(filename)
+            append_rows_to_csv(file_rows, filename, self._columns_for(filename))
+
+class JsonlSink(BaseSink):
+    """Appends typed rows as JSON lines."""
+    kind = 'jsonl'
+
+    def __init__(self, path, overwrite=False):
+        super().__init__(path, overwrite)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if overwrite and os.path.exists(path):
+            os.remove(path)
+
+    def write_batch(self, rows):
+        with open(self.path, 'a', encoding='utf-8') as jsonl_file:
+            for row in rows:
+                jsonl_file.write(json.dumps(coerce_row(row), ensure_ascii=False) + "\n")
+            jsonl_file.flush()
+            os.fsync(jsonl_file.fileno())
+
+class SqliteSink(BaseSink):
+    """
+    Inserts typed rows into a 'harvested_rows' table, one transaction per batch.
+    Thread-safe: the asyncio pipeline writes from worker threads.
+    """
+    kind = 'sqlite'
+    SQL_TYPES = {'str': 'TEXT', 'int': 'INTEGER', 'bool': 'INTEGER'}
+
+    def __init__(self, path, overwrite=False):
+        super().__init__(path, overwrite)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if overwrite and os.path.exists(path):
+            os.remove(path)
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        columns_sql = ", ".join(f"{column} {self.SQL_TYPES[column_type]}" for column, column_type in OUTPUT_SCHEMA.items())
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS harvested_rows ({columns_sql})")
+        # Tables created by older versions get the columns added since
+        existing_columns = {row[1] for row in self.connection.execute("PRAGMA table_info(harvested_rows)")}
+        for column, column_type in OUTPUT_SCHEMA.items():
+            if column not in existing_columns:
+                self.connection.execute(f"ALTER TABLE harvested_rows ADD COLUMN {column} {self.SQL_TYPES[column_type]}")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_harvested_rows_username ON harvested_rows (username)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_harvested_rows_keyword ON harvested_rows (keyword_searched)")
+        self.connection.commit()
+        self._insert_sql = (f"INSERT INTO harvested_rows ({', '.join(OUTPUT_COLUMNS)}) "
+                            f"VALUES ({', '.join('?' for _ in OUTPUT_COLUMNS)})")
+
+    def write_batch(self, rows):
+        typed_rows = [coerce_row(row) for row in rows]
+        with self._lock, self.connection:
+            self.connection.executemany(self._insert_sql, [tuple(row[column] for column in OUTPUT_COLUMNS) for row in typed_rows])
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+class ParquetSink(BaseSink):
+    """
+    Writes each batch of typed rows as one Parquet file in a dataset directory,
+    so earlier batches stay readable if the run dies. Needs pyarrow.
+    """
+    kind = 'parquet'
+    ARROW_TYPES = {'str': 'string', 'int': 'int64', 'bool': 'bool_'}
+
+    def __init__(self, path, overwrite=False):
+        super().__init__(path, overwrite)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("The Parquet sink needs pyarrow: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.schema = pyarrow.schema([(column, getattr(pyarrow, self.ARROW_TYPES[column_type])())
+                                      for column, column_type in OUTPUT_SCHEMA.items()])
+        if overwrite and os.path.isdir(path):
+            for name in os.listdir(path):
+                if name.endswith('.parquet'):
+                    os.remove(os.path.join(path, name))
+        os.makedirs(path, exist_ok=True)
+        self._batch_number = 0
+
+    def write_batch(self, rows):
+        typed_rows = [coerce_row(row) for row in rows]
+        table = self.pa.Table.from_pylist(typed_rows, schema=self.schema)
+        self._batch_number += 1
+        filename = os.path.join(self.path, f"part-{int(time.time() * 1000)}-{self._batch_number:05d}.parquet")
+        self.pq.write_table(table, filename)
+
+class SinkGroup:
+    """
+    Buffers rows and writes them to every sink in batches of batch_size.
+    on_flush(rows) is called once a batch is in every sink, e.g. to journal the rows.
+    A batch stays buffered until every sink has taken it, so a failed write is retried with
+    the next flush instead of being lost (a sink that had taken it may then get it twice).
+    Thread-safe: the asyncio pipeline writes and flushes from worker threads.
+    """
+    def __init__(self, sinks, batch_size=50, on_flush=None):
+        self.sinks = sinks
+        self.batch_size = max(1, batch_size)
+        self.on_flush = on_flush
+        self._lock = threading.RLock()
+        self._buffer = []
+
+    def write(self, row):
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._buffer:
+                return
+            rows = list(self._buffer)
+            for sink in self.sinks:
+                with METRICS.timer(f"sink_write_{sink.kind}"):
+                    sink.write_batch(rows)
+            del self._buffer[:len(rows)]
+            METRICS.inc('harvester_rows_written_total', len(rows))
+            if self.on_flush:
+                self.on_flush(rows)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            for sink in self.sinks:
+                sink.close()
+
+def create_sinks(sink_types, output_dir, overwrite=False):
+    """
+    Creates the sinks named in sink_types inside output_dir:
+    csv -> one CSV per keyword, jsonl -> harvest.jsonl, sqlite -> harvest.sqlite, parquet -> harvest_parquet/.
+    """
+    sinks = []
+    for sink_type in sink_types:
+        if sink_type == 'csv':
+            sinks.append(CsvSink(os.path.join(output_dir, "{keyword}.csv"), overwrite=overwrite))
+        elif sink_type == 'jsonl':
+            sinks.append(JsonlSink(os.path.join(output_dir, "harvest.jsonl"), overwrite=overwrite))
+        elif sink_type == 'sqlite':
+            sinks.append(SqliteSink(os.path.join(output_dir, "harvest.sqlite"), overwrite=overwrite))
+        elif sink_type == 'parquet':
+            sinks.append(ParquetSink(os.path.join(output_dir, "harvest_parquet"), overwrite=overwrite))
+        else:
+            raise ValueError(f"Unknown sink type '{sink_type}'. Choose from: {', '.join(SINK_TYPES)}")
+    return sinks
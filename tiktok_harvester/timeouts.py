@@ -0,0 +1,115 @@
+# Adaptive timeouts for the scraper's waits
+# e.g., a multiple of each stage's observed p95 latency, kept between floor and ceiling, saved between runs
+
+import json
+import os
+import threading
+from collections import deque
+
+from tiktok_harvester.metrics import METRICS, percentile
+
+# stage -> (default seconds until enough samples are in, floor, ceiling, grow_on_timeout).
+# Waits for a page element learn only from successes, so dead pages do not stretch them.
+# Script stages also learn from their timeouts: a long scroll that ran out of time is slow, not dead.
+STAGE_TIMEOUTS = {
+    'search_page_wait': (20, 5, 60, False),
+    'search_results_wait': (20, 5, 60, False),
+    'profile_extract_wait': (20, 4, 60, False),
+    'scroll_extract_js': (120, 30, 900, True)
+}
+
+class AdaptiveTimeouts:
+    """
+    Keeps the latest latencies of each stage in STAGE_TIMEOUTS and hands out
+    timeouts of multiplier * p95, clamped to the stage's floor and ceiling,
+    once min_samples are in (the stage's default until then).
+    Thread-safe: profile workers observe their waits concurrently.
+    """
+    def __init__(self, stages=None, multiplier=3.0, min_samples=20, max_samples=200, enabled=True):
+        self._lock = threading.Lock()
+        self.stages = dict(stages or STAGE_TIMEOUTS)
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.enabled = enabled
+        self.samples = {stage: deque(maxlen=max_samples) for stage in self.stages}
+        self.timeouts_hit = {stage: 0 for stage in self.stages}
+
+    def configure(self, multiplier=None, enabled=None, bounds=None):
+        """Changes the multiplier, turns adaptation on or off, or sets {stage: (floor, ceiling)}."""
+        with self._lock:
+            if multiplier is not None:
+                self.multiplier = multiplier
+            if enabled is not None:
+                self.enabled = enabled
+            for stage, (floor, ceiling) in (bounds or {}).items():
+                default, _, _, grow_on_timeout = self.stages[stage]
+                self.stages[stage] = (default, floor, ceiling, grow_on_timeout)
+
+    def get(self, stage):
+        """The timeout to use for the next wait of a stage, in seconds."""
+        default, floor, ceiling, _ = self.stages[stage]
+        with self._lock:
+            samples = list(self.samples[stage])
+        if not self.enabled or len(samples) < self.min_samples:
+            return default
+        timeout = min(ceiling, max(floor, self.multiplier * percentile(samples, 0.95)))
+        METRICS.set_gauge('harvester_adaptive_timeout_seconds', round(timeout, 2), stage=stage)
+        return timeout
+
+    def observe(self, stage, seconds):
+        """Records how long a successful wait took."""
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def observe_timeout(self, stage, timeout):
+        """Records a wait that ran out of time; counted as a sample only for stages that grow on timeouts."""
+        with self._lock:
+            self.timeouts_hit[stage] += 1
+            if self.stages[stage][3]:
+                self.samples[stage].append(timeout)
+
+    def load(self, path):
+        """Loads the samples saved by an earlier run. Returns the number of stages loaded."""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r', encoding='utf-8') as timeouts_file:
+                saved = json.load(timeouts_file)
+        except (OSError, ValueError) as e:
+            print(f"Could not read the learned timeouts from {path}: {e}")
+            return 0
+        loaded = 0
+        with self._lock:
+            for stage, entry in (saved.get('stages') or {}).items():
+                if stage in self.samples:
+                    self.samples[stage].extend(float(value) for value in entry.get('samples', []))
+                    loaded += 1
+        return loaded
+
+    def save(self, path):
+        """Saves the latest samples and the resulting timeouts for the next run."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as timeouts_file:
+            json.dump({'multiplier': self.multiplier, 'stages': self.report(include_samples=True)}, timeouts_file, indent=2)
+
+    def report(self, include_samples=False):
+        """Per stage: sample count, p95, current timeout and timeouts hit in this run."""
+        report = {}
+        for stage in self.stages:
+            with self._lock:
+                samples = list(self.samples[stage])
+                timeouts_hit = self.timeouts_hit[stage]
+            entry = {
+                'samples_count': len(samples),
+                'p95_s': round(percentile(samples, 0.95), 3),
+                'timeout_s': round(self.get(stage), 2),
+                'timeouts_hit': timeouts_hit
+            }
+            if include_samples:
+                entry['samples'] = [round(value, 3) for value in samples]
+            report[stage] = entry
+        return report
+
+# Process-wide timeouts used by the scraper
+TIMEOUTS = AdaptiveTimeouts()
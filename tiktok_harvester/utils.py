@@ -1,28 +1,59 @@
 # Helper functions for the TikTok Harvester
-# e.g., CSV writing, email extraction
+# e.g., CSV writing, email extraction, config loading
 
 import re
 import csv
 import os
+import configparser
+from functools import lru_cache
+
+from tiktok_harvester.emails import extract_emails
 
 def extract_emails_from_text(text):
     """
-    Extracts email addresses from a given string using a regular expression.
-    Returns a list of unique email addresses found.
+    Extracts email addresses from a given string.
+    Addresses are lowercased, stripped of surrounding junk and checked against the
+    bundled public-suffix TLD table (see tiktok_harvester.emails).
+    Returns a list of unique email addresses found, in order of first appearance.
+    """
+    return extract_emails(text)
+
+COUNT_SUFFIXES = {'K': 1_000, 'M': 1_000_000, 'B': 1_000_000_000}
+COUNT_REGEX = re.compile(r"([0-9][0-9,]*(?:\.[0-9]+)?)\s*([KMBkmb]?)")
+
+@lru_cache(maxsize=65536)
+def _parse_count_text(text):
+    # Display counts repeat a lot ('1.2K', '10M'...), so parsed values are cached.
+    match = COUNT_REGEX.fullmatch(text.strip())
+    if not match:
+        return None
+    number, suffix = match.groups()
+    number = number.replace(',', '')
+    if suffix:
+        return int(round(float(number) * COUNT_SUFFIXES[suffix.upper()]))
+    return int(number) if '.' not in number else int(float(number))
+
+def parse_count(value):
+    """
+    Converts a display count such as '12.3K', '1.2M', '1,234' or 987 to an integer.
+    Returns None for missing values ('N/A', '', None) or text that is not a count.
     """
-    if not text:
-        return []
-    # Regex to find most common email formats
-    email_regex = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-    emails = re.findall(email_regex, text)
-    # Return unique emails, preserving order of first appearance
-    unique_emails = []
-    seen_emails = set()
-    for email in emails:
-        if email.lower() not in seen_emails:
-            unique_emails.append(email)
-            seen_emails.add(email.lower())
-    return unique_emails
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    return _parse_count_text(str(value))
+
+def normalize_counts(records, fields):
+    """
+    Converts the given count fields of every record to integers in place (None when missing),
+    e.g. normalize_counts(video_data_list, ['likeCount']). Returns the records.
+    """
+    for record in records:
+        for field in fields:
+            if field in record:
+                record[field] = parse_count(record[field])
+    return records
 
 def write_to_csv(data_rows, filename="tiktok_harvester/output/tiktok_emails.csv", headers=None):
     """
@@ -49,6 +80,46 @@ def write_to_csv(data_rows, filename="tiktok_harvester/output/tiktok_emails.csv"
     except Exception as e:
         print(f"Error writing to CSV file {filename}: {e}")
 
+def read_csv_header(filename):
+    """Returns the header row of an existing CSV file, or None if the file is missing or empty."""
+    if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+        return None
+    with open(filename, 'r', newline='', encoding='utf-8') as csvfile:
+        return next(csv.reader(csvfile), None)
+
+def append_rows_to_csv(data_rows, filename, headers):
+    """
+    Appends rows to a CSV file, writing the header row first if the file is new or empty.
+    The file is flushed and synced to disk before returning, so rows survive a crash.
+    """
+    if not data_rows:
+        return
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    write_header = not os.path.exists(filename) or os.path.getsize(filename) == 0
+    with open(filename, 'a', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=headers)
+        if write_header:
+            writer.writeheader()
+        writer.writerows(data_rows)
+        csvfile.flush()
+        os.fsync(csvfile.fileno())
+
+def load_config(path, section="harvester"):
+    """
+    Reads run settings from an INI file, e.g.:
+        [harvester]
+        keywords = tech, programming
+        non_interactive = true
+        workers = 2
+    Returns a dict of setting name -> raw string value, with dashes in names turned into underscores.
+    """
+    config = configparser.ConfigParser()
+    if not config.read(path, encoding='utf-8'):
+        raise FileNotFoundError(f"Config file not found: {path}")
+    if not config.has_section(section):
+        return {}
+    return {name.replace('-', '_'): value for name, value in config.items(section)}
+
 if __name__ == '__main__':
     # Example usage for extract_emails_from_text
     sample_bio_text = """
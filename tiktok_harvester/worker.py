@@ -0,0 +1,142 @@
+# Job-queue worker for crawls spread over several processes or machines
+# e.g., leasing keyword searches and profile visits, queuing the creators found, writing rows
+
+import os
+import socket
+import time
+
+from tiktok_harvester.crawl import load_search_results, filter_video_data, collect_users_to_process, build_output_row
+from tiktok_harvester.jobqueue import LeaseKeeper
+from tiktok_harvester.metrics import METRICS
+from tiktok_harvester.profile_data import profile_scraped
+from tiktok_harvester.scraper import scrape_profile_data, set_interactive, ScrapeError
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def enqueue_keywords(queue, keywords):
+    """Queues a search job per keyword. Returns the number of keywords newly queued."""
+    added = 0
+    for keyword in keywords:
+        if queue.enqueue('search', keyword) == 'queued':
+            added += 1
+    return added
+
+class QueueWorker:
+    """
+    Pulls jobs from a shared job queue until it has drained:
+    - 'search' jobs search a keyword and queue a 'profile' job per creator found, with the
+      keyword and search card attached as context;
+    - 'profile' jobs load the profile once and write a row for every keyword attached to it;
+      a profile that fails to load fails its job, so it is retried instead of written empty.
+    Profile jobs go first, so the queue drains instead of piling up searches. Each job's lease
+    is renewed while it runs. Rows are written to this worker's own sinks; a worker that dies
+    between writing rows and completing its job leaves them to be written again by the next one.
+    """
+    def __init__(self, queue, args, browser, output_writer, rate_limiter, http_fetcher=None, worker_id=None, profile_store=None):
+        self.queue = queue
+        self.args = args
+        self.browser = browser # ManagedDriver for searches and profiles
+        self.output_writer = output_writer
+        self.rate_limiter = rate_limiter
+        self.http_fetcher = http_fetcher
+        self.profile_store = profile_store # Profiles fresh in the store are not loaded again
+        self.worker_id = worker_id or default_worker_id()
+        self.jobs_done = {'search': 0, 'profile': 0}
+        self.jobs_failed = 0
+        self.rows_written = 0
+
+    def run(self, keep_polling=False, poll_interval=5):
+        """
+        Works through the queue. Stops once nothing is queued or leased, unless keep_polling
+        is set, in which case it waits for new jobs until interrupted.
+        A worker never waits for console input: a job stuck on a prompt would keep its lease
+        renewed forever, so CAPTCHAs and missing elements fail the job instead.
+        """
+        set_interactive(False)
+        print(f"Worker {self.worker_id} pulling jobs from {self.queue.path}...")
+        while True:
+            job = self.queue.lease(self.worker_id)
+            if job is None:
+                wait = self.queue.seconds_until_next()
+                if wait is None and not keep_polling:
+                    break
+                time.sleep(min(poll_interval, wait) if wait is not None else poll_interval)
+                continue
+            self.process(job)
+        print(f"Queue drained. Worker {self.worker_id} finished {self.jobs_done['search']} searches and "
+              f"{self.jobs_done['profile']} profiles, wrote {self.rows_written} rows, {self.jobs_failed} jobs failed.")
+
+    def process(self, job):
+        print(f"\n[{self.worker_id}] Leased {job!r}")
+        with LeaseKeeper(self.queue, job):
+            try:
+                if job.kind == 'search':
+                    completed = self.search(job)
+                else:
+                    completed = self.profile(job)
+            except Exception as e: # ScrapeError, or anything unexpected; either way the job is retried later
+                will_retry = self.queue.fail(job, e, retry=not getattr(e, 'needs_human', False))
+                if will_retry is None:
+                    print(f"{job!r} failed ({e}), but its lease was lost; the job stays with the worker that took it over.")
+                    METRICS.inc('harvester_jobs_total', kind=job.kind, result='lease_lost')
+                    return
+                self.jobs_failed += 1
+                METRICS.inc('harvester_jobs_total', kind=job.kind, result='failure')
+                if will_retry:
+                    print(f"{job!r} failed ({e}). Queued for a retry.")
+                else:
+                    print(f"{job!r} failed ({e}). Marked as failed.")
+                return
+        if not completed:
+            print(f"Lease on {job!r} was lost before it finished; the job stays with the worker that took it over.")
+            METRICS.inc('harvester_jobs_total', kind=job.kind, result='lease_lost')
+            return
+        self.jobs_done[job.kind] += 1
+        METRICS.inc('harvester_jobs_total', kind=job.kind, result='success')
+
+    def search(self, job):
+        keyword = job.key
+        args = self.args
+        video_data_list = self.browser.run(load_search_results, keyword, args)
+        if video_data_list is None:
+            raise ScrapeError(f"Search for '{keyword}' failed.")
+        video_data_list = filter_video_data(video_data_list, args.min_video_likes, args.max_video_likes)
+        users_to_process = collect_users_to_process(video_data_list, keyword, {}, base_url=args.base_url)
+        for user_info in users_to_process:
+            if not user_info['profile_url'] or user_info['username'] == 'N/A':
+                continue
+            # Profiles before searches, so workers finish what they have found before searching on.
+            self.queue.enqueue('profile', user_info['username'], context=[keyword, user_info], priority=1)
+        print(f"Search for '{keyword}' done: {len(users_to_process)} creators queued.")
+        return self.queue.complete(job)
+
+    def profile(self, job):
+        profile_page_data = job.result
+        if profile_page_data is None and self.profile_store is not None:
+            profile_page_data = self.profile_store.get_fresh(job.key)
+        if profile_page_data is None:
+            profile_url = job.contexts[0][1]['profile_url']
+            source = 'http'
+            if self.http_fetcher:
+                profile_page_data = self.http_fetcher.fetch(profile_url)
+            if profile_page_data is None:
+                source = 'browser'
+                self.rate_limiter.wait() # Politeness floor between profile visits
+                profile_page_data = self.browser.run(scrape_profile_data, profile_url)
+            scraped = profile_scraped(profile_page_data)
+            METRICS.inc('harvester_profiles_total', source=source, result='success' if scraped else 'failure')
+            if not scraped:
+                # Failing the job retries it with a backoff; completing it would hand the empty data to later keywords.
+                raise ScrapeError(f"Profile of {job.key} could not be scraped.")
+            if self.profile_store is not None:
+                self.profile_store.save(job.key, profile_page_data)
+        else:
+            print(f"Using profile data already scraped for {job.key}.")
+            METRICS.inc('harvester_profiles_total', source='reused', result='success')
+        contexts = job.contexts[job.contexts_done:]
+        for keyword, user_info in contexts:
+            self.output_writer.write(build_output_row(keyword, user_info, profile_page_data))
+        self.output_writer.flush() # Rows are in the sinks before the job is marked done
+        self.rows_written += len(contexts)
+        return self.queue.complete(job, profile_page_data, contexts_done=len(job.contexts))